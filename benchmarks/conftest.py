@@ -0,0 +1,42 @@
+"""
+Fixtures for the tests in this directory: the local stack from stack.py
+(fake Azure endpoint with 50 results per search, SQLite history), and the
+history service's tables on a SQLite file in this process
+"""
+import os
+import tempfile
+import uuid
+import httpx
+import pytest
+import query_plans
+from fake_azure import FakeAzureConfig
+from stack import Stack
+
+# Search page caps small enough to reach with the fake endpoint's results
+SEARCH_MAX_PAGE_SIZE = 20
+SEARCH_MAX_SKIP = 40
+
+@pytest.fixture(scope="session")
+def stack():
+    extra_env = {"SEARCH_MAX_PAGE_SIZE": str(SEARCH_MAX_PAGE_SIZE), "SEARCH_MAX_SKIP": str(SEARCH_MAX_SKIP)}
+    with Stack(base_port=7400, azure=FakeAzureConfig(latency_ms=1, jitter_ms=0), extra_env=extra_env) as running:
+        yield running
+
+@pytest.fixture
+def user_id(stack) -> str:
+    """
+    A new user with no history
+    """
+    name = uuid.uuid4().hex
+    response = httpx.post(stack.url("history") + "/api/users", json={"username": name, "email": f"{name}@example.com"})
+    response.raise_for_status()
+    return response.json()["id"]
+
+@pytest.fixture(scope="session")
+def history_tables():
+    """
+    (engine, users, search_history, history_page_query) of the history
+    service on a temporary SQLite file. The history service's `app` package
+    is imported into this process, so no other service's can be.
+    """
+    return query_plans.load_history_service("sqlite:///" + os.path.join(tempfile.mkdtemp(), "history.db"))
@@ -0,0 +1,129 @@
+"""
+Local stand-in for the Azure AI Search documents API.
+
+Answers `POST /indexes('<name>')/docs/search.post.search` with generated
+hotel documents after a configurable delay, and can inject 429s with
+Retry-After so client-side throttling can be exercised. Authentication is
+not checked.
+
+    python benchmarks/fake_azure.py --port 7001 --latency-ms 20 --throttle-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse
+from starlette.routing import Route
+
+class FakeAzureConfig:
+    def __init__(
+        self,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 5.0,
+        max_results: int = 50,
+        doc_bytes: int = 500,
+        throttle_rate: float = 0.0,
+        retry_after_ms: int = 100
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_results = max_results
+        self.doc_bytes = doc_bytes
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+
+    @classmethod
+    def from_env(cls) -> "FakeAzureConfig":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_AZURE_LATENCY_MS", "20")),
+            jitter_ms=float(os.getenv("FAKE_AZURE_JITTER_MS", "5")),
+            max_results=int(os.getenv("FAKE_AZURE_MAX_RESULTS", "50")),
+            doc_bytes=int(os.getenv("FAKE_AZURE_DOC_BYTES", "500")),
+            throttle_rate=float(os.getenv("FAKE_AZURE_THROTTLE_RATE", "0")),
+            retry_after_ms=int(os.getenv("FAKE_AZURE_RETRY_AFTER_MS", "100"))
+        )
+
+    def to_env(self) -> dict:
+        return {
+            "FAKE_AZURE_LATENCY_MS": str(self.latency_ms),
+            "FAKE_AZURE_JITTER_MS": str(self.jitter_ms),
+            "FAKE_AZURE_MAX_RESULTS": str(self.max_results),
+            "FAKE_AZURE_DOC_BYTES": str(self.doc_bytes),
+            "FAKE_AZURE_THROTTLE_RATE": str(self.throttle_rate),
+            "FAKE_AZURE_RETRY_AFTER_MS": str(self.retry_after_ms)
+        }
+
+CATEGORIES = ["Boutique", "Budget", "Luxury", "Resort and Spa", "Suite"]
+
+def make_document(index: int, search_text: str, doc_bytes: int) -> dict:
+    filler = (f"{search_text} " * (doc_bytes // max(len(search_text) + 1, 1) + 1))[:doc_bytes]
+    return {
+        "@search.score": round(1.0 / (index + 1), 6),
+        "hotelId": str(index + 1),
+        "hotelName": f"Hotel {index + 1}",
+        "description": filler,
+        "category": CATEGORIES[index % len(CATEGORIES)]
+    }
+
+def create_app(config: FakeAzureConfig) -> Starlette:
+    stats = {"requests": 0, "throttled": 0}
+
+    async def search(request: Request):
+        if not request.url.path.endswith("/docs/search.post.search"):
+            return JSONResponse({"error": {"code": "NotFound"}}, status_code=404)
+        stats["requests"] += 1
+        if config.throttle_rate and random.random() < config.throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse(
+                {"error": {"code": "TooManyRequests", "message": "Injected throttle"}},
+                status_code=429,
+                headers={"Retry-After-Ms": str(config.retry_after_ms)}
+            )
+
+        body = await request.json()
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        top = body.get("top") or config.max_results
+        skip = body.get("skip") or 0
+        count = max(min(top, config.max_results - skip), 0)
+        search_text = body.get("search") or "*"
+        select = body.get("select")
+        documents = [make_document(skip + i, search_text, config.doc_bytes) for i in range(count)]
+        if select:
+            fields = set(select.split(",")) | {"@search.score"}
+            documents = [{k: v for k, v in doc.items() if k in fields} for doc in documents]
+        return Response(json.dumps({"value": documents}), media_type="application/json")
+
+    async def fake_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/_stats", fake_stats, methods=["GET"]),
+        Route("/{path:path}", search, methods=["POST"])
+    ])
+
+app = create_app(FakeAzureConfig.from_env())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7001)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--doc-bytes", type=int, default=500)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FakeAzureConfig(args.latency_ms, args.jitter_ms, args.max_results, args.doc_bytes,
+                             args.throttle_rate, args.retry_after_ms)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
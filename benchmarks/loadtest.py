@@ -0,0 +1,195 @@
+"""
+Replays a traffic file against the orchestrator and reports throughput and
+p50/p95/p99 latency per endpoint.
+
+Each line of the traffic file is one request:
+
+    {"name": "search", "method": "POST", "path": "/api/search",
+     "headers": {"user_id": "{user_id}"}, "json": {"search_text": "spa"}}
+
+`{user_id}` anywhere in a string is replaced by the benchmark user's ID.
+Requests are sent round-robin from the file by `--concurrency` workers.
+
+    python benchmarks/loadtest.py                       # boot the stack, run, print
+    python benchmarks/loadtest.py --baseline benchmarks/baseline/loadtest.json
+    python benchmarks/loadtest.py --target http://localhost:8000 --user-id <id>
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import httpx
+import results
+from fake_azure import FakeAzureConfig
+from stack import Stack
+
+DEFAULT_TRAFFIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traffic", "search_mix.jsonl")
+
+def load_traffic(path: str, user_id: str) -> List[Dict[str, Any]]:
+    def substitute(value):
+        if isinstance(value, str):
+            return value.replace("{user_id}", user_id)
+        if isinstance(value, list):
+            return [substitute(item) for item in value]
+        if isinstance(value, dict):
+            return {key: substitute(item) for key, item in value.items()}
+        return value
+
+    traffic = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = substitute(json.loads(line))
+                entry.setdefault("name", f"{entry['method']} {entry['path']}")
+                traffic.append(entry)
+    return traffic
+
+async def run_load(
+    base_url: str,
+    traffic: List[Dict[str, Any]],
+    concurrency: int,
+    total_requests: Optional[int],
+    duration: Optional[float]
+) -> Dict[str, Dict[str, List]]:
+    """
+    Send the traffic and collect latencies and statuses per endpoint name
+    """
+    samples: Dict[str, Dict[str, List]] = defaultdict(lambda: {"latencies": [], "statuses": []})
+    entries = itertools.cycle(traffic)
+    sent = itertools.count()
+    stop_at = time.perf_counter() + duration if duration else None
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def worker():
+            while True:
+                if total_requests is not None and next(sent) >= total_requests:
+                    return
+                if stop_at is not None and time.perf_counter() >= stop_at:
+                    return
+                entry = next(entries)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(
+                        entry["method"], entry["path"],
+                        headers=entry.get("headers"), json=entry.get("json")
+                    )
+                    await response.aread()
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                sample = samples[entry["name"]]
+                sample["latencies"].append(time.perf_counter() - started)
+                sample["statuses"].append(status)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+def summarize(samples: Dict[str, Dict[str, List]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for name, sample in sorted(samples.items()):
+        latencies = sorted(sample["latencies"])
+        errors = sum(1 for status in sample["statuses"] if not 200 <= status < 300)
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": errors / len(latencies) if latencies else 0.0,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": results.percentile(latencies, 0.50) * 1000,
+            "p95_ms": results.percentile(latencies, 0.95) * 1000,
+            "p99_ms": results.percentile(latencies, 0.99) * 1000
+        }
+    return summary
+
+def print_summary(summary: Dict[str, Dict[str, float]], elapsed: float):
+    print(f"\n{'endpoint':<28}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in summary.items():
+        print(f"{name:<28}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>10.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    total = sum(row["requests"] for row in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+async def measure(args, base_url: str, user_id: str) -> Dict[str, Any]:
+    traffic = load_traffic(args.traffic, user_id)
+    if args.warmup:
+        await run_load(base_url, traffic, args.concurrency, args.warmup, None)
+    started = time.perf_counter()
+    samples = await run_load(base_url, traffic, args.concurrency, args.requests, args.duration)
+    elapsed = time.perf_counter() - started
+    summary = summarize(samples, elapsed)
+    print_summary(summary, elapsed)
+    return {"elapsed_s": elapsed, "endpoints": summary}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", default=DEFAULT_TRAFFIC, help="traffic file (JSON lines)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000, help="requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="seconds to run instead of a request count")
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent before measuring")
+    parser.add_argument("--target", help="orchestrator URL of an already running stack")
+    parser.add_argument("--user-id", help="user ID to substitute when using --target")
+    parser.add_argument("--base-port", type=int, default=7000)
+    parser.add_argument("--database-url", help="history database (default: temporary SQLite)")
+    parser.add_argument("--azure-latency-ms", type=float, default=20.0)
+    parser.add_argument("--azure-max-results", type=int, default=50)
+    parser.add_argument("--azure-doc-bytes", type=int, default=500)
+    parser.add_argument("--azure-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra setting for every service, e.g. SEARCH_CACHE_ENABLED=true")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare with a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed regression as a fraction (default 0.15)")
+    args = parser.parse_args()
+    if args.duration:
+        args.requests = None
+
+    config = {
+        "traffic": os.path.relpath(args.traffic),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "duration": args.duration,
+        "azure_latency_ms": args.azure_latency_ms,
+        "azure_max_results": args.azure_max_results,
+        "azure_doc_bytes": args.azure_doc_bytes,
+        "azure_throttle_rate": args.azure_throttle_rate,
+        "env": args.env
+    }
+
+    if args.target:
+        measured = asyncio.run(measure(args, args.target, args.user_id or "bench-user"))
+    else:
+        azure = FakeAzureConfig(
+            latency_ms=args.azure_latency_ms,
+            max_results=args.azure_max_results,
+            doc_bytes=args.azure_doc_bytes,
+            throttle_rate=args.azure_throttle_rate
+        )
+        extra_env = dict(item.split("=", 1) for item in args.env)
+        with Stack(args.base_port, azure, args.database_url, extra_env) as stack:
+            config["database"] = stack.database_url.split(":", 1)[0]
+            measured = asyncio.run(measure(args, stack.url("orchestrator"), stack.user_id))
+
+    output = {"config": config, "environment": results.environment(), **measured}
+    if args.output:
+        results.save(args.output, output)
+
+    if args.baseline:
+        regressions = results.compare(
+            output["endpoints"],
+            results.load(args.baseline)["endpoints"],
+            lower_is_better=("p50_ms", "p95_ms", "p99_ms", "error_rate"),
+            higher_is_better=("throughput_rps",),
+            tolerance=args.tolerance
+        )
+        if not results.print_regressions(regressions, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
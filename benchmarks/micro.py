@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks for building, validating and serializing the orchestrator's
+SearchResponse at different result counts, comparing the default FastAPI
+path with the fast path (orjson, no re-validation of trusted results).
+
+    python benchmarks/micro.py
+    python benchmarks/micro.py --baseline benchmarks/baseline/micro.json
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Callable, Dict
+import orjson
+from fastapi.encoders import jsonable_encoder
+import results
+from fake_azure import make_document
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_orchestrator():
+    """
+    The orchestrator's SearchResponse model and fast-path JSON encoder
+    (importing them builds the orchestrator app, which is not started)
+    """
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("TRACING_EXPORTER", "none")
+    sys.path.insert(0, os.path.join(ROOT, "orchestrator-service"))
+    from app.models.schemas import SearchResponse
+    from app.core.responses import dumps
+    return SearchResponse, dumps
+
+def search_payload(count: int, doc_bytes: int) -> Dict:
+    """
+    A search service response as the orchestrator receives it
+    """
+    return {
+        "status": "success",
+        "count": count,
+        "results": [make_document(i, "luxury spa", doc_bytes) for i in range(count)],
+        "next_cursor": "eyJza2lwIjogNTB9"
+    }
+
+def cases(SearchResponse, dumps, payload: Dict) -> Dict[str, Callable[[], object]]:
+    response = SearchResponse(**payload, search_id="a7c3e1f0-3d4b-4d0c-9a5e-2f1b6c8d9e0a")
+    raw = json.dumps(payload).encode()
+    return {
+        # Decoding the upstream body and building the response model
+        "decode": lambda: json.loads(raw),
+        "validate": lambda: SearchResponse(**payload),
+        # What FastAPI does with a returned model: re-validate it against
+        # response_model, make it JSON-compatible, then encode it
+        "fastapi_serialize": lambda: json.dumps(
+            jsonable_encoder(SearchResponse.validate(response.dict())),
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8"),
+        "model_json": lambda: response.json().encode("utf-8"),
+        "end_to_end": lambda: json.dumps(
+            jsonable_encoder(SearchResponse(**json.loads(raw)))
+        ).encode("utf-8"),
+        # The fast path: orjson decoding, an unvalidated model, orjson encoding
+        "fast_decode": lambda: orjson.loads(raw),
+        "fast_construct": lambda: SearchResponse.construct(**payload),
+        "fast_serialize": lambda: dumps(response),
+        "fast_end_to_end": lambda: dumps(SearchResponse.construct(**orjson.loads(raw)))
+    }
+
+def measure(fn: Callable[[], object], min_time: float) -> float:
+    """
+    Best-of-5 time per call, in microseconds
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,1000", help="result counts to benchmark")
+    parser.add_argument("--doc-bytes", type=int, default=500)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare with a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    SearchResponse, dumps = load_orchestrator()
+    benchmarks: Dict[str, Dict[str, float]] = {}
+    print(f"{'benchmark':<32}{'us/op':>12}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        payload = search_payload(size, args.doc_bytes)
+        for name, fn in cases(SearchResponse, dumps, payload).items():
+            key = f"{name}[{size}]"
+            benchmarks[key] = {"us_per_op": measure(fn, args.min_time)}
+            print(f"{key:<32}{benchmarks[key]['us_per_op']:>12.1f}")
+
+    output = {
+        "config": {"sizes": args.sizes, "doc_bytes": args.doc_bytes},
+        "environment": results.environment(),
+        "benchmarks": benchmarks
+    }
+    if args.output:
+        results.save(args.output, output)
+
+    if args.baseline:
+        regressions = results.compare(
+            benchmarks,
+            results.load(args.baseline)["benchmarks"],
+            lower_is_better=("us_per_op",),
+            higher_is_better=(),
+            tolerance=args.tolerance
+        )
+        if not results.print_regressions(regressions, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import math
+import platform
+import sys
+from datetime import datetime
+from typing import Dict, Any, List, Sequence, Tuple
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def environment() -> Dict[str, Any]:
+    """
+    Where a result was measured; numbers are only comparable on like hosts
+    """
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "recorded_at": datetime.utcnow().isoformat() + "Z"
+    }
+
+def save(path: str, results: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    lower_is_better: Sequence[str],
+    higher_is_better: Sequence[str],
+    tolerance: float
+) -> List[Tuple[str, str, float, float]]:
+    """
+    Regressions of `current` against `baseline`, as (name, metric, baseline,
+    current) for every metric that got worse by more than `tolerance`
+    (a fraction). Entries missing from either side are ignored.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        now = current.get(name)
+        if now is None:
+            continue
+        for metric in lower_is_better:
+            if metric in base and metric in now and now[metric] > base[metric] * (1 + tolerance):
+                regressions.append((name, metric, base[metric], now[metric]))
+        for metric in higher_is_better:
+            if metric in base and metric in now and now[metric] < base[metric] * (1 - tolerance):
+                regressions.append((name, metric, base[metric], now[metric]))
+    return regressions
+
+def print_regressions(regressions: List[Tuple[str, str, float, float]], tolerance: float) -> bool:
+    """
+    Print regressions; returns True if there were none
+    """
+    if not regressions:
+        print(f"\nNo regressions beyond {tolerance:.0%} of the baseline")
+        return True
+    print(f"\nRegressions beyond {tolerance:.0%} of the baseline:")
+    for name, metric, base, now in regressions:
+        print(f"  {name}: {metric} {base:.4g} -> {now:.4g} ({(now - base) / base:+.1%})")
+    return False
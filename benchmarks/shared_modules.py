@@ -0,0 +1,79 @@
+"""
+Core modules that several services carry their own copy of, since each
+service is built and deployed from its own directory. The copies must stay
+byte-for-byte identical: make a change in one copy, then copy it to the
+others with --sync.
+
+    python benchmarks/shared_modules.py                              # list copies that differ, exit 1 if any
+    python benchmarks/shared_modules.py --sync orchestrator-service  # copy that service's versions to the others
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICES = ("orchestrator-service", "search-service", "user-history-service")
+
+# Module path within a service -> the services that carry a copy
+SHARED: Dict[str, Tuple[str, ...]] = {
+    "app/core/compression.py": SERVICES,
+    "app/core/deadline.py": SERVICES,
+    "app/core/metrics.py": SERVICES,
+    "app/core/responses.py": SERVICES,
+    "app/core/structured_logging.py": SERVICES,
+    "app/core/telemetry.py": SERVICES,
+    "app/core/history_keys.py": ("orchestrator-service", "user-history-service")
+}
+
+def differing() -> List[Tuple[str, str, str]]:
+    """
+    (module, first service, differing service) for every copy that is not
+    identical to the first service's
+    """
+    found = []
+    for module, services in SHARED.items():
+        first = os.path.join(ROOT, services[0], module)
+        for service in services[1:]:
+            if not filecmp.cmp(first, os.path.join(ROOT, service, module), shallow=False):
+                found.append((module, services[0], service))
+    return found
+
+def sync(source: str) -> List[str]:
+    """
+    Copy the source service's shared modules over the other copies and
+    return the paths written
+    """
+    written = []
+    for module, services in SHARED.items():
+        if source not in services:
+            continue
+        for service in services:
+            target = os.path.join(ROOT, service, module)
+            if service != source and not filecmp.cmp(os.path.join(ROOT, source, module), target, shallow=False):
+                shutil.copyfile(os.path.join(ROOT, source, module), target)
+                written.append(os.path.join(service, module))
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sync", metavar="SERVICE", choices=SERVICES,
+        help="copy this service's shared modules to the others"
+    )
+    args = parser.parse_args()
+
+    if args.sync:
+        for path in sync(args.sync):
+            print(f"updated {path}")
+        return
+    found = differing()
+    for module, first, service in found:
+        print(f"{service}/{module} differs from {first}/{module}")
+    sys.exit(1 if found else 0)
+
+if __name__ == "__main__":
+    main()
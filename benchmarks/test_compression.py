@@ -0,0 +1,62 @@
+"""
+CompressionMiddleware error bodies are valid JSON and every compressible
+response varies on Accept-Encoding.
+
+    python -m pytest benchmarks/test_compression.py
+"""
+import asyncio
+import gzip
+import importlib.util
+import os
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded from its file: the services' `app` packages cannot share a process
+spec = importlib.util.spec_from_file_location(
+    "compression", os.path.join(ROOT, "orchestrator-service", "app", "core", "compression.py")
+)
+compression = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(compression)
+
+async def small(request):
+    return JSONResponse({"ok": True}, headers={"Vary": "Origin"})
+
+async def large(request):
+    return JSONResponse({"text": "x" * 4096})
+
+def request(method: str, path: str, **kwargs) -> httpx.Response:
+    app = Starlette(routes=[Route("/small", small, methods=["GET", "POST"]), Route("/large", large)])
+    middleware = compression.CompressionMiddleware(app, minimum_size=1024)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(run())
+
+def test_unsupported_encoding_error_is_valid_json():
+    encoding = 'x"\\y'
+    response = request("POST", "/small", content=b"{}", headers={"Content-Encoding": encoding})
+    assert response.status_code == 415
+    assert response.json() == {"detail": f"Unsupported Content-Encoding: {encoding}"}
+
+def test_uncompressed_responses_vary_on_accept_encoding():
+    below_threshold = request("GET", "/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in below_threshold.headers
+    assert below_threshold.headers["vary"] == "Origin, Accept-Encoding"
+    identity = request("GET", "/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+
+def test_large_responses_are_compressed():
+    response = request("GET", "/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == {"text": "x" * 4096}
+
+def test_gzip_request_bodies_are_decompressed():
+    response = request("POST", "/small", content=gzip.compress(b"{}"), headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 200
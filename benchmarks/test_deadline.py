@@ -0,0 +1,54 @@
+"""
+DeadlineMiddleware answers 504 when no response has started by the
+deadline, but does not cut short a body streamed past it.
+
+    python -m pytest benchmarks/test_deadline.py
+"""
+import asyncio
+import importlib.util
+import os
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded from its file: the services' `app` packages cannot share a process
+spec = importlib.util.spec_from_file_location(
+    "deadline", os.path.join(ROOT, "orchestrator-service", "app", "core", "deadline.py")
+)
+deadline = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(deadline)
+
+async def slow(request):
+    await asyncio.sleep(1)
+    return JSONResponse({"late": True})
+
+async def stream(request):
+    async def chunks():
+        for index in range(5):
+            await asyncio.sleep(0.1)
+            # Work done for the body is no longer bound by the deadline
+            deadline.check()
+            yield f"{index} {deadline.remaining()}\n".encode()
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+def get(path: str, timeout: float) -> httpx.Response:
+    app = Starlette(routes=[Route("/api/slow", slow), Route("/api/stream", stream)])
+    middleware = deadline.DeadlineMiddleware(app, default_timeout=timeout)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+            return await client.get(path)
+    return asyncio.run(run())
+
+def test_response_not_started_by_the_deadline_is_a_504():
+    response = get("/api/slow", 0.2)
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded"}
+
+def test_streamed_body_outlives_the_deadline():
+    response = get("/api/stream", 0.2)
+    assert response.status_code == 200
+    assert response.text.splitlines() == [f"{index} None" for index in range(5)]
@@ -0,0 +1,56 @@
+"""
+History upkeep drops the months past retention, after rolling them up, and
+counts the saved searches that went with them.
+
+    python -m pytest benchmarks/test_history_retention.py
+"""
+import asyncio
+import uuid
+from datetime import date, datetime
+
+def test_expired_months_are_rolled_up_and_dropped(history_tables):
+    engine, users, search_history, _ = history_tables
+    from app.db.database import database, history_user_monthly
+    from app.services.history_maintenance import HistoryMaintenance
+
+    user_id = str(uuid.uuid4())
+    months = [date(2020, month, 1) for month in range(1, 7)]
+    with engine.begin() as conn:
+        conn.execute(users.insert(), [{"id": user_id, "username": user_id, "email": f"{user_id}@example.com"}])
+        conn.execute(search_history.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "search_text": f"query {month.month}",
+                "search_fields": ["hotelName"],
+                "saved": month.month == 2,
+                "created_at": datetime(month.year, month.month, 10),
+                "created_month": month,
+                "search_key": uuid.uuid4().hex,
+                "use_count": 3,
+                "last_used": datetime(month.year, month.month, 10)
+            }
+            for month in months
+        ])
+
+    async def run():
+        await database.connect()
+        try:
+            return await HistoryMaintenance(retention_months=2).run_once(date(2020, 6, 15))
+        finally:
+            await database.disconnect()
+    summary = asyncio.run(run())
+
+    assert summary["months_dropped"] == ["2020-01-01", "2020-02-01", "2020-03-01"]
+    assert summary["saved_searches_dropped"] == 1
+    with engine.connect() as conn:
+        kept = conn.execute(
+            search_history.select().where(search_history.c.user_id == user_id)
+        ).fetchall()
+        rolled_up = conn.execute(
+            history_user_monthly.select().where(history_user_monthly.c.user_id == user_id)
+        ).fetchall()
+    assert sorted(row.created_month for row in kept) == months[3:]
+    assert {row.month: row.searches for row in rolled_up} == {
+        month: 3 for month in [*months[:3], *months[4:]]
+    }
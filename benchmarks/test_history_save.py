@@ -0,0 +1,41 @@
+"""
+Saving a search finds its entry by the month carried in its ID, and still
+finds entries whose IDs carry no month.
+
+    python -m pytest benchmarks/test_history_save.py
+"""
+import uuid
+import httpx
+
+def record(stack, user_id: str, **fields) -> str:
+    response = httpx.post(stack.url("history") + "/api/history", json={
+        "user_id": user_id, "search_text": uuid.uuid4().hex, "search_fields": ["hotelName"], **fields
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def save(stack, user_id: str, search_id: str) -> httpx.Response:
+    return httpx.post(stack.url("orchestrator") + "/api/search/save", json={
+        "user_id": user_id, "search_id": search_id, "search_name": "mine"
+    })
+
+def test_ids_carry_the_month_of_their_entry(stack, user_id):
+    search_id = record(stack, user_id, created_at="2024-05-17T08:00:00")
+    assert search_id.startswith("202405")
+    response = save(stack, user_id, search_id)
+    assert response.status_code == 200, response.text
+    assert response.json()["saved"] is True
+
+def test_id_with_another_month_is_not_found(stack, user_id):
+    search_id = record(stack, user_id, created_at="2024-05-17T08:00:00")
+    assert save(stack, user_id, "202406" + search_id[6:]).status_code == 404
+
+def test_ids_without_a_month_are_still_saved(stack, user_id):
+    search_id = str(uuid.uuid4())
+    assert record(stack, user_id, id=search_id) == search_id
+    response = httpx.post(stack.url("history") + "/api/history/save/batch", json={
+        "user_id": user_id,
+        "items": [{"search_id": search_id, "search_name": "mine"}, {"search_id": str(uuid.uuid4()), "search_name": "x"}]
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["saved"] == 1
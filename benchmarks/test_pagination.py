@@ -0,0 +1,134 @@
+"""
+Search results and history are paged with opaque cursors: search pages by
+capped offsets, history pages by keyset on (last_used, id).
+
+    python -m pytest benchmarks/test_pagination.py
+"""
+import importlib.util
+import os
+from datetime import datetime
+import httpx
+import pytest
+from conftest import SEARCH_MAX_PAGE_SIZE, SEARCH_MAX_SKIP
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load(name: str, service: str):
+    # Loaded from its file: the services' `app` packages cannot share a process
+    path = os.path.join(ROOT, service, "app", "services", "pagination.py")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+search_pagination = load("search_pagination", "search-service")
+history_pagination = load("history_pagination", "user-history-service")
+
+def test_resolve_page_caps_page_size_and_offset():
+    assert search_pagination.resolve_page(None, None, None, 50, 1000, 100) == (50, 0)
+    assert search_pagination.resolve_page(5000, 7, None, 50, 1000, 100) == (1000, 7)
+    assert search_pagination.resolve_page(10, 100, None, 50, 1000, 100) == (10, 100)
+    with pytest.raises(ValueError):
+        search_pagination.resolve_page(10, 101, None, 50, 1000, 100)
+
+def test_search_cursor_takes_precedence_over_skip():
+    cursor = search_pagination.encode_cursor(30)
+    assert search_pagination.decode_cursor(cursor) == 30
+    assert search_pagination.resolve_page(10, 5, cursor, 50, 1000, 100) == (10, 30)
+    with pytest.raises(ValueError):
+        search_pagination.resolve_page(10, 0, search_pagination.encode_cursor(101), 50, 1000, 100)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", search_pagination.encode_cursor(0)[:-2] + "!!"])
+def test_malformed_search_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        search_pagination.decode_cursor(cursor)
+
+def test_history_cursor_round_trips():
+    created_at = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    cursor = history_pagination.encode_cursor(created_at, "abc")
+    assert history_pagination.decode_cursor(cursor) == (created_at, "abc")
+    with pytest.raises(ValueError):
+        history_pagination.decode_cursor(search_pagination.encode_cursor(3))
+
+def test_search_pages_follow_cursors_up_to_the_caps(stack):
+    url = stack.url("search") + "/api/search"
+    body = {"search_text": "paged", "top": 1000}
+    counts = []
+    offsets = []
+    while True:
+        response = httpx.post(url, json=body)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        counts.append(page["count"])
+        offsets.append(int(page["results"][0]["hotelId"]) - 1)
+        if page["next_cursor"] is None:
+            break
+        body = {"search_text": "paged", "top": 1000, "cursor": page["next_cursor"]}
+    # The fake endpoint has 50 results: pages of the capped size, then the rest
+    assert counts == [SEARCH_MAX_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE, 50 - 2 * SEARCH_MAX_PAGE_SIZE]
+    assert offsets == [0, SEARCH_MAX_PAGE_SIZE, 2 * SEARCH_MAX_PAGE_SIZE]
+
+def test_search_past_the_skip_cap_is_a_400(stack):
+    response = httpx.post(stack.url("search") + "/api/search", json={"search_text": "x", "skip": SEARCH_MAX_SKIP + 1})
+    assert response.status_code == 400
+    response = httpx.post(stack.url("orchestrator") + "/api/search", headers={"user_id": stack.user_id},
+                          json={"search_text": "x", "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def record(stack, user_id: str, entries):
+    response = httpx.post(stack.url("history") + "/api/history/batch", json={"items": [
+        {"user_id": user_id, "search_text": text, "search_fields": ["hotelName"], "created_at": created_at}
+        for text, created_at in entries
+    ]})
+    assert response.status_code == 200, response.text
+    return response.json()["ids"]
+
+def read_pages(url: str, limit: int):
+    entries = []
+    pages = 0
+    cursor = None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = httpx.get(url, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit
+        entries.extend(page)
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return entries, pages
+        assert len(page) == limit
+
+@pytest.mark.parametrize("service, path", [("history", "/api/history/user/{}"), ("orchestrator", "/api/history/{}")])
+def test_history_pages_cover_entries_with_tied_timestamps_once(stack, user_id, service, path):
+    # Five searches at the same instant straddle page boundaries
+    tied = "2024-05-01T12:00:00"
+    ids = record(stack, user_id, [
+        ("newest", "2024-05-02T09:00:00"),
+        *[(f"tied {index}", tied) for index in range(5)],
+        ("oldest", "2024-04-30T09:00:00")
+    ])
+    entries, pages = read_pages(stack.url(service) + path.format(user_id), 2)
+    assert pages == 4
+    assert [entry["id"] for entry in entries] == [ids[0], *sorted(ids[1:6], reverse=True), ids[6]]
+
+def test_malformed_history_cursor_is_a_400(stack, user_id):
+    urls = (stack.url("history") + f"/api/history/user/{user_id}", stack.url("orchestrator") + f"/api/history/{user_id}")
+    for url in urls:
+        response = httpx.get(url, params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400, response.text
+
+def test_repeated_search_moves_to_the_front_of_history(stack, user_id):
+    ids = record(stack, user_id, [
+        ("first", "2024-05-01T09:00:00"),
+        ("second", "2024-05-01T10:00:00"),
+        ("third", "2024-05-01T11:00:00")
+    ])
+    assert record(stack, user_id, [("first", "2024-05-01T12:00:00")]) == [ids[0]]
+    entries, _ = read_pages(stack.url("history") + f"/api/history/user/{user_id}", 2)
+    assert [entry["id"] for entry in entries] == [ids[0], ids[2], ids[1]]
+    assert entries[0]["use_count"] == 2
+    assert entries[0]["created_at"].startswith("2024-05-01T09:00:00")
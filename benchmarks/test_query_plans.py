@@ -0,0 +1,19 @@
+"""
+The history service's page queries must be read straight off the
+search_history indexes on SQLite, without a table scan or a sort.
+
+    python -m pytest benchmarks/test_query_plans.py
+"""
+import query_plans
+
+def test_history_pages_are_served_from_indexes(history_tables):
+    engine, users, search_history, history_page_query = history_tables
+    rows_per_user = 500
+    user_ids = query_plans.seed(engine, users, search_history, 5, rows_per_user)
+
+    with engine.connect() as conn:
+        queries = list(query_plans.page_queries(conn, history_page_query, user_ids[2], rows_per_user, 50))
+        assert len(queries) == 6
+        for name, query in queries:
+            details, problem = query_plans.sqlite_plan(conn, query)
+            assert problem is None, f"{name} {problem}: {details}"
@@ -0,0 +1,46 @@
+"""
+Orchestrator batches are deduplicated and sent to the search service in
+one /api/search/batch call, with one result or error per search.
+
+    python -m pytest benchmarks/test_search_batch.py
+"""
+import re
+import uuid
+import httpx
+
+def search_service_requests(stack, route: str) -> float:
+    metrics = httpx.get(stack.url("search") + "/metrics").text
+    pattern = r'^http_requests_total\{[^}]*route="' + re.escape(route) + r'"[^}]*\} (\S+)$'
+    return sum(float(value) for value in re.findall(pattern, metrics, re.M))
+
+def test_batch_is_one_search_service_call(stack):
+    text = uuid.uuid4().hex
+    before = (search_service_requests(stack, "/api/search/batch"), search_service_requests(stack, "/api/search"))
+    response = httpx.post(stack.url("orchestrator") + "/api/search/batch", headers={"user_id": stack.user_id}, json={
+        "searches": [
+            {"search_text": text, "top": 2},
+            {"search_text": text + "-other", "top": 3},
+            {"search_text": text, "top": 2},
+            {"search_text": text, "cursor": "not-a-cursor"}
+        ]
+    })
+    assert response.status_code == 200, response.text
+    items = response.json()["results"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3]
+    assert [item["count"] for item in items[:3]] == [2, 3, 2]
+    assert items[0]["results"] == items[2]["results"]
+    assert items[0]["search_id"] is not None and items[0]["search_id"] == items[2]["search_id"]
+    assert items[3]["status"] == "error" and items[3]["error"]["status_code"] == 400
+    after = (search_service_requests(stack, "/api/search/batch"), search_service_requests(stack, "/api/search"))
+    assert after[0] - before[0] == 1
+    assert after[1] == before[1]
+
+def test_cached_batch_searches_are_not_sent_again(stack):
+    body = {"searches": [{"search_text": uuid.uuid4().hex}]}
+    url = stack.url("orchestrator") + "/api/search/batch"
+    first = httpx.post(url, headers={"user_id": stack.user_id}, json=body)
+    before = search_service_requests(stack, "/api/search/batch")
+    second = httpx.post(url, headers={"user_id": stack.user_id}, json=body)
+    assert first.status_code == second.status_code == 200
+    assert first.json()["results"][0]["results"] == second.json()["results"][0]["results"]
+    assert search_service_requests(stack, "/api/search/batch") == before
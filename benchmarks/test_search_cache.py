@@ -0,0 +1,25 @@
+"""
+Search cache keys are built from the validated request, so bodies the
+search service would coerce or reject do not fail inside the orchestrator.
+
+    python -m pytest benchmarks/test_search_cache.py
+"""
+import httpx
+
+def search(stack, body):
+    return httpx.post(stack.url("orchestrator") + "/api/search", json=body, headers={"user_id": stack.user_id})
+
+def test_coercible_field_list_is_searched(stack):
+    response = search(stack, {"search_text": "x", "top": 1, "search_fields": [1, "hotelName"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["count"] == 1
+
+def test_field_lists_in_any_order_share_a_cache_key(stack):
+    first = search(stack, {"search_text": "cached", "search_fields": ["hotelName", "description"]})
+    second = search(stack, {"search_text": "cached", "search_fields": ["description", "hotelName", "hotelName"]})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["results"] == second.json()["results"]
+
+def test_malformed_field_list_is_rejected(stack):
+    response = search(stack, {"search_text": "x", "top": 1, "search_fields": [["a"]]})
+    assert response.status_code == 422, response.text
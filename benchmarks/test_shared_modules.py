@@ -0,0 +1,9 @@
+"""
+Every service's copy of a shared core module is identical.
+
+    python -m pytest benchmarks/test_shared_modules.py
+"""
+import shared_modules
+
+def test_shared_module_copies_are_identical():
+    assert shared_modules.differing() == [], "run: python benchmarks/shared_modules.py --sync <service you edited>"
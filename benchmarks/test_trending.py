@@ -0,0 +1,32 @@
+"""
+Trending tracks at most TRENDING_MAX_CATEGORIES categories besides the
+global one, and ranks with a bounded selection that is reused within the
+ranking TTL.
+
+    python -m pytest benchmarks/test_trending.py
+"""
+import hashlib
+
+def key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def test_at_most_max_categories_are_tracked(history_tables):
+    from app.services.trending import TrendingTracker
+
+    tracker = TrendingTracker(max_categories=2)
+    for category in ("a", "b", "c"):
+        tracker.record(key(category), category, category)
+    assert tracker.categories == {"a", "b"}
+    assert tracker.top("trending", "c") == []
+    assert len(tracker.top("trending")) == 3
+
+def test_ranking_is_highest_first_and_grows_with_the_limit(history_tables):
+    from app.services.trending import TrendingTracker
+
+    tracker = TrendingTracker(ranking_ttl=60)
+    for count, text in enumerate(("one", "two", "three", "four"), start=1):
+        for _ in range(count):
+            tracker.record(key(text), text)
+    assert [item["search_text"] for item in tracker.top("trending", limit=2)] == ["four", "three"]
+    # A larger limit within the TTL is not cut to the cached two
+    assert [item["search_text"] for item in tracker.top("trending", limit=10)] == ["four", "three", "two", "one"]
@@ -1,9 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from app.api.routes import router as api_router
-from app.core.config import settings, logger
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-import httpx
-import json
+from app.api.debug import router as debug_router
+from app.services.factory import http_pool, get_history_writer, get_admission_controller, get_health_monitor
+from app.core.config import settings
+from app.core.deadline import DeadlineMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.telemetry import instrument_app
+from app.core import metrics
+from app.core.responses import FastJSONResponse
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -11,49 +17,85 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse if settings.FAST_RESPONSES_ENABLED else metrics.TimedJSONResponse
 )
 
 # Add OpenTelemetry instrumentation to FastAPI
-if settings.APPINSIGHTS_CONNECTION_STRING:
-    FastAPIInstrumentor.instrument_app(app)
+instrument_app(app)
+
+# Compress responses and accept gzip request bodies
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        max_request_size=settings.COMPRESSION_MAX_REQUEST_SIZE
+    )
+
+# Cancel /api requests that outlive their deadline
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=settings.REQUEST_DEADLINE_DEFAULT,
+    max_timeout=settings.REQUEST_DEADLINE_MAX
+)
+
+# Shed excess /api load before any work is done
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=get_admission_controller())
+
+# Request counts and latency per route, including shed requests
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(api_router)
+if settings.DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug_router)
+
+@app.on_event("startup")
+async def startup():
+    # Open one pooled client per upstream for the lifetime of the app
+    for base_url in (settings.SEARCH_SERVICE_URL, settings.USER_HISTORY_SERVICE_URL):
+        http_pool.client_for(base_url)
+    await get_history_writer().start()
+    await get_health_monitor().start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await get_health_monitor().stop()
+    # Flush queued history events before closing upstream connections
+    await get_history_writer().stop()
+    # Close pooled upstream connections
+    await http_pool.aclose()
 
 @app.get("/health")
 async def health_check():
-    healthy = True
-    services_status = {}
-    
-    async with httpx.AsyncClient() as client:
-        # Check search service health
-        try:
-            search_response = await client.get(f"{settings.SEARCH_SERVICE_URL}/health")
-            services_status["search_service"] = "healthy" if search_response.status_code == 200 else "unhealthy"
-            if search_response.status_code != 200:
-                healthy = False
-                logger.error(f"Search service health check failed: {search_response.status_code} - {search_response.text}")
-        except Exception as e:
-            services_status["search_service"] = "unreachable"
-            healthy = False
-            logger.error(f"Failed to reach search service: {str(e)}")
-        
-        # Check user history service health
-        try:
-            user_history_response = await client.get(f"{settings.USER_HISTORY_SERVICE_URL}/health")
-            services_status["user_history_service"] = "healthy" if user_history_response.status_code == 200 else "unhealthy"
-            if user_history_response.status_code != 200:
-                healthy = False
-                logger.error(f"User history service health check failed: {user_history_response.status_code} - {user_history_response.text}")
-        except Exception as e:
-            services_status["user_history_service"] = "unreachable"
-            healthy = False
-            logger.error(f"Failed to reach user history service: {str(e)}")
-    
-    status = {
-        "status": "healthy" if healthy else "unhealthy",
-        "services": services_status
-    }
-    logger.info(f"Health check result: {json.dumps(status, indent=2)}")
-    return status
- 
\ No newline at end of file
+    """
+    Cached dependency health; probes run in the background, so polling this
+    endpoint causes no upstream traffic
+    """
+    return get_health_monitor().status()
+
+@app.get("/health/live")
+async def liveness():
+    """
+    The process is up and serving requests
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    200 when every dependency was healthy in a recent probe, 503 otherwise
+    """
+    monitor = get_health_monitor()
+    return JSONResponse(monitor.status(), status_code=200 if monitor.is_ready() else 503)
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """
+        Request and stage latency histograms in the Prometheus text format
+        """
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
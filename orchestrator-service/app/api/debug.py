@@ -0,0 +1,47 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from app.core.config import settings
+from app.services.factory import http_pool, get_history_writer, get_search_cache, get_resilience_policy, get_admission_controller
+
+router = APIRouter(prefix="/debug")
+
+@router.get("/http-pool", response_model=Dict[str, Any])
+async def http_pool_stats():
+    """
+    Connection pool utilization per upstream service
+    """
+    return http_pool.stats()
+
+@router.get("/history-queue", response_model=Dict[str, Any])
+async def history_queue_stats():
+    """
+    Write-behind history queue depth, drops and delivery counters
+    """
+    return get_history_writer().stats()
+
+@router.get("/search-cache", response_model=Dict[str, Any])
+async def search_cache_stats():
+    """
+    Search result cache size and hit/miss/coalesce counters
+    """
+    cache = get_search_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/resilience", response_model=Dict[str, Any])
+async def resilience_stats():
+    """
+    Circuit breaker state, retry budget and hedging counters per upstream
+    """
+    return {
+        base_url: get_resilience_policy(base_url).stats()
+        for base_url in (settings.SEARCH_SERVICE_URL, settings.USER_HISTORY_SERVICE_URL)
+    }
+
+@router.get("/admission", response_model=Dict[str, Any])
+async def admission_stats():
+    """
+    Adaptive concurrency limit, in-flight requests and shed counts
+    """
+    return {"enabled": settings.ADMISSION_ENABLED, **get_admission_controller().stats()}
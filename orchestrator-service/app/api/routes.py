@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, Header, Body
+from fastapi import APIRouter, HTTPException, Depends, Request, Header, Response, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
-from app.models.schemas import SearchRequest, SaveSearchRequest, SearchResponse
-from app.services.factory import get_search_service, get_user_history_service
+from functools import lru_cache
+from app.models.schemas import (
+    SearchRequest, SaveSearchRequest, SaveSearchBatchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse
+)
+from app.services.factory import get_search_service, get_user_history_service, get_history_writer
 from app.services.orchestrator import OrchestratorService
-from app.core.config import tracer
+from app.services.streaming import NDJSON_MEDIA_TYPE, wants_ndjson
+from app.services.user_history_service import NEXT_CURSOR_HEADER
+from app.core.config import settings
+from app.core.structured_logging import payload
+from app.core.responses import FastJSONResponse
 from opentelemetry import trace
 from opentelemetry.trace.status import Status, StatusCode
 import logging
@@ -14,16 +22,46 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api")
 
-# Dependency injection
+# Dependency injection (one orchestrator per process so upstream clients and
+# their connection pools are reused across requests)
+@lru_cache()
 def get_orchestrator_service():
     search_service = get_search_service()
     user_history_service = get_user_history_service()
-    return OrchestratorService(search_service, user_history_service)
+    history_writer = get_history_writer()
+    return OrchestratorService(search_service, user_history_service, history_writer)
 
-@router.post("/search", response_model=SearchResponse)
+def respond(content: Any):
+    """
+    Return trusted content directly as an orjson response, skipping FastAPI's
+    re-validation against response_model (unless fast responses are off)
+    """
+    if settings.FAST_RESPONSES_ENABLED:
+        return FastJSONResponse(content)
+    return content
+
+# The search body is read from the request directly (so pass-through mode can
+# relay it undecoded); document it for OpenAPI explicitly
+SEARCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": SearchRequest.schema(),
+                "example": {"search_text": "nice", "search_fields": ["hotelName", "description"]}
+            }
+        }
+    }
+}
+
+@router.post(
+    "/search",
+    response_model=SearchResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    openapi_extra=SEARCH_REQUEST_BODY
+)
 async def search(
     request: Request,
-    body: Dict[str, Any] = Body(..., example={"search_text": "nice", "search_fields": ["hotelName", "description"]}),
     user_id: str = Header(..., description="User ID for tracking search history", alias="user_id"),
     orchestrator: OrchestratorService = Depends(get_orchestrator_service)
 ):
@@ -34,7 +72,23 @@ async def search(
     - search_text: The text to search for (required)
     - search_fields: List of fields to search in (optional, default: ["hotelName", "description", "category"])
     - select: List of fields to return (optional, default: ["hotelId", "hotelName", "description", "category"])
+    
+    With SEARCH_PASSTHROUGH_ENABLED the search service response is relayed
+    as raw bytes instead of being decoded and re-validated.
+    
+    Send `Accept: application/x-ndjson` to receive one JSON line per result,
+    streamed as it arrives, followed by a summary record carrying `count`
+    and `search_id`.
     """
+    # Parse the body once; the raw bytes stay cached on the request
+    try:
+        raw_body = await request.body()
+        body = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON body: {str(e)}")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Search request body must be a JSON object")
+    
     # Generate a unique request ID
     request_id = str(uuid.uuid4())
     
@@ -48,6 +102,21 @@ async def search(
         # Log the start of the request
         logger.info(f"Starting search request {request_id} from user: {user_id}")
         
+        if wants_ndjson(request.headers.get("accept")):
+            chunks = await orchestrator.process_search_stream(raw_body, body, user_id)
+            current_span.set_status(Status(StatusCode.OK))
+            logger.info(f"Search request {request_id} streaming results")
+            return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+        
+        if settings.SEARCH_PASSTHROUGH_ENABLED:
+            content, count = await orchestrator.process_search_raw(raw_body, body, user_id)
+            headers = {"X-Result-Count": str(count)} if count is not None else None
+            if count is not None:
+                current_span.set_attribute("search.results.count", count)
+            current_span.set_status(Status(StatusCode.OK))
+            logger.info(f"Search request {request_id} completed successfully (pass-through)")
+            return Response(content=content, media_type="application/json", headers=headers)
+        
         # Process the search request
         response = await orchestrator.process_search(request, user_id)
         
@@ -57,7 +126,7 @@ async def search(
         current_span.set_status(Status(StatusCode.OK))
         
         logger.info(f"Search request {request_id} completed successfully")
-        return response
+        return respond(response)
         
     except HTTPException as e:
         # Add error information to the span
@@ -83,6 +152,40 @@ async def search(
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_msg)
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    user_id: str = Header(..., description="User ID for tracking search history", alias="user_id"),
+    orchestrator: OrchestratorService = Depends(get_orchestrator_service)
+):
+    """
+    Execute several searches in one request
+    
+    Identical searches are executed once, distinct ones are sent to the
+    search service in one call and run there concurrently, and history is
+    recorded for the whole batch together. Each item in the response
+    carries its own result or error, in request order.
+    """
+    if len(request.searches) > settings.SEARCH_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {settings.SEARCH_BATCH_MAX_ITEMS} searches"
+        )
+    
+    try:
+        logger.info(f"Starting batch of {len(request.searches)} searches from user: {user_id}")
+        bodies = [search.dict(exclude_unset=True, exclude={"user_id"}) for search in request.searches]
+        results = await orchestrator.process_search_batch(bodies, user_id)
+        logger.info(f"Batch of {len(results)} searches completed")
+        return respond({"results": results})
+    except HTTPException as e:
+        logger.error(f"HTTP error during batch search: {str(e)}")
+        raise
+    except Exception as e:
+        error_msg = f"Unexpected error during batch search: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+
 @router.post("/search/save", response_model=Dict[str, Any])
 async def save_search(
     request: SaveSearchRequest,
@@ -92,10 +195,10 @@ async def save_search(
     Save a search with a name
     """
     try:
-        logger.info(f"Received save search request: {request.dict()}")
+        logger.debug("Received save search request: %s", payload(request))
         response = await orchestrator.save_search(request)
-        logger.info(f"Search saved successfully: {response}")
-        return response
+        logger.debug("Search saved successfully: %s", payload(response))
+        return respond(response)
     except HTTPException as e:
         logger.error(f"HTTP error during save search: {str(e)}")
         raise
@@ -104,24 +207,74 @@ async def save_search(
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_msg)
 
+@router.post("/search/save/batch", response_model=Dict[str, Any])
+async def save_searches(
+    request: SaveSearchBatchRequest,
+    orchestrator: OrchestratorService = Depends(get_orchestrator_service)
+):
+    """
+    Save or rename several searches at once. Searches that do not exist or
+    belong to another user are listed in `rejected`.
+    """
+    try:
+        logger.debug("Received batch save request: %s", payload(request))
+        response = await orchestrator.save_searches(request)
+        return respond(response)
+    except HTTPException as e:
+        logger.error(f"HTTP error during batch save: {str(e)}")
+        raise
+    except Exception as e:
+        error_msg = f"Unexpected error during batch save: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+
 @router.get("/history/{user_id}", response_model=List[Dict[str, Any]])
 async def get_user_history(
     user_id: str,
+    response: Response,
     saved: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, description="Entries per page (capped by the history service)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     orchestrator: OrchestratorService = Depends(get_orchestrator_service)
 ):
     """
-    Get search history for a user
+    Get a page of a user's search history, newest first. The next page's
+    cursor is returned in X-Next-Cursor, which is absent on the last page.
     """
     try:
         logger.info(f"Retrieving search history for user {user_id} (saved={saved})")
-        response = await orchestrator.get_user_search_history(user_id, saved)
-        logger.info(f"Retrieved {len(response)} history entries")
-        return response
+        entries, next_cursor = await orchestrator.get_user_search_history(user_id, saved, limit, cursor)
+        logger.info(f"Retrieved {len(entries)} history entries")
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        if settings.FAST_RESPONSES_ENABLED:
+            return FastJSONResponse(entries, headers=headers)
+        response.headers.update(headers)
+        return entries
     except HTTPException as e:
         logger.error(f"HTTP error during history retrieval: {str(e)}")
         raise
     except Exception as e:
         error_msg = f"Unexpected error during history retrieval: {str(e)}"
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=error_msg) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=error_msg)
+
+@router.get("/trending", response_model=Dict[str, Any])
+async def get_trending(
+    window: str = Query("trending", regex="^(trending|popular)$", description="trending (recent) or popular (long-term)"),
+    category: Optional[str] = Query(None, description="Only searches made in this category"),
+    limit: Optional[int] = Query(None, ge=1, description="Searches to return (default 10, capped by the history service)"),
+    orchestrator: OrchestratorService = Depends(get_orchestrator_service)
+):
+    """
+    Get the highest scoring popular or trending searches, overall or in the
+    `category` given with the searches
+    """
+    try:
+        return respond(await orchestrator.get_trending(window, category, limit))
+    except HTTPException as e:
+        logger.error(f"HTTP error during trending retrieval: {str(e)}")
+        raise
+    except Exception as e:
+        error_msg = f"Unexpected error during trending retrieval: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
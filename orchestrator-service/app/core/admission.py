@@ -0,0 +1,188 @@
+import json
+import math
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Priority classes; background requests may only use part of the limit so
+# that interactive searches keep headroom during spikes
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Upstream statuses that mean the system is overloaded
+_OVERLOAD_STATUSES = {429, 503, 504}
+
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrency limit that follows observed latency.
+
+    Each sample compares the short-term latency with a long-term average:
+    while latency stays within `tolerance` of the average the limit grows
+    by about sqrt(limit), and as latency rises the limit shrinks in
+    proportion (gradient). Overload responses cut the limit multiplicatively.
+    """
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        backoff_ratio: float = 0.9,
+        long_window: int = 600
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff_ratio = backoff_ratio
+        self.long_rtt: Optional[float] = None
+        self._long_alpha = 2 / (long_window + 1)
+
+    def on_sample(self, rtt: float, in_flight: int, overloaded: bool):
+        if overloaded:
+            self._set(self.limit * self.backoff_ratio)
+            return
+
+        rtt = max(rtt, 1e-6)
+        if self.long_rtt is None:
+            self.long_rtt = rtt
+        else:
+            self.long_rtt += (rtt - self.long_rtt) * self._long_alpha
+        # Let the long-term average catch up quickly once latency recovers
+        if self.long_rtt / rtt > 2:
+            self.long_rtt *= 0.95
+
+        # An underused limit says nothing about capacity
+        if in_flight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self._set(self.limit * (1 - self.smoothing) + target * self.smoothing)
+
+    def _set(self, limit: float):
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+
+class AdmissionController:
+    """
+    Admits requests while in-flight work is under the adaptive limit and
+    keeps per-priority admission and shed counters
+    """
+    def __init__(
+        self,
+        limit: AdaptiveConcurrencyLimit,
+        background_share: float,
+        retry_after: int,
+        background_paths: Tuple[str, ...] = ("/api/search/batch", "/api/history")
+    ):
+        self.limit = limit
+        self.background_share = background_share
+        self.retry_after = retry_after
+        self.background_paths = background_paths
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.in_flight_by_priority = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.admitted_total = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.shed_total = {INTERACTIVE: 0, BACKGROUND: 0}
+
+    def classify(self, path: str) -> str:
+        if path.startswith(self.background_paths):
+            return BACKGROUND
+        return INTERACTIVE
+
+    def try_acquire(self, priority: str) -> bool:
+        """
+        Admit a request of the given priority, or return False to shed it
+        """
+        capacity = self.limit.limit
+        if priority == BACKGROUND:
+            capacity *= self.background_share
+        if self.in_flight >= capacity:
+            self.shed_total[priority] += 1
+            return False
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.in_flight_by_priority[priority] += 1
+        self.admitted_total[priority] += 1
+        return True
+
+    def release(self, priority: str, rtt: Optional[float] = None, overloaded: bool = False):
+        """
+        Finish an admitted request, feeding its latency to the limit
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        self.in_flight_by_priority[priority] -= 1
+        if rtt is not None:
+            self.limit.on_sample(rtt, in_flight, overloaded)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit.limit, 2),
+            "min_limit": self.limit.min_limit,
+            "max_limit": self.limit.max_limit,
+            "long_rtt": self.limit.long_rtt,
+            "background_share": self.background_share,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "in_flight_by_priority": dict(self.in_flight_by_priority),
+            "admitted_total": dict(self.admitted_total),
+            "shed_total": dict(self.shed_total)
+        }
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds /api requests with 503 + Retry-After when the
+    orchestrator is at its concurrency limit. Latency is measured to the
+    start of the response, so long streams do not skew the limit.
+    """
+    def __init__(self, app, controller: AdmissionController, path_prefix: str = "/api"):
+        self.app = app
+        self.controller = controller
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.controller.classify(scope["path"])
+        if not self.controller.try_acquire(priority):
+            logger.warning(f"Shedding {priority} request {scope['method']} {scope['path']} "
+                           f"({self.controller.in_flight} in flight, limit {self.controller.limit.limit:.1f})")
+            await self._send_shed(send)
+            return
+
+        started = time.monotonic()
+        status: Optional[int] = None
+        rtt: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal status, rtt
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                rtt = time.monotonic() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Requests that failed before responding are not sampled
+            self.controller.release(priority, rtt, status in _OVERLOAD_STATUSES)
+
+    async def _send_shed(self, send):
+        body = json.dumps({"detail": "Service overloaded, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
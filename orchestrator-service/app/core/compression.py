@@ -0,0 +1,264 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+import logging
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Encodings this side can produce and decode, in order of preference
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Accept-Encoding to send upstream (httpx decodes br only with brotli installed)
+ACCEPT_ENCODING = ", ".join(SUPPORTED_ENCODINGS)
+
+# Content types worth compressing
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+def negotiate(accept_encoding: str, supported: Tuple[str, ...] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """
+    Pick a response encoding from an Accept-Encoding header: the highest
+    q-value wins and ties go to our preference order. None means identity.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class _Compressor:
+    """
+    Incremental compressor; flush() makes everything written so far
+    decodable, so streamed lines reach the client without waiting
+    """
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.flush() if flush else b"")
+        return self._zlib.compress(data) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+def gzip_compress(data: bytes, level: int = 6) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+class RequestTooLarge(ValueError):
+    pass
+
+def gzip_decompress(data: bytes, max_size: int) -> bytes:
+    """
+    Decompress a gzip body, refusing to inflate beyond `max_size` bytes
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = decompressor.decompress(data, max_size + 1)
+    if len(body) > max_size or decompressor.unconsumed_tail:
+        raise RequestTooLarge(f"Decompressed request body exceeds {max_size} bytes")
+    return body + decompressor.flush()
+
+async def _send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def _vary_on_accept_encoding(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """
+    Response headers with Accept-Encoding added to any Vary already set
+    """
+    values = [
+        item.strip()
+        for name, value in headers if name == b"vary"
+        for item in value.decode("latin-1").split(",") if item.strip()
+    ]
+    if "*" in values or "accept-encoding" in (item.lower() for item in values):
+        return headers
+    headers = [(name, value) for name, value in headers if name != b"vary"]
+    headers.append((b"vary", ", ".join(values + ["Accept-Encoding"]).encode()))
+    return headers
+
+class CompressionMiddleware:
+    """
+    Negotiated response compression (brotli or gzip) and gzip request body
+    decompression.
+
+    Complete responses smaller than `minimum_size` are sent as is; streamed
+    responses are compressed chunk by chunk and flushed after each chunk.
+    Every text or JSON response carries `Vary: Accept-Encoding`, whether
+    it was compressed or not, so shared caches keep the variants apart.
+    Responses that already carry a Content-Encoding, or whose type is not
+    text or JSON, are left alone.
+    """
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        max_request_size: int = 10 * 1024 * 1024
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        content_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"content-encoding":
+                content_encoding = value.decode("latin-1").strip().lower()
+
+        if content_encoding and content_encoding != "identity":
+            if content_encoding != "gzip":
+                await _send_error(send, 415, f"Unsupported Content-Encoding: {content_encoding}")
+                return
+            try:
+                receive = await self._decompress_request(scope, receive)
+            except RequestTooLarge as e:
+                await _send_error(send, 413, str(e))
+                return
+            except zlib.error:
+                await _send_error(send, 400, "Malformed gzip request body")
+                return
+
+        sender = _CompressingSender(self, send, negotiate(accept_encoding))
+        await self.app(scope, receive, sender.send)
+
+    async def _decompress_request(self, scope, receive):
+        """
+        Read and decompress a gzip request body. The headers are rewritten
+        in the request's own scope, not a copy, so that what routing records
+        in it (the matched endpoint) stays visible to outer middleware.
+        """
+        chunks: List[bytes] = []
+        received = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if received > self.max_request_size:
+                raise RequestTooLarge(f"Request body exceeds {self.max_request_size} bytes")
+            if not message.get("more_body", False):
+                break
+        body = gzip_decompress(b"".join(chunks), self.max_request_size)
+
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        delivered = False
+
+        async def decompressed_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        scope["headers"] = headers
+        return decompressed_receive
+
+class _CompressingSender:
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: Optional[str]):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the first body chunk shows the response size
+            self.start_message = message
+            return
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = self.start_message["headers"]
+            content_type = b""
+            already_encoded = False
+            for name, value in headers:
+                if name == b"content-type":
+                    content_type = value
+                elif name == b"content-encoding":
+                    already_encoded = True
+            compressible = content_type.decode("latin-1").startswith(_COMPRESSIBLE_TYPES)
+            if already_encoded or not compressible:
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            headers = _vary_on_accept_encoding(headers)
+            if self.encoding is None or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self._send({**self.start_message, "headers": headers})
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = [(name, value) for name, value in headers if name != b"content-length"]
+            headers.append((b"content-encoding", self.encoding.encode()))
+            if not more_body:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers.append((b"content-length", str(len(body)).encode()))
+                await self._send({**self.start_message, "headers": headers})
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send({**self.start_message, "headers": headers})
+
+        if more_body:
+            body = self.compressor.compress(body, flush=True)
+        else:
+            body = self.compressor.compress(body) + self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
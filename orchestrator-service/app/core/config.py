@@ -3,15 +3,9 @@ from pydantic import BaseSettings
 from typing import Optional
 from dotenv import load_dotenv
 import logging
-import sys
+from app.core.structured_logging import configure_logging
+from app.core.telemetry import configure_telemetry
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.resources import Resource
-from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
-from opentelemetry.instrumentation.logging import LoggingInstrumentor
 
 # Load .env file
 load_dotenv()
@@ -25,59 +19,153 @@ class Settings(BaseSettings):
     SEARCH_SERVICE_URL: str = os.getenv("SEARCH_SERVICE_URL", "http://search-service:5001")
     USER_HISTORY_SERVICE_URL: str = os.getenv("USER_HISTORY_SERVICE_URL", "http://user-history-service:5002")
     
-    # Azure Application Insights
-    APPINSIGHTS_CONNECTION_STRING: str = os.getenv("APPINSIGHTS_CONNECTION_STRING")
+    # Upstream HTTP connection pooling
+    HTTP_POOL_MAX_CONNECTIONS: int = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+    HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30.0"))
+    HTTP_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("HTTP_POOL_ACQUIRE_TIMEOUT", "5.0"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2.0"))
     
-    class Config:
-        env_file = ".env"
+    # Per-upstream request timeouts (seconds)
+    SEARCH_SERVICE_TIMEOUT: float = float(os.getenv("SEARCH_SERVICE_TIMEOUT", "10.0"))
+    USER_HISTORY_SERVICE_TIMEOUT: float = float(os.getenv("USER_HISTORY_SERVICE_TIMEOUT", "5.0"))
 
-settings = Settings()
+    # End-to-end request deadline (seconds) for /api calls, overridable per
+    # request with X-Request-Timeout-Ms up to the maximum; 0 disables
+    REQUEST_DEADLINE_DEFAULT: float = float(os.getenv("REQUEST_DEADLINE_DEFAULT", "15.0"))
+    REQUEST_DEADLINE_MAX: float = float(os.getenv("REQUEST_DEADLINE_MAX", "60.0"))
 
-# Set up logging
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+    # Adaptive admission control: the concurrency limit moves between the
+    # bounds with observed latency; background calls (batch, history) may
+    # only use a share of it. Shed requests get 503 with Retry-After.
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_INITIAL_LIMIT: int = int(os.getenv("ADMISSION_INITIAL_LIMIT", "50"))
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "5"))
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "500"))
+    ADMISSION_LATENCY_TOLERANCE: float = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+    ADMISSION_BACKGROUND_SHARE: float = float(os.getenv("ADMISSION_BACKGROUND_SHARE", "0.5"))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
 
-# Console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(console_formatter)
-logger.addHandler(console_handler)
+    # Per-upstream circuit breaker
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "10.0"))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
 
-# Set up OpenTelemetry
-if settings.APPINSIGHTS_CONNECTION_STRING:
-    # Create a resource with service information
-    resource = Resource.create({
-        "service.name": settings.PROJECT_NAME,
-        "service.version": settings.VERSION,
-        "service.instance.id": os.getenv("HOSTNAME", "unknown"),
-    })
+    # Retries of idempotent calls, capped by a budget relative to traffic
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))
+    RETRY_BACKOFF_BASE: float = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1.0"))
+
+    # Hedged GET requests, sent after the observed latency percentile
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
 
-    # Initialize TraceProvider with the resource
-    trace_provider = TracerProvider(resource=resource)
+    # Encode responses with orjson and return upstream results without
+    # re-validating them against the response models
+    FAST_RESPONSES_ENABLED: bool = os.getenv("FAST_RESPONSES_ENABLED", "true").lower() == "true"
+    
+    # Relay /api/search request and response bodies as raw bytes
+    SEARCH_PASSTHROUGH_ENABLED: bool = os.getenv("SEARCH_PASSTHROUGH_ENABLED", "false").lower() == "true"
+    
+    # Search result cache
+    SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_TTL: float = float(os.getenv("SEARCH_CACHE_TTL", "30.0"))
+    SEARCH_CACHE_MAX_BYTES: int = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Batch search: maximum searches per batch (they are run by the search
+    # service, at most its SEARCH_BATCH_MAX_CONCURRENCY at a time)
+    SEARCH_BATCH_MAX_ITEMS: int = int(os.getenv("SEARCH_BATCH_MAX_ITEMS", "50"))
+    
+    # Write-behind search history recording
+    HISTORY_QUEUE_MAX_SIZE: int = int(os.getenv("HISTORY_QUEUE_MAX_SIZE", "10000"))
+    HISTORY_BATCH_MAX_SIZE: int = int(os.getenv("HISTORY_BATCH_MAX_SIZE", "200"))
+    HISTORY_BATCH_MAX_AGE: float = float(os.getenv("HISTORY_BATCH_MAX_AGE", "0.5"))
+    HISTORY_ENQUEUE_TIMEOUT: float = float(os.getenv("HISTORY_ENQUEUE_TIMEOUT", "0.0"))
     
-    # Set up Azure Monitor exporter
-    azure_exporter = AzureMonitorTraceExporter.from_connection_string(
-        settings.APPINSIGHTS_CONNECTION_STRING
-    )
+    # Background dependency health probes: how often they run, how long
+    # each may take, and when a cached result is too old for readiness
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "5.0"))
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2.0"))
+    HEALTH_CHECK_STALE_AFTER: float = float(os.getenv("HEALTH_CHECK_STALE_AFTER", "15.0"))
     
-    # Add BatchSpanProcessor with Azure Monitor exporter
-    trace_provider.add_span_processor(BatchSpanProcessor(azure_exporter))
+    # Expose /debug endpoints (pool statistics etc.); off unless enabled,
+    # as they reveal internal state
+    DEBUG_ENDPOINTS_ENABLED: bool = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() == "true"
     
-    # Set the global trace provider
-    trace.set_tracer_provider(trace_provider)
+    # Response compression (brotli or gzip, as negotiated) for bodies of at
+    # least the minimum size, and the largest gzip request body accepted
+    # once decompressed
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_MAX_REQUEST_SIZE: int = int(os.getenv("COMPRESSION_MAX_REQUEST_SIZE", str(10 * 1024 * 1024)))
+
+    # Prometheus-style /metrics endpoint with per-route and per-stage
+    # latency histograms
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Logging: level, "text" or "json" output, per-logger sampling of
+    # sub-WARNING records ("app.services.http_service=0.1,..."), size caps for
+    # messages and logged payloads, and the bounded handler queue
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_MAX_MESSAGE_LENGTH: int = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", "4000"))
+    LOG_PAYLOAD_MAX_LENGTH: int = int(os.getenv("LOG_PAYLOAD_MAX_LENGTH", "1000"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
     
-    # Get a tracer
-    tracer = trace.get_tracer(__name__)
+    # Azure Application Insights
+    APPINSIGHTS_CONNECTION_STRING: str = os.getenv("APPINSIGHTS_CONNECTION_STRING")
     
-    # Initialize automatic instrumentation
-    HTTPXClientInstrumentor().instrument()
-    LoggingInstrumentor().instrument()
+    # Tracing: exporter ("azure", "otlp", "file", "console" or "none";
+    # Azure Monitor by default when a connection string is set), head
+    # sampling ratio for new traces (callers' decisions are followed), and
+    # optional tail sampling that keeps only failed traces, traces slower
+    # than the threshold, and the sampling ratio of the rest
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "azure" if os.getenv("APPINSIGHTS_CONNECTION_STRING") else "none")
+    TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    TRACING_TAIL_SAMPLING: bool = os.getenv("TRACING_TAIL_SAMPLING", "false").lower() == "true"
+    TRACING_TAIL_LATENCY_MS: float = float(os.getenv("TRACING_TAIL_LATENCY_MS", "500"))
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: Optional[str] = os.getenv("TRACING_OTLP_ENDPOINT")
+    TRACING_INSTRUMENT_LOGGING: bool = os.getenv("TRACING_INSTRUMENT_LOGGING", "true").lower() == "true"
     
-    logger.info("OpenTelemetry with Azure Monitor configured successfully")
-else:
-    logger.warning("APPINSIGHTS_CONNECTION_STRING not found. Telemetry disabled.")
-    tracer = trace.get_tracer(__name__)
+    class Config:
+        env_file = ".env"
+
+settings = Settings()
+
+# Set up logging: one queue-backed handler on the root logger
+configure_logging(
+    settings.PROJECT_NAME,
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    max_message_length=settings.LOG_MAX_MESSAGE_LENGTH,
+    payload_max_length=settings.LOG_PAYLOAD_MAX_LENGTH,
+    queue_size=settings.LOG_QUEUE_SIZE
+)
+logger = logging.getLogger(__name__)
+
+# Set up OpenTelemetry
+configure_telemetry(
+    settings.PROJECT_NAME,
+    settings.VERSION,
+    exporter=settings.TRACING_EXPORTER,
+    sample_ratio=settings.TRACING_SAMPLE_RATIO,
+    tail_sampling=settings.TRACING_TAIL_SAMPLING,
+    tail_latency_threshold=settings.TRACING_TAIL_LATENCY_MS / 1000,
+    file_path=settings.TRACING_FILE_PATH,
+    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    appinsights_connection_string=settings.APPINSIGHTS_CONNECTION_STRING,
+    instrument_logging=settings.TRACING_INSTRUMENT_LOGGING
+)
+tracer = trace.get_tracer(__name__)
 
 # Log service URLs
 logger.info(f"SEARCH_SERVICE_URL: {settings.SEARCH_SERVICE_URL}")
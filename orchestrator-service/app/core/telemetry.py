@@ -0,0 +1,178 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import os
+import random
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider, ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased, ALWAYS_ON
+from opentelemetry.trace import StatusCode
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+
+class OtlpJsonFileExporter(SpanExporter):
+    """
+    Appends spans to a file as OTLP/JSON, one ExportTraceServiceRequest per
+    line (readable by the OpenTelemetry Collector's otlpjsonfile receiver)
+    """
+    def __init__(self, path: str):
+        from google.protobuf.json_format import MessageToJson
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+        self._encode = lambda spans: MessageToJson(encode_spans(spans), indent=None)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        line = self._encode(spans)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Buffers the spans of each trace until its local root span ends, then
+    exports the whole trace only if it failed, was slower than
+    `latency_threshold` seconds, or wins the `keep_ratio` draw. Buffered
+    traces beyond `max_traces` are dropped oldest first.
+    """
+    def __init__(self, next_processor: SpanProcessor, latency_threshold: float, keep_ratio: float, max_traces: int = 2048):
+        self.next_processor = next_processor
+        self.latency_threshold_ns = int(latency_threshold * 1e9)
+        self.keep_ratio = keep_ratio
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span: ReadableSpan):
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                spans = self._traces[trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+            if not is_local_root:
+                return
+            del self._traces[trace_id]
+        if self._keep(span, spans):
+            for finished in spans:
+                self.next_processor.on_end(finished)
+
+    def _keep(self, root: ReadableSpan, spans: List[ReadableSpan]) -> bool:
+        if any(finished.status.status_code == StatusCode.ERROR for finished in spans):
+            return True
+        if root.end_time - root.start_time >= self.latency_threshold_ns:
+            return True
+        return random.random() < self.keep_ratio
+
+    def shutdown(self):
+        self.next_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.next_processor.force_flush(timeout_millis)
+
+def _create_exporter(
+    exporter: str,
+    file_path: str,
+    otlp_endpoint: Optional[str],
+    appinsights_connection_string: Optional[str]
+) -> Optional[SpanExporter]:
+    if exporter == "azure":
+        from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+        return AzureMonitorTraceExporter.from_connection_string(appinsights_connection_string)
+    if exporter == "otlp":
+        kwargs = {"endpoint": otlp_endpoint} if otlp_endpoint else {}
+        if os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc") == "http/protobuf":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        else:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(**kwargs)
+    if exporter == "file":
+        return OtlpJsonFileExporter(file_path)
+    if exporter == "console":
+        return ConsoleSpanExporter()
+    return None
+
+def configure_telemetry(
+    service_name: str,
+    service_version: str,
+    exporter: str,
+    sample_ratio: float = 1.0,
+    tail_sampling: bool = False,
+    tail_latency_threshold: float = 0.5,
+    file_path: str = "traces.jsonl",
+    otlp_endpoint: Optional[str] = None,
+    appinsights_connection_string: Optional[str] = None,
+    instrument_httpx: bool = True,
+    instrument_logging: bool = True
+) -> bool:
+    """
+    Set up tracing for this service; returns whether tracing is enabled.
+
+    Head sampling is parent-based: a trace started here is kept with
+    probability `sample_ratio`, and spans continuing a trace from another
+    service follow the caller's decision, so traces stay whole across hops.
+    With tail sampling every trace is recorded and only failed or slow ones
+    (plus `sample_ratio` of the rest) are exported.
+    """
+    global _enabled
+    exporter = (exporter or "none").lower()
+    try:
+        span_exporter = _create_exporter(exporter, file_path, otlp_endpoint, appinsights_connection_string)
+    except Exception as e:
+        logger.error(f"Failed to create {exporter} trace exporter; tracing disabled: {str(e)}")
+        span_exporter = None
+    if span_exporter is None:
+        logger.warning("Tracing disabled (TRACING_EXPORTER=none or no exporter available)")
+        return False
+
+    resource = Resource.create({
+        "service.name": service_name,
+        "service.version": service_version,
+        "service.instance.id": os.getenv("HOSTNAME", "unknown"),
+    })
+    sampler = ParentBased(ALWAYS_ON if tail_sampling else TraceIdRatioBased(sample_ratio))
+    provider = TracerProvider(resource=resource, sampler=sampler)
+
+    processor: SpanProcessor = BatchSpanProcessor(span_exporter)
+    if tail_sampling:
+        processor = TailSamplingProcessor(processor, tail_latency_threshold, sample_ratio)
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+
+    if instrument_httpx:
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+        HTTPXClientInstrumentor().instrument()
+    if instrument_logging:
+        from opentelemetry.instrumentation.logging import LoggingInstrumentor
+        LoggingInstrumentor().instrument()
+
+    _enabled = True
+    mode = f"tail (>= {tail_latency_threshold}s or failed, plus {sample_ratio:.0%})" if tail_sampling else f"head {sample_ratio:.0%}"
+    logger.info(f"Tracing enabled: exporter={exporter}, sampling={mode}")
+    return True
+
+def instrument_app(app):
+    """
+    Trace incoming requests (and continue callers' traces) if tracing is on
+    """
+    if _enabled:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(app)
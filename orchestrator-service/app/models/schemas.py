@@ -1,19 +1,47 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 class SearchRequest(BaseModel):
     search_text: str
     search_fields: Optional[List[str]] = ["hotelName", "description", "category"]
     select: Optional[List[str]] = ["hotelId", "hotelName", "description", "category"]
+    top: Optional[int] = Field(None, ge=1, description="Page size (capped by the search service)")
+    skip: Optional[int] = Field(None, ge=0, description="Number of results to skip")
+    cursor: Optional[str] = Field(None, description="Continuation cursor from a previous page")
     user_id: Optional[str] = None
+    category: Optional[str] = Field(None, description="Section the search was made in, for per-category trending searches")
 
 class SaveSearchRequest(BaseModel):
     user_id: str
     search_id: str
     search_name: str
 
+class SaveSearchItem(BaseModel):
+    search_id: str
+    search_name: str
+
+class SaveSearchBatchRequest(BaseModel):
+    user_id: str
+    items: List[SaveSearchItem] = Field(..., min_items=1)
+
 class SearchResponse(BaseModel):
     status: str
     count: int
     results: List[Dict[str, Any]]
-    search_id: Optional[str] = None 
\ No newline at end of file
+    next_cursor: Optional[str] = None
+    search_id: Optional[str] = None 
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_items=1)
+
+class BatchSearchItem(BaseModel):
+    index: int
+    status: str
+    count: Optional[int] = None
+    results: Optional[List[Dict[str, Any]]] = None
+    next_cursor: Optional[str] = None
+    search_id: Optional[str] = None
+    error: Optional[Dict[str, Any]] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
@@ -1,14 +1,25 @@
 from .interfaces import ServiceInterface
+from .http_pool import HttpClientPool
 from .http_service import HttpService
+from .resilience import ResiliencePolicy
 from .search_service import SearchService
+from .search_cache import SearchResultCache
 from .user_history_service import UserHistoryService
-from .factory import get_search_service, get_user_history_service
+from .history_writer import HistoryWriter
+from .health_monitor import HealthMonitor
+from .factory import get_search_service, get_user_history_service, get_history_writer
 
 __all__ = [
     'ServiceInterface',
+    'HttpClientPool',
     'HttpService',
+    'ResiliencePolicy',
     'SearchService',
+    'SearchResultCache',
     'UserHistoryService',
+    'HistoryWriter',
+    'HealthMonitor',
     'get_search_service',
-    'get_user_history_service'
+    'get_user_history_service',
+    'get_history_writer'
 ] 
\ No newline at end of file
@@ -1,18 +1,92 @@
+from functools import lru_cache
+from typing import Optional
 from app.core.config import settings
+from app.core.admission import AdmissionController, AdaptiveConcurrencyLimit
+from .http_pool import HttpClientPool
 from .http_service import HttpService
+from .resilience import ResiliencePolicy
 from .search_service import SearchService
+from .search_cache import SearchResultCache
 from .user_history_service import UserHistoryService
+from .history_writer import HistoryWriter
+from .health_monitor import HealthMonitor
 
+# App-scoped connection pool shared by all upstream clients; opened lazily
+# and closed on application shutdown
+http_pool = HttpClientPool()
+
+@lru_cache()
+def get_resilience_policy(base_url: str) -> ResiliencePolicy:
+    """
+    Get the circuit breaker / retry / hedging policy for an upstream
+    """
+    return ResiliencePolicy(base_url)
+
+@lru_cache()
+def get_search_cache() -> Optional[SearchResultCache]:
+    """
+    Get the search result cache (None when caching is disabled)
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return None
+    return SearchResultCache()
+
+@lru_cache()
 def get_search_service() -> SearchService:
     """
     Get the search service client
     """
-    service = HttpService(settings.SEARCH_SERVICE_URL)
-    return SearchService(service)
+    service = HttpService(
+        settings.SEARCH_SERVICE_URL,
+        http_pool,
+        timeout=settings.SEARCH_SERVICE_TIMEOUT,
+        policy=get_resilience_policy(settings.SEARCH_SERVICE_URL)
+    )
+    return SearchService(service, get_search_cache())
 
+@lru_cache()
 def get_user_history_service() -> UserHistoryService:
     """
     Get the user history service client
     """
-    service = HttpService(settings.USER_HISTORY_SERVICE_URL)
-    return UserHistoryService(service) 
\ No newline at end of file
+    service = HttpService(
+        settings.USER_HISTORY_SERVICE_URL,
+        http_pool,
+        timeout=settings.USER_HISTORY_SERVICE_TIMEOUT,
+        policy=get_resilience_policy(settings.USER_HISTORY_SERVICE_URL),
+        compress_min_size=settings.COMPRESSION_MIN_SIZE if settings.COMPRESSION_ENABLED else None
+    )
+    return UserHistoryService(service)
+
+@lru_cache()
+def get_history_writer() -> HistoryWriter:
+    """
+    Get the write-behind queue for search history events
+    """
+    return HistoryWriter(get_user_history_service())
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """
+    Get the adaptive admission controller for /api requests
+    """
+    return AdmissionController(
+        AdaptiveConcurrencyLimit(
+            initial=settings.ADMISSION_INITIAL_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+            tolerance=settings.ADMISSION_LATENCY_TOLERANCE
+        ),
+        background_share=settings.ADMISSION_BACKGROUND_SHARE,
+        retry_after=settings.ADMISSION_RETRY_AFTER
+    )
+
+@lru_cache()
+def get_health_monitor() -> HealthMonitor:
+    """
+    Get the background upstream health monitor
+    """
+    return HealthMonitor(http_pool, {
+        "search_service": settings.SEARCH_SERVICE_URL,
+        "user_history_service": settings.USER_HISTORY_SERVICE_URL
+    })
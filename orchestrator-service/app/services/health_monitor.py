@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from .http_pool import HttpClientPool
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """
+    Background refresher for upstream health.
+
+    Every `interval` seconds all dependencies are probed concurrently over the
+    pooled clients, and the result is cached so that health endpoints never
+    call upstreams themselves, however often they are polled.
+    """
+    def __init__(
+        self,
+        pool: HttpClientPool,
+        dependencies: Dict[str, str],
+        interval: float = settings.HEALTH_CHECK_INTERVAL,
+        timeout: float = settings.HEALTH_CHECK_TIMEOUT,
+        stale_after: float = settings.HEALTH_CHECK_STALE_AFTER
+    ):
+        self.pool = pool
+        self.dependencies = dependencies
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._checked_at_wall: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Start probing in the background; the first round runs immediately
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        """
+        Probe all dependencies concurrently and cache the results
+        """
+        names = list(self.dependencies)
+        results = await asyncio.gather(*(self._probe(self.dependencies[name]) for name in names))
+        for name, result in zip(names, results):
+            previous = self._results.get(name, {}).get("status")
+            if result["status"] != previous:
+                log = logger.info if result["status"] == "healthy" else logger.error
+                log(f"{name} is {result['status']}" + (f": {result['error']}" if result.get("error") else ""))
+            self._results[name] = result
+        self._checked_at = time.monotonic()
+        self._checked_at_wall = datetime.utcnow()
+
+    async def _probe(self, base_url: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            response = await self.pool.client_for(base_url).get("/health", timeout=self.timeout)
+            result = {"status": "healthy" if response.status_code == 200 else "unhealthy"}
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+        except Exception as e:
+            result = {"status": "unreachable", "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    def age(self) -> Optional[float]:
+        """
+        Seconds since the last completed probe round (None if none yet)
+        """
+        if self._checked_at is None:
+            return None
+        return time.monotonic() - self._checked_at
+
+    def is_ready(self) -> bool:
+        """
+        Whether every dependency was healthy in a recent enough probe round
+        """
+        age = self.age()
+        return (
+            age is not None
+            and age <= self.stale_after
+            and all(result["status"] == "healthy" for result in self._results.values())
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Cached health with staleness metadata
+        """
+        age = self.age()
+        if age is None:
+            overall = "unknown"
+        elif all(result["status"] == "healthy" for result in self._results.values()):
+            overall = "healthy"
+        else:
+            overall = "unhealthy"
+        return {
+            "status": overall,
+            "services": {name: result["status"] for name, result in self._results.items()},
+            "details": self._results,
+            "checked_at": self._checked_at_wall.isoformat() + "Z" if self._checked_at_wall else None,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "stale": age is None or age > self.stale_after
+        }
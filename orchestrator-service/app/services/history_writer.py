@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from .user_history_service import UserHistoryService
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling the flush loop to drain and exit
+_STOP = object()
+
+class HistoryWriter:
+    """
+    Write-behind pipeline for search history events.
+
+    Events are put on a bounded in-memory queue and delivered to the user
+    history service in batches, flushed when a batch is full or when its
+    oldest event reaches the maximum age. When the queue is full, events are
+    dropped (after an optional wait) so that history never blocks searches.
+    """
+    def __init__(
+        self,
+        user_history_service: UserHistoryService,
+        max_queue_size: int = settings.HISTORY_QUEUE_MAX_SIZE,
+        max_batch_size: int = settings.HISTORY_BATCH_MAX_SIZE,
+        max_batch_age: float = settings.HISTORY_BATCH_MAX_AGE,
+        enqueue_timeout: float = settings.HISTORY_ENQUEUE_TIMEOUT
+    ):
+        self.user_history_service = user_history_service
+        self.max_batch_size = max_batch_size
+        self.max_batch_age = max_batch_age
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.enqueued_total = 0
+        self.dropped_total = 0
+        self.written_total = 0
+        self.rejected_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+
+    async def start(self):
+        """
+        Start the background flush loop
+        """
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+            logger.info("History write-behind queue started")
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stop accepting events, flush what is queued and stop the loop
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.put(_STOP), timeout)
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"History queue did not drain within {timeout}s; {self._queue.qsize()} events lost")
+            self._task.cancel()
+        self._task = None
+        logger.info("History write-behind queue stopped")
+
+    async def enqueue(self, event: Dict[str, Any]) -> bool:
+        """
+        Queue a history event for delivery; returns False if it was dropped
+        """
+        if self._closing:
+            self.dropped_total += 1
+            return False
+        try:
+            if self.enqueue_timeout > 0:
+                await asyncio.wait_for(self._queue.put(event), self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.dropped_total += 1
+            logger.warning(f"History queue full ({self._queue.qsize()} events); dropping event {event.get('id')}")
+            return False
+        self.enqueued_total += 1
+        return True
+
+    async def enqueue_many(self, events: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Queue several history events; returns whether each one was queued.
+        Events queued together are normally delivered in the same batch.
+        """
+        return [await self.enqueue(event) for event in events]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and delivery counters
+        """
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_age": self.max_batch_age,
+            "enqueued_total": self.enqueued_total,
+            "dropped_total": self.dropped_total,
+            "written_total": self.written_total,
+            "rejected_total": self.rejected_total,
+            "failed_total": self.failed_total,
+            "batches_total": self.batches_total
+        }
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+
+            # Collect more events until the batch is full or the oldest one
+            # has waited long enough
+            batch = [item]
+            deadline = time.monotonic() + self.max_batch_age
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        self.batches_total += 1
+        try:
+            result = await self.user_history_service.record_search_batch(batch)
+            self.written_total += result.get("inserted", 0)
+            self.rejected_total += len(result.get("rejected", []))
+        except Exception as e:
+            # History is best effort; a failed batch is counted and dropped
+            self.failed_total += len(batch)
+            logger.error(f"Failed to write history batch of {len(batch)}: {str(e)}\n{traceback.format_exc()}")
@@ -0,0 +1,134 @@
+import httpx
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core import compression
+import logging
+
+logger = logging.getLogger(__name__)
+
+class UpstreamStats:
+    """
+    Request counters for a single upstream
+    """
+    def __init__(self):
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request_started(self):
+        self.requests_total += 1
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight:
+            self.max_in_flight = self.in_flight
+
+    def request_finished(self, failed: bool = False):
+        self.in_flight -= 1
+        if failed:
+            self.errors_total += 1
+
+class HttpClientPool:
+    """
+    App-scoped registry of pooled httpx clients, one per upstream base URL.
+
+    Clients are created lazily on first use and reused for the lifetime of
+    the application so that TCP/TLS connections are kept alive between calls.
+    """
+    def __init__(
+        self,
+        max_connections: int = settings.HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.HTTP_POOL_KEEPALIVE_EXPIRY,
+        http2: bool = settings.HTTP2_ENABLED,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        acquire_timeout: float = settings.HTTP_POOL_ACQUIRE_TIMEOUT
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, UpstreamStats] = {}
+
+    def client_for(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Get (or create) the pooled client for an upstream
+        """
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=self.limits,
+                http2=self.http2,
+                # Upstreams compress large responses; httpx decodes them
+                headers={"Accept-Encoding": compression.ACCEPT_ENCODING},
+                timeout=httpx.Timeout(
+                    None,
+                    connect=self.connect_timeout,
+                    pool=self.acquire_timeout
+                )
+            )
+            self._clients[base_url] = client
+            logger.info(f"Created pooled HTTP client for {base_url} (http2={self.http2})")
+        return client
+
+    def stats_for(self, base_url: str) -> UpstreamStats:
+        """
+        Get the request counters for an upstream
+        """
+        stats = self._stats.get(base_url)
+        if stats is None:
+            stats = self._stats[base_url] = UpstreamStats()
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool utilization per upstream
+        """
+        upstreams = {}
+        for base_url in set(self._clients) | set(self._stats):
+            stats = self.stats_for(base_url)
+            upstreams[base_url] = {
+                "requests_total": stats.requests_total,
+                "errors_total": stats.errors_total,
+                "in_flight": stats.in_flight,
+                "max_in_flight": stats.max_in_flight,
+                "connections": self._connection_stats(self._clients.get(base_url))
+            }
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "upstreams": upstreams
+        }
+
+    def _connection_stats(self, client: Optional[httpx.AsyncClient]) -> Dict[str, int]:
+        # httpx does not expose pool state publicly, so read it from the
+        # underlying httpcore pool and degrade gracefully if that changes.
+        if client is None or client.is_closed:
+            return {"open": 0, "idle": 0, "active": 0, "queued": 0}
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "queued": sum(
+                1 for status in getattr(pool, "_requests", []) if status.connection is None
+            )
+        }
+
+    async def aclose(self):
+        """
+        Close all pooled clients
+        """
+        for base_url, client in list(self._clients.items()):
+            await client.aclose()
+            logger.info(f"Closed pooled HTTP client for {base_url}")
+        self._clients.clear()
@@ -1,62 +1,402 @@
 import httpx
-from typing import Dict, Optional
+import asyncio
+import random
+import time
+from typing import Dict, Optional, Tuple, Mapping, AsyncIterator
 from fastapi import HTTPException
 from .interfaces import ServiceInterface
+from .http_pool import HttpClientPool
+from .resilience import ResiliencePolicy
+from app.core import deadline, compression
+from app.core.structured_logging import payload
+from app.core.responses import dumps
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Upstream statuses that are worth retrying on an idempotent call
+_RETRYABLE_STATUSES = {502, 503, 504}
+
+def upstream_error(response: httpx.Response) -> HTTPException:
+    """
+    The error to raise for a failed upstream response; Retry-After is passed
+    on so that callers of a throttled upstream know when to come back
+    """
+    retry_after = response.headers.get("retry-after")
+    return HTTPException(
+        status_code=response.status_code,
+        detail=f"Service error: {response.text}",
+        headers={"Retry-After": retry_after} if retry_after else None
+    )
+
+def _shorter(configured: Optional[float], limit: float) -> float:
+    return limit if configured is None else min(configured, limit)
+
 class HttpService(ServiceInterface):
     """
-    HTTP service implementation
+    HTTP service implementation backed by an app-scoped connection pool,
+    with an optional per-upstream resilience policy (circuit breaker, retry
+    budget and hedged GETs).
+
+    Request bodies of at least `compress_min_size` bytes are gzipped when
+    the caller asks for it; None never compresses.
     """
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        pool: HttpClientPool,
+        timeout: Optional[float] = None,
+        policy: Optional[ResiliencePolicy] = None,
+        compress_min_size: Optional[int] = None
+    ):
         self.base_url = base_url
+        self.pool = pool
+        self.timeout = timeout
+        self.policy = policy
+        self.compress_min_size = compress_min_size
 
     async def call_service(
-        self, 
-        endpoint: str, 
-        method: str, 
+        self,
+        endpoint: str,
+        method: str,
         data: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        compress: bool = False
     ) -> Dict:
         """
         Call a service endpoint using HTTP
-        
+
         Args:
             endpoint: The endpoint to call
             method: The HTTP method to use
             data: Optional request body data
             headers: Optional request headers
+            timeout: Optional per-call timeout in seconds (defaults to the upstream timeout)
+            idempotent: Whether the call may be retried (defaults to True for GET only)
+            compress: Gzip the request body if it is large enough
+        """
+        # Payloads are only logged at DEBUG, and truncated
+        logger.debug("Request data: %s", payload(data))
+
+        # Encode and decode with orjson rather than httpx's stdlib json
+        if data is not None:
+            headers = {**(headers or {}), "Content-Type": "application/json"}
+            content = dumps(data)
+            if compress and self.compress_min_size is not None and len(content) >= self.compress_min_size:
+                content = compression.gzip_compress(content)
+                headers["Content-Encoding"] = "gzip"
+            response = await self._send(endpoint, method, headers, timeout, idempotent, content=content)
+        else:
+            response = await self._send(endpoint, method, headers, timeout, idempotent)
+        return orjson.loads(response.content)
+
+    async def call_service_raw(
+        self,
+        endpoint: str,
+        method: str,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None
+    ) -> Tuple[bytes, Mapping[str, str]]:
+        """
+        Call a service endpoint with a raw body and return the raw response
+        body and headers, without JSON encoding or decoding
+
+        Args:
+            endpoint: The endpoint to call
+            method: The HTTP method to use
+            content: Optional raw request body
+            headers: Optional request headers
+            timeout: Optional per-call timeout in seconds (defaults to the upstream timeout)
+            idempotent: Whether the call may be retried (defaults to True for GET only)
+        """
+        response = await self._send(endpoint, method, headers, timeout, idempotent, content=content)
+        return response.content, response.headers
+
+    async def stream_service(
+        self,
+        endpoint: str,
+        method: str,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Call a service endpoint and yield the response body in chunks as they
+        arrive. Error statuses are raised before the first chunk is yielded.
+        Streams go through the circuit breaker but are never retried or hedged.
+
+        Args:
+            endpoint: The endpoint to call
+            method: The HTTP method to use
+            content: Optional raw request body
+            headers: Optional request headers
+            timeout: Optional per-chunk read timeout in seconds (defaults to the upstream timeout)
         """
         url = f"{self.base_url}{endpoint}"
-        
+        client = self.pool.client_for(self.base_url)
+        request_timeout = self._request_timeout(client, timeout)
+        # The read timeout applies per chunk and the request deadline only
+        # until the response starts, so a long stream is cut only when the
+        # upstream goes quiet for longer than the read timeout
+        headers = headers or {}
+        left = deadline.remaining()
+        if left is not None:
+            headers = {**headers, deadline.DEADLINE_HEADER: deadline.header_value(left)}
+        request = client.build_request(
+            method.upper(),
+            url,
+            content=content,
+            headers=headers,
+            timeout=request_timeout
+        )
+        logger.debug("Streaming %s request to %s", method, url)
+
+        breaker = self.policy.breaker if self.policy is not None else None
+        if breaker is not None:
+            self.policy.budget.record_request()
+            if not breaker.allow_request():
+                raise self._circuit_open()
+        outcome_recorded = breaker is None
+
+        stats = self.pool.stats_for(self.base_url)
+        stats.request_started()
+        failed = True
+        try:
+            response = await client.send(request, stream=True)
+            try:
+                if not outcome_recorded:
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    outcome_recorded = True
+                if response.status_code != 200:
+                    await response.aread()
+                    raise upstream_error(response)
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+                failed = False
+            finally:
+                await response.aclose()
+        except httpx.RequestError as e:
+            if not outcome_recorded:
+                breaker.record_failure()
+                outcome_recorded = True
+            self._raise_request_error(url, e)
+        finally:
+            if not outcome_recorded:
+                breaker.release()
+            stats.request_finished(failed)
+
+    def _request_timeout(self, client: httpx.AsyncClient, timeout: Optional[float]) -> httpx.Timeout:
+        # Per-call timeout overrides the upstream default; connect and pool
+        # acquisition timeouts stay as configured on the pooled client. None
+        # of them may outlive the deadline of the request being served.
+        try:
+            call_timeout = deadline.clamp(timeout if timeout is not None else self.timeout)
+        except deadline.DeadlineExceeded:
+            logger.warning(f"Deadline exceeded before calling {self.base_url}")
+            raise HTTPException(status_code=504,
+                           detail="Request deadline exceeded")
+        if call_timeout is None:
+            return client.timeout
+        return httpx.Timeout(
+            call_timeout,
+            connect=_shorter(client.timeout.connect, call_timeout),
+            pool=_shorter(client.timeout.pool, call_timeout)
+        )
+
+    def _with_deadline(self, headers: Dict, request_timeout: httpx.Timeout) -> Dict:
+        # Tell the upstream how long we will wait so it can give up too
+        if request_timeout.read is None:
+            return headers
+        return {**headers, deadline.DEADLINE_HEADER: deadline.header_value(request_timeout.read)}
+
+    async def _send(
+        self,
+        endpoint: str,
+        method: str,
+        headers: Optional[Dict],
+        timeout: Optional[float],
+        idempotent: Optional[bool] = None,
+        **body
+    ) -> httpx.Response:
+        url = f"{self.base_url}{endpoint}"
+        method = method.upper()
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        if idempotent is None:
+            idempotent = method == "GET"
+
         # Ensure headers is a dict
         headers = headers or {}
-        
+
+        client = self.pool.client_for(self.base_url)
+        request_timeout = self._request_timeout(client, timeout)
+
         # Log request details
-        logger.info(f"Making {method} request to {url}")
-        logger.info(f"Request headers: {headers}")
-        logger.info(f"Request data: {data}")
-        
-        async with httpx.AsyncClient() as client:
+        logger.debug("Making %s request to %s", method, url)
+        logger.debug("Request headers: %s", payload(headers))
+
+        policy = self.policy
+        if policy is not None:
+            policy.budget.record_request()
+
+        attempt = 0
+        while True:
+            # Recomputed per attempt so retries only get what is left
+            request_timeout = self._request_timeout(client, timeout)
+            attempt_headers = self._with_deadline(headers, request_timeout)
+
+            if policy is not None and not policy.breaker.allow_request():
+                raise self._circuit_open()
+
             try:
-                if method.upper() == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method.upper() == "POST":
-                    # Let httpx handle the JSON serialization
-                    response = await client.post(url, json=data, headers=headers)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                if response.status_code != 200:
-                    raise HTTPException(status_code=response.status_code, 
-                                   detail=f"Service error: {response.text}")
-                
-                return response.json()
-                
+                response = await self._dispatch(client, url, method, attempt_headers, request_timeout, idempotent, body)
             except httpx.RequestError as e:
-                logger.error(f"Request error details: {str(e)}")
-                raise HTTPException(status_code=500, 
-                               detail=f"Service communication error: {str(e)}") 
\ No newline at end of file
+                if policy is not None:
+                    policy.breaker.record_failure()
+                if isinstance(e, httpx.TransportError) and await self._retry(idempotent, attempt):
+                    attempt += 1
+                    logger.warning(f"Retrying {method} {url} after error: {str(e)}")
+                    continue
+                self._raise_request_error(url, e)
+            except BaseException:
+                # Cancelled mid-call: free a half-open probe slot
+                if policy is not None:
+                    policy.breaker.release()
+                raise
+
+            if policy is not None:
+                if response.status_code >= 500:
+                    policy.breaker.record_failure()
+                else:
+                    policy.breaker.record_success()
+
+            if response.status_code == 200:
+                return response
+            if response.status_code in _RETRYABLE_STATUSES and await self._retry(idempotent, attempt):
+                attempt += 1
+                logger.warning(f"Retrying {method} {url} after status {response.status_code}")
+                continue
+            raise upstream_error(response)
+
+    async def _retry(self, idempotent: bool, attempt: int) -> bool:
+        """
+        Decide whether to retry and wait out the backoff if so
+        """
+        policy = self.policy
+        if policy is None or not idempotent or attempt >= policy.max_retries:
+            return False
+        # Exponential backoff with full jitter; no point retrying if the
+        # request deadline would pass before the retry is sent
+        backoff = random.uniform(0, policy.retry_backoff * (2 ** attempt))
+        left = deadline.remaining()
+        if left is not None and left <= backoff:
+            return False
+        if not policy.budget.try_acquire():
+            logger.warning(f"Retry budget for {self.base_url} exhausted")
+            return False
+        await asyncio.sleep(backoff)
+        return True
+
+    async def _dispatch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        method: str,
+        headers: Dict,
+        request_timeout: httpx.Timeout,
+        idempotent: bool,
+        body: Dict
+    ) -> httpx.Response:
+        """
+        Send one logical request, hedging idempotent GETs that take longer
+        than the upstream's usual latency
+        """
+        policy = self.policy
+        delay = policy.hedge_delay() if policy is not None and method == "GET" and idempotent else None
+        if delay is None:
+            return await self._attempt(client, url, method, headers, request_timeout, body)
+
+        primary = asyncio.ensure_future(self._attempt(client, url, method, headers, request_timeout, body))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and policy.budget.try_acquire():
+                policy.hedges_total += 1
+                logger.info(f"Hedging {method} {url} after {delay:.3f}s")
+                tasks.append(asyncio.ensure_future(
+                    self._attempt(client, url, method, headers, request_timeout, body)
+                ))
+
+            # First good response wins; fall back to an error response or
+            # exception only when no attempt succeeds
+            pending = set(tasks)
+            fallback: Optional[httpx.Response] = None
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    response = task.result()
+                    if response.status_code < 500:
+                        if task is not primary:
+                            policy.hedge_wins_total += 1
+                        return response
+                    fallback = response
+            if fallback is not None:
+                return fallback
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        method: str,
+        headers: Dict,
+        request_timeout: httpx.Timeout,
+        body: Dict
+    ) -> httpx.Response:
+        stats = self.pool.stats_for(self.base_url)
+        stats.request_started()
+        failed = True
+        started = time.monotonic()
+        try:
+            if method == "GET":
+                response = await client.get(url, headers=headers, timeout=request_timeout)
+            else:
+                response = await client.post(url, headers=headers, timeout=request_timeout, **body)
+
+            if response.status_code == 200:
+                failed = False
+                if self.policy is not None:
+                    self.policy.latency.record(time.monotonic() - started)
+            return response
+        finally:
+            stats.request_finished(failed)
+
+    def _circuit_open(self) -> HTTPException:
+        logger.warning(f"Circuit open for {self.base_url}; failing fast")
+        return HTTPException(status_code=503,
+                       detail=f"Service unavailable: circuit open for {self.base_url}")
+
+    def _raise_request_error(self, url: str, e: httpx.RequestError):
+        if isinstance(e, httpx.TimeoutException):
+            logger.error(f"Request to {url} timed out: {str(e)}")
+            raise HTTPException(status_code=504,
+                           detail=f"Service timeout: {str(e)}")
+        logger.error(f"Request error details: {str(e)}")
+        raise HTTPException(status_code=500,
+                       detail=f"Service communication error: {str(e)}")
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Optional, Tuple, Mapping, AsyncIterator
 
 class ServiceInterface(ABC):
     """
@@ -11,7 +11,10 @@ class ServiceInterface(ABC):
         endpoint: str, 
         method: str, 
         data: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        compress: bool = False
     ) -> Dict:
         """
         Call a service endpoint
@@ -21,5 +24,54 @@ class ServiceInterface(ABC):
             method: The HTTP method to use
             data: Optional request body data
             headers: Optional request headers
+            timeout: Optional per-call timeout in seconds
+            idempotent: Whether the call may be retried (defaults to True for GET only)
+            compress: Whether a large request body may be sent gzipped
         """
-        pass 
\ No newline at end of file
+        pass 
+
+    @abstractmethod
+    async def call_service_raw(
+        self,
+        endpoint: str,
+        method: str,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None
+    ) -> Tuple[bytes, Mapping[str, str]]:
+        """
+        Call a service endpoint with a raw body, returning the raw response
+        body and headers
+        
+        Args:
+            endpoint: The endpoint to call
+            method: The HTTP method to use
+            content: Optional raw request body
+            headers: Optional request headers
+            timeout: Optional per-call timeout in seconds
+            idempotent: Whether the call may be retried (defaults to True for GET only)
+        """
+        pass
+
+
+    @abstractmethod
+    def stream_service(
+        self,
+        endpoint: str,
+        method: str,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Call a service endpoint and yield the response body in chunks
+        
+        Args:
+            endpoint: The endpoint to call
+            method: The HTTP method to use
+            content: Optional raw request body
+            headers: Optional request headers
+            timeout: Optional per-chunk read timeout in seconds
+        """
+        pass
@@ -1,80 +1,105 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, AsyncIterator
 from .search_service import SearchService
 from .user_history_service import UserHistoryService
-from app.models.schemas import SearchRequest, SaveSearchRequest, SearchResponse
+from .history_writer import HistoryWriter
+from .streaming import relay_ndjson, is_error_record
+from .search_cache import canonical_search_key
+from app.models.schemas import SearchRequest, SaveSearchRequest, SaveSearchBatchRequest, SearchResponse
+from app.core.config import settings
+from app.core.history_keys import history_key, history_id, month_start
+from app.core.structured_logging import payload
+from app.core.metrics import stage_timer
 from fastapi import HTTPException, Request
 from opentelemetry import trace
 from opentelemetry.trace.status import Status, StatusCode
+from datetime import datetime
 import logging
 import traceback
+import json
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
+def with_search_id(content: bytes, search_id: Optional[str]) -> bytes:
+    """
+    Add `search_id` to a JSON object given as raw bytes without decoding it
+    """
+    body = content.rstrip()
+    if not body.endswith(b"}"):
+        raise ValueError("Search service response is not a JSON object")
+    body = body[:-1].rstrip()
+    separator = b"" if body.endswith(b"{") else b","
+    return body + separator + b'"search_id":' + json.dumps(search_id).encode() + b"}"
+
+def batch_error_item(index: int, status_code: int, detail) -> Dict:
+    """
+    A failed batch item with every BatchSearchItem field present, so the
+    response has the same shape whether or not it is validated
+    """
+    return {
+        "index": index,
+        "status": "error",
+        "count": None,
+        "results": None,
+        "next_cursor": None,
+        "search_id": None,
+        "error": {"status_code": status_code, "detail": detail}
+    }
+
+def is_first_page(body: Dict) -> bool:
+    """
+    Whether a search request asks for the first page of results; later pages
+    of the same search are not recorded in history again
+    """
+    return not body.get("cursor") and not body.get("skip")
+
 class OrchestratorService:
     """
     Orchestrator service that coordinates between microservices
     """
-    def __init__(self, search_service: SearchService, user_history_service: UserHistoryService):
+    def __init__(
+        self,
+        search_service: SearchService,
+        user_history_service: UserHistoryService,
+        history_writer: HistoryWriter
+    ):
         self.search_service = search_service
         self.user_history_service = user_history_service
+        self.history_writer = history_writer
     
     async def process_search(self, request: Request, user_id: str = None) -> SearchResponse:
         """
         Process a search request:
         1. Forward the raw request to Search Service
-        2. Record the search in history if user_id provided
+        2. Queue the search for history recording if user_id provided
         3. Return combined results
         """
         try:
             # Step 1: Forward the raw request to search service
             with tracer.start_as_current_span("search_service.search") as search_span:
-                logger.info("Forwarding raw search request to search service")
+                logger.debug("Forwarding raw search request to search service")
                 search_results = await self.search_service.search(request)
                 search_span.set_attribute("search.results.count", search_results.get("count", 0))
                 search_span.set_status(Status(StatusCode.OK))
-                logger.info(f"Search results received: {search_results}")
+                logger.debug("Search results received: %s", payload(search_results))
             
-            # Step 2: Record search history if user_id is provided
+            # Step 2: Queue the search for history recording if user_id is provided
             search_id = None
-            if user_id:
-                with tracer.start_as_current_span("user_history.record_search") as history_span:
-                    try:
-                        logger.info(f"Recording search history for user: {user_id}")
-                        # Extract search text from the raw request for history
-                        raw_body = await request.json()
-                        search_text = raw_body.get("search", {}).get("text", "")
-                        search_fields = raw_body.get("search", {}).get("fields", [])
-                        
-                        history_span.set_attribute("user.id", user_id)
-                        history_span.set_attribute("search.text", search_text)
-                        
-                        history_data = await self.user_history_service.record_search(
-                            user_id=user_id,
-                            search_text=search_text,
-                            search_fields=search_fields
-                        )
-                        search_id = history_data.get("id")
-                        history_span.set_attribute("search.history.id", search_id)
-                        history_span.set_status(Status(StatusCode.OK))
-                        logger.info(f"Search history recorded with ID: {search_id}")
-                    except Exception as e:
-                        # Log the error but don't fail the request
-                        history_span.set_status(
-                            Status(StatusCode.ERROR, str(e))
-                        )
-                        history_span.set_attribute("error.type", "history_error")
-                        history_span.set_attribute("error.message", str(e))
-                        logger.error(f"Failed to record search history: {str(e)}\n{traceback.format_exc()}")
+            body = await request.json()
+            if user_id and is_first_page(body):
+                search_id = await self._queue_history(user_id, body)
             
-            # Step 3: Return combined results
-            response = SearchResponse(
+            # Step 3: Return combined results. The search service has already
+            # validated the results, so they are not checked again here.
+            make_response = SearchResponse.construct if settings.FAST_RESPONSES_ENABLED else SearchResponse
+            response = make_response(
                 status=search_results.get("status", "success"),
                 count=search_results.get("count", 0),
                 results=search_results.get("results", []),
+                next_cursor=search_results.get("next_cursor"),
                 search_id=search_id
             )
-            logger.info(f"Returning search response: {response.dict()}")
+            logger.debug("Returning search response: %s", payload(response))
             return response
             
         except HTTPException as e:
@@ -86,6 +111,172 @@ class OrchestratorService:
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
             raise HTTPException(status_code=500, detail=error_msg)
     
+    async def process_search_raw(self, raw_body: bytes, body: Dict, user_id: str = None) -> Tuple[bytes, Optional[int]]:
+        """
+        Process a search request in pass-through mode: the request and response
+        bodies are relayed as raw bytes and only `search_id` is spliced into
+        the response. `body` is the parsed request, used for history and the
+        cache key. Returns the response body and the result count.
+        """
+        try:
+            with tracer.start_as_current_span("search_service.search") as search_span:
+                result = await self.search_service.search_raw(raw_body, body, user_id or "")
+                if result.count is not None:
+                    search_span.set_attribute("search.results.count", result.count)
+                search_span.set_status(Status(StatusCode.OK))
+            
+            search_id = None
+            if user_id and is_first_page(body):
+                search_id = await self._queue_history(user_id, body)
+            
+            return with_search_id(result.content, search_id), result.count
+            
+        except HTTPException as e:
+            logger.error(f"HTTP error in process_search_raw: {str(e)}")
+            raise
+        except Exception as e:
+            error_msg = f"Error processing search request: {str(e)}"
+            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise HTTPException(status_code=500, detail=error_msg)
+    
+    async def process_search_stream(
+        self,
+        raw_body: bytes,
+        body: Dict,
+        user_id: str = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Process a search request in NDJSON streaming mode: results are relayed
+        chunk by chunk as the search service produces them, and the trailing
+        summary record gets the `search_id`. Error statuses of the search
+        service are raised here, before the response starts; a stream that
+        starts with an error record is relayed but not recorded in history.
+        """
+        chunks = self.search_service.search_stream(raw_body, user_id or "")
+        with tracer.start_as_current_span("search_service.search_stream") as search_span:
+            try:
+                with stage_timer("search_stream_first_chunk"):
+                    first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = b""
+            search_span.set_status(Status(StatusCode.OK))
+        
+        search_id = None
+        if user_id and is_first_page(body) and not is_error_record(first):
+            search_id = await self._queue_history(user_id, body)
+        
+        async def upstream() -> AsyncIterator[bytes]:
+            if first:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        
+        return relay_ndjson(upstream(), search_id)
+    
+    async def process_search_batch(self, bodies: List[Dict], user_id: str = None) -> List[Dict]:
+        """
+        Process several search requests at once:
+        1. Deduplicate identical searches
+        2. Send the distinct ones to the search service in one batch call
+        3. Queue history for all successful first-page searches together
+        4. Return one result or error per requested search, in request order
+        """
+        keys = [canonical_search_key(body) for body in bodies]
+        unique = {}
+        for key, body in zip(keys, bodies):
+            unique.setdefault(key, body)
+        
+        with tracer.start_as_current_span("search_service.search_batch") as batch_span:
+            batch_span.set_attribute("search.batch.size", len(bodies))
+            batch_span.set_attribute("search.batch.unique", len(unique))
+            outcomes = await self.search_service.search_batch(unique, user_id or "")
+            batch_span.set_status(Status(StatusCode.OK))
+        
+        search_ids = {}
+        if user_id:
+            history_keys = [
+                key for key, body in unique.items()
+                if not isinstance(outcomes[key], HTTPException) and is_first_page(body)
+            ]
+            events = [self._history_event(user_id, unique[key]) for key in history_keys]
+            queued = await self.history_writer.enqueue_many(events)
+            search_ids = {
+                key: event["id"] for key, event, ok in zip(history_keys, events, queued) if ok
+            }
+        
+        items = []
+        for index, key in enumerate(keys):
+            outcome = outcomes[key]
+            if isinstance(outcome, HTTPException):
+                items.append(batch_error_item(index, outcome.status_code, outcome.detail))
+            else:
+                items.append({
+                    "index": index,
+                    "status": outcome.get("status", "success"),
+                    "count": outcome.get("count", 0),
+                    "results": outcome.get("results", []),
+                    "next_cursor": outcome.get("next_cursor"),
+                    "search_id": search_ids.get(key),
+                    "error": None
+                })
+        return items
+    
+    def _history_event(self, user_id: str, body: Dict) -> Dict:
+        """
+        Build a history event for a search request. Its ID is derived from
+        the user, the normalized search and the month, so repeats of a
+        search get the ID of the history entry they are recorded under.
+        
+        The body is validated as a SearchRequest first, so values are coerced
+        as the search service coerces them and omitted fields take their
+        defaults, as in canonical_search_key.
+        """
+        request = SearchRequest.parse_obj(body)
+        search_fields = request.search_fields or []
+        created_at = datetime.utcnow()
+        return {
+            "id": history_id(user_id, history_key(request.search_text, search_fields), month_start(created_at)),
+            "user_id": user_id,
+            "search_text": request.search_text,
+            "search_fields": search_fields,
+            "saved": False,
+            "created_at": created_at.isoformat(),
+            "category": request.category
+        }
+    
+    async def _queue_history(self, user_id: str, body: Dict) -> Optional[str]:
+        """
+        Queue a search for history recording and return its pre-generated ID,
+        or None if it could not be queued. The ID is generated here so it can
+        be returned immediately; the history service stores the event when
+        the next batch is flushed.
+        """
+        with tracer.start_as_current_span("user_history.enqueue_search") as history_span:
+            try:
+                event = self._history_event(user_id, body)
+                event_id = event["id"]
+                
+                history_span.set_attribute("user.id", user_id)
+                history_span.set_attribute("search.text", event["search_text"])
+                
+                queued = await self.history_writer.enqueue(event)
+                if not queued:
+                    history_span.set_status(Status(StatusCode.ERROR, "history queue full"))
+                    history_span.set_attribute("error.type", "history_dropped")
+                    return None
+                history_span.set_attribute("search.history.id", event_id)
+                history_span.set_status(Status(StatusCode.OK))
+                return event_id
+            except Exception as e:
+                # Log the error but don't fail the request
+                history_span.set_status(
+                    Status(StatusCode.ERROR, str(e))
+                )
+                history_span.set_attribute("error.type", "history_error")
+                history_span.set_attribute("error.message", str(e))
+                logger.error(f"Failed to queue search history: {str(e)}\n{traceback.format_exc()}")
+                return None
+    
     async def save_search(self, request: SaveSearchRequest) -> Dict:
         """
         Save a search with a name
@@ -97,7 +288,7 @@ class OrchestratorService:
                 search_id=request.search_id,
                 search_name=request.search_name
             )
-            logger.info(f"Search saved successfully: {response}")
+            logger.debug("Search saved successfully: %s", payload(response))
             return response
         except HTTPException as e:
             logger.error(f"HTTP error in save_search: {str(e)}")
@@ -107,19 +298,60 @@ class OrchestratorService:
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
             raise HTTPException(status_code=500, detail=error_msg)
     
-    async def get_user_search_history(self, user_id: str, saved: Optional[bool] = None) -> List[Dict]:
+    async def save_searches(self, request: SaveSearchBatchRequest) -> Dict:
         """
-        Get search history for a user
+        Save or rename several searches at once
         """
         try:
-            logger.info(f"Retrieving search history for user {user_id} (saved={saved})")
-            response = await self.user_history_service.get_user_search_history(user_id, saved)
-            logger.info(f"Retrieved {len(response)} history entries")
+            logger.info(f"Saving {len(request.items)} searches for user {request.user_id}")
+            response = await self.user_history_service.save_searches(
+                request.user_id,
+                [item.dict() for item in request.items]
+            )
+            logger.info(f"Saved {response['saved']} searches, rejected {len(response['rejected'])}")
             return response
+        except HTTPException as e:
+            logger.error(f"HTTP error in save_searches: {str(e)}")
+            raise
+        except Exception as e:
+            error_msg = f"Error saving searches: {str(e)}"
+            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise HTTPException(status_code=500, detail=error_msg)
+    
+    async def get_user_search_history(
+        self,
+        user_id: str,
+        saved: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get a page of search history for a user and the next page's cursor
+        """
+        try:
+            logger.info(f"Retrieving search history for user {user_id} (saved={saved})")
+            entries, next_cursor = await self.user_history_service.get_user_search_history(user_id, saved, limit, cursor)
+            logger.info(f"Retrieved {len(entries)} history entries")
+            return entries, next_cursor
         except HTTPException as e:
             logger.error(f"HTTP error in get_user_search_history: {str(e)}")
             raise
         except Exception as e:
             error_msg = f"Error retrieving search history: {str(e)}"
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
-            raise HTTPException(status_code=500, detail=error_msg) 
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=error_msg)
+    
+    async def get_trending(self, window: str, category: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Get the popular or trending searches, overall or in a category
+        """
+        try:
+            logger.info(f"Retrieving {window} searches (category={category})")
+            return await self.user_history_service.get_trending(window, category, limit)
+        except HTTPException as e:
+            logger.error(f"HTTP error in get_trending: {str(e)}")
+            raise
+        except Exception as e:
+            error_msg = f"Error retrieving {window} searches: {str(e)}"
+            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise HTTPException(status_code=500, detail=error_msg)
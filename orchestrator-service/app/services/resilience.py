@@ -0,0 +1,229 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    closed:    requests flow; `failure_threshold` consecutive failures open it
+    open:      requests are rejected until `reset_timeout` has passed
+    half_open: up to `half_open_max_calls` probes are let through; a success
+               closes the circuit, a failure opens it again
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_max_calls: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_in_flight = 0
+
+        self.trips_total = 0
+        self.rejected_total = 0
+
+    def allow_request(self) -> bool:
+        """
+        Whether a request may be sent now; a permitted half-open probe must
+        be followed by record_success or record_failure
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected_total += 1
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self.half_open_in_flight >= self.half_open_max_calls:
+                self.rejected_total += 1
+                return False
+            self.half_open_in_flight += 1
+        return True
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            self.half_open_in_flight = max(self.half_open_in_flight - 1, 0)
+            self._transition(self.CLOSED)
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        if self.state == self.HALF_OPEN:
+            self.half_open_in_flight = max(self.half_open_in_flight - 1, 0)
+            self._open()
+            return
+        self.consecutive_failures += 1
+        if self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """
+        Give back a permitted request that ended without an outcome
+        (e.g. the caller was cancelled)
+        """
+        if self.state == self.HALF_OPEN:
+            self.half_open_in_flight = max(self.half_open_in_flight - 1, 0)
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self.trips_total += 1
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit for {self.name} {self.state} -> {state}")
+            self.state = state
+            if state == self.CLOSED:
+                self.half_open_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips_total": self.trips_total,
+            "rejected_total": self.rejected_total
+        }
+
+class RetryBudget:
+    """
+    Caps retries (and hedges) to a fraction of recent requests, measured over
+    a sliding window of one-second buckets, with a small floor so that low
+    traffic can still retry
+    """
+    def __init__(self, ratio: float, min_per_second: float, window: int = 10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests = [0] * window
+        self._retries = [0] * window
+        self._bucket_times = [0] * window
+
+        self.retries_total = 0
+        self.exhausted_total = 0
+
+    def _bucket(self) -> int:
+        second = int(time.monotonic())
+        index = second % self.window
+        if self._bucket_times[index] != second:
+            self._bucket_times[index] = second
+            self._requests[index] = 0
+            self._retries[index] = 0
+        return index
+
+    def _window_totals(self):
+        oldest = int(time.monotonic()) - self.window
+        requests = retries = 0
+        for index in range(self.window):
+            if self._bucket_times[index] > oldest:
+                requests += self._requests[index]
+                retries += self._retries[index]
+        return requests, retries
+
+    def record_request(self):
+        self._requests[self._bucket()] += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Take one retry from the budget if any is left
+        """
+        index = self._bucket()
+        requests, retries = self._window_totals()
+        allowed = max(self.ratio * requests, self.min_per_second * self.window)
+        if retries + 1 > allowed:
+            self.exhausted_total += 1
+            return False
+        self._retries[index] += 1
+        self.retries_total += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        requests, retries = self._window_totals()
+        return {
+            "ratio": self.ratio,
+            "window_requests": requests,
+            "window_retries": retries,
+            "retries_total": self.retries_total,
+            "exhausted_total": self.exhausted_total
+        }
+
+class LatencyTracker:
+    """
+    Recent successful request latencies, for percentile-based hedge delays
+    """
+    def __init__(self, size: int = 512):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int = 20) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+class ResiliencePolicy:
+    """
+    Circuit breaker, retry budget and hedging settings for one upstream
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.CIRCUIT_RESET_TIMEOUT,
+        half_open_max_calls: int = settings.CIRCUIT_HALF_OPEN_MAX_CALLS,
+        max_retries: int = settings.RETRY_MAX_ATTEMPTS,
+        retry_backoff: float = settings.RETRY_BACKOFF_BASE,
+        retry_budget_ratio: float = settings.RETRY_BUDGET_RATIO,
+        retry_budget_min_per_second: float = settings.RETRY_BUDGET_MIN_PER_SECOND,
+        hedge_enabled: bool = settings.HEDGE_ENABLED,
+        hedge_percentile: float = settings.HEDGE_PERCENTILE,
+        hedge_min_delay: float = settings.HEDGE_MIN_DELAY
+    ):
+        self.name = name
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout, half_open_max_calls)
+        self.budget = RetryBudget(retry_budget_ratio, retry_budget_min_per_second)
+        self.latency = LatencyTracker()
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+
+        self.hedges_total = 0
+        self.hedge_wins_total = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        How long to wait before hedging, or None if hedging is off or there
+        are not enough latency samples yet
+        """
+        if not self.hedge_enabled:
+            return None
+        observed = self.latency.percentile(self.hedge_percentile)
+        if observed is None:
+            return None
+        return max(observed, self.hedge_min_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "circuit": self.breaker.stats(),
+            "retry_budget": self.budget.stats(),
+            "max_retries": self.max_retries,
+            "latency_p95": p95,
+            "hedging": {
+                "enabled": self.hedge_enabled,
+                "delay": self.hedge_delay(),
+                "hedges_total": self.hedges_total,
+                "hedge_wins_total": self.hedge_wins_total
+            }
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import orjson
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, NamedTuple, Optional
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.core.config import settings
+from app.core import deadline
+from app.models.schemas import SearchRequest
+
+# Request fields that do not change the search results
+_IGNORED_FIELDS = {"user_id", "category"}
+# List fields whose order does not change the search results
+_SET_FIELDS = ("search_fields", "select")
+
+def canonical_search_key(body: Dict[str, Any]) -> str:
+    """
+    Build a cache key from a search request body.
+
+    The body is validated as a SearchRequest first, so values are coerced
+    and omitted fields take their defaults as in the search service, and
+    field lists are sorted so that requests which produce the same results
+    map to the same key. An invalid body is rejected with a 422.
+    """
+    try:
+        request = SearchRequest.parse_obj(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    canonical = request.dict(exclude=_IGNORED_FIELDS)
+    for name in _SET_FIELDS:
+        if canonical[name] is not None:
+            canonical[name] = sorted(set(canonical[name]))
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+class RawSearchResult(NamedTuple):
+    """
+    Search service response kept as undecoded JSON bytes
+    """
+    content: bytes
+    count: Optional[int]
+
+class _CacheEntry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+class SearchResultCache:
+    """
+    In-process TTL + LRU cache for search results with a memory budget.
+
+    Concurrent misses for the same key are coalesced: only the first caller
+    triggers the upstream load and the others wait for its result.
+    """
+    def __init__(
+        self,
+        ttl: float = settings.SEARCH_CACHE_TTL,
+        max_bytes: int = settings.SEARCH_CACHE_MAX_BYTES,
+        max_entries: int = settings.SEARCH_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.uncacheable = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, loading it at most once if missing
+        """
+        value = self._fresh(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await self._wait(inflight)
+
+        self.misses += 1
+        # The load runs as its own task so that a cancelled caller does not
+        # fail the requests coalesced onto it. It runs without this caller's
+        # deadline (only the upstream call timeout bounds it) and every
+        # caller gives up at its own deadline instead.
+        task = deadline.start_detached(loader())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._load_finished(key, done))
+        return await self._wait(task)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for key, or None if it is missing; the
+        caller loads and `put`s missing values itself, without coalescing
+        """
+        value = self._fresh(key)
+        if value is None:
+            self.misses += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Cache a value loaded after a `get` miss (errors and values over the
+        memory budget are not cached)
+        """
+        self._store(key, value)
+
+    def _fresh(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    async def _wait(self, load: asyncio.Future) -> Any:
+        """
+        Wait for a shared load until the current request's deadline; the
+        load itself carries on for the other callers
+        """
+        try:
+            return await deadline.within_deadline(asyncio.shield(load))
+        except deadline.DeadlineExceeded:
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+    def _load_finished(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._store(key, task.result())
+
+    def _store(self, key: str, value: Any):
+        if isinstance(value, RawSearchResult):
+            size = len(value.content)
+        elif isinstance(value, dict) and value.get("status", "success") == "success":
+            size = len(orjson.dumps(value, default=str))
+        else:
+            self.uncacheable += 1
+            return
+        if size > self.max_bytes:
+            self.uncacheable += 1
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(value, size, time.monotonic() + self.ttl)
+        self._bytes += size
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        """
+        Drop all cached entries
+        """
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Size and hit/miss/coalesce counters
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "uncacheable": self.uncacheable
+        }
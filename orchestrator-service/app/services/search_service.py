@@ -1,17 +1,21 @@
-from typing import Dict
-from fastapi import Request
+from typing import Dict, Any, Optional, AsyncIterator, Union
+from fastapi import HTTPException, Request
 from .interfaces import ServiceInterface
+from .search_cache import SearchResultCache, RawSearchResult, canonical_search_key
+from .streaming import NDJSON_MEDIA_TYPE
+from app.core.structured_logging import payload
+from app.core.metrics import stage_timer
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
 class SearchService:
     """
-    Search service client
+    Search service client with an optional result cache in front of it
     """
-    def __init__(self, service: ServiceInterface):
+    def __init__(self, service: ServiceInterface, cache: Optional[SearchResultCache] = None):
         self.service = service
+        self.cache = cache
     
     async def search(self, request: Request) -> Dict:
         """
@@ -19,19 +23,112 @@ class SearchService:
         """
         # Get the raw request body
         raw_body = await request.json()
-        logger.info(f"Received raw request body: {raw_body}")
+        logger.debug("Received raw request body: %s", payload(raw_body))
         
-        # Create a new headers dict with only the necessary headers
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "user_id": request.headers.get("user_id", "")
-        }
+        return await self.search_body(raw_body, request.headers.get("user_id", ""))
+    
+    async def search_body(self, body: Dict[str, Any], user_id: str) -> Dict:
+        """
+        Forward an already parsed search request to the search service
+        """
+        headers = self._forward_headers(user_id)
+        logger.debug("Forwarding headers: %s", payload(headers))
         
-        logger.info(f"Forwarding headers: {headers}")
+        # Searches are read-only, so the POST is safe to retry
+        with stage_timer("search_call"):
+            if self.cache is None:
+                return await self.service.call_service("/api/search", "POST", body, headers, idempotent=True)
+            
+            return await self.cache.get_or_load(
+                canonical_search_key(body),
+                lambda: self.service.call_service("/api/search", "POST", body, headers, idempotent=True)
+            )
+    
+    async def search_batch(
+        self,
+        searches: Dict[str, Dict[str, Any]],
+        user_id: str
+    ) -> Dict[str, Union[Dict, HTTPException]]:
+        """
+        Run distinct searches, keyed by their cache keys, with one call to
+        the search service's batch endpoint; cached ones are not sent.
+        Returns each search's result, or the HTTPException it failed with,
+        under its key.
+        """
+        outcomes: Dict[str, Union[Dict, HTTPException]] = {}
+        pending = []
+        for key in searches:
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                outcomes[key] = cached
+            else:
+                pending.append(key)
+        if not pending:
+            return outcomes
         
-        # Convert the body to a string to ensure proper serialization
-        json_body = json.dumps(raw_body)
-        logger.info(f"Serialized request body: {json_body}")
+        headers = self._forward_headers(user_id)
+        with stage_timer("search_call"):
+            try:
+                response = await self.service.call_service(
+                    "/api/search/batch",
+                    "POST",
+                    {"searches": [searches[key] for key in pending]},
+                    headers,
+                    idempotent=True,
+                    compress=True
+                )
+            except HTTPException as e:
+                # The whole batch failed, e.g. with the search service throttled
+                return {**outcomes, **{key: e for key in pending}}
         
-        return await self.service.call_service("/api/search", "POST", raw_body, headers) 
\ No newline at end of file
+        for key, item in zip(pending, response["results"]):
+            if item["status"] == "error":
+                outcomes[key] = HTTPException(status_code=item["error"]["status_code"], detail=item["error"]["detail"])
+                continue
+            result = {
+                "status": item["status"],
+                "count": item["count"],
+                "results": item["results"],
+                "next_cursor": item["next_cursor"]
+            }
+            outcomes[key] = result
+            if self.cache is not None:
+                self.cache.put(key, result)
+        return outcomes
+    
+    async def search_raw(self, raw_body: bytes, body: Dict[str, Any], user_id: str) -> RawSearchResult:
+        """
+        Forward an undecoded search request body and return the undecoded
+        response. `body` is the parsed request, used only for the cache key.
+        """
+        headers = self._forward_headers(user_id)
+        
+        async def load() -> RawSearchResult:
+            content, response_headers = await self.service.call_service_raw(
+                "/api/search", "POST", raw_body, headers, idempotent=True
+            )
+            count = response_headers.get("x-result-count")
+            return RawSearchResult(content, int(count) if count is not None else None)
+        
+        with stage_timer("search_call"):
+            if self.cache is None:
+                return await load()
+            
+            # Raw and decoded results are cached under separate keys
+            return await self.cache.get_or_load("raw:" + canonical_search_key(body), load)
+    
+    def search_stream(self, raw_body: bytes, user_id: str) -> AsyncIterator[bytes]:
+        """
+        Forward a search request asking for NDJSON and yield the response
+        body chunks as they arrive (streams bypass the cache)
+        """
+        headers = self._forward_headers(user_id, accept=NDJSON_MEDIA_TYPE)
+        return self.service.stream_service("/api/search", "POST", raw_body, headers)
+    
+    def _forward_headers(self, user_id: str, accept: str = "application/json") -> Dict[str, str]:
+        # Create a new headers dict with only the necessary headers
+        return {
+            "Content-Type": "application/json",
+            "Accept": accept,
+            "user_id": user_id
+        }
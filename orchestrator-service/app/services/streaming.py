@@ -0,0 +1,80 @@
+import json
+import logging
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """
+    Whether the client negotiated a newline-delimited JSON response
+    """
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+def is_error_record(chunk: bytes) -> bool:
+    """
+    Whether a stream chunk starts with an {"_type": "error"} record, i.e.
+    the search failed before producing any result
+    """
+    line = chunk.split(b"\n", 1)[0]
+    if not line.startswith(b'{"_type"'):
+        return False
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return False
+    return isinstance(record, dict) and record.get("_type") == "error"
+
+async def relay_ndjson(chunks: AsyncIterator[bytes], search_id: Optional[str]) -> AsyncIterator[bytes]:
+    """
+    Relay an NDJSON search stream chunk by chunk, adding `search_id` to the
+    trailing summary record.
+    
+    Document lines are passed through undecoded; only the last line of the
+    stream (the summary, or an error record) is held back and parsed. If the
+    upstream fails part-way through (e.g. a chunk takes longer than the read
+    timeout), the complete lines received are followed by an error record.
+    """
+    held = b""
+    partial = b""
+    try:
+        async for chunk in chunks:
+            data = partial + chunk
+            end = data.rfind(b"\n")
+            if end == -1:
+                partial = data
+                continue
+            complete, partial = data[:end + 1], data[end + 1:]
+            # Keep the last complete line back in case it is the final record
+            last_start = complete.rfind(b"\n", 0, len(complete) - 1) + 1
+            out = held + complete[:last_start]
+            held = complete[last_start:]
+            if out:
+                yield out
+    except Exception as e:
+        logger.error(f"Search stream relay failed: {str(e)}")
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        yield held + json.dumps({"_type": "error", "detail": detail}).encode() + b"\n"
+        return
+    
+    # The final record is the unterminated tail if there is one, otherwise
+    # the last complete line
+    if partial.strip():
+        if held:
+            yield held
+        final = partial.strip()
+    else:
+        final = held.strip()
+    if not final:
+        return
+    try:
+        record = json.loads(final)
+    except ValueError:
+        yield final + b"\n"
+        return
+    if isinstance(record, dict) and record.get("_type") == "summary":
+        record["search_id"] = search_id
+        final = json.dumps(record, separators=(",", ":")).encode()
+    yield final + b"\n"
@@ -1,5 +1,11 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import quote, urlencode
+import orjson
 from .interfaces import ServiceInterface
+from app.core.metrics import stage_timer
+
+# Response header carrying the cursor of the next history page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 class UserHistoryService:
     """
@@ -8,18 +14,13 @@ class UserHistoryService:
     def __init__(self, service: ServiceInterface):
         self.service = service
     
-    async def record_search(self, user_id: str, search_text: str, search_fields: List[str]) -> Dict:
+    async def record_search_batch(self, events: List[Dict]) -> Dict:
         """
-        Record a search in history
+        Record a batch of searches in history with a single request; large
+        batches are sent gzipped
         """
-        data = {
-            "user_id": user_id,
-            "search_text": search_text,
-            "search_fields": search_fields,
-            "saved": False
-        }
-        
-        return await self.service.call_service("/api/history", "POST", data)
+        with stage_timer("history_call"):
+            return await self.service.call_service("/api/history/batch", "POST", {"items": events}, compress=True)
     
     async def save_search(self, user_id: str, search_id: str, search_name: str) -> Dict:
         """
@@ -31,14 +32,54 @@ class UserHistoryService:
             "search_name": search_name
         }
         
-        return await self.service.call_service("/api/history/save", "POST", data)
+        with stage_timer("history_call"):
+            return await self.service.call_service("/api/history/save", "POST", data)
+    
+    async def save_searches(self, user_id: str, items: List[Dict[str, str]]) -> Dict:
+        """
+        Save or rename several searches with one request; the result lists
+        the updated entries and the search IDs that were rejected
+        """
+        with stage_timer("history_call"):
+            return await self.service.call_service(
+                "/api/history/save/batch", "POST", {"user_id": user_id, "items": items}, compress=True
+            )
     
-    async def get_user_search_history(self, user_id: str, saved: Optional[bool] = None) -> List[Dict]:
+    async def get_user_search_history(
+        self,
+        user_id: str,
+        saved: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
         """
-        Get search history for a user
+        Get a page of search history for a user, newest first, and the
+        cursor of the next page (None on the last page)
         """
-        endpoint = f"/api/history/user/{user_id}"
+        params = {}
         if saved is not None:
-            endpoint += f"?saved={str(saved).lower()}"
+            params["saved"] = str(saved).lower()
+        if limit is not None:
+            params["limit"] = str(limit)
+        if cursor:
+            params["cursor"] = cursor
+        endpoint = f"/api/history/user/{quote(user_id, safe='')}"
+        if params:
+            endpoint += "?" + urlencode(params)
+        
+        with stage_timer("history_call"):
+            content, headers = await self.service.call_service_raw(endpoint, "GET")
+        return orjson.loads(content), headers.get(NEXT_CURSOR_HEADER)
+    
+    async def get_trending(self, window: str, category: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Get the popular or trending searches, overall or in a category
+        """
+        params = {"window": window}
+        if category:
+            params["category"] = category
+        if limit is not None:
+            params["limit"] = str(limit)
         
-        return await self.service.call_service(endpoint, "GET") 
\ No newline at end of file
+        with stage_timer("history_call"):
+            return await self.service.call_service(f"/api/trending?{urlencode(params)}", "GET")
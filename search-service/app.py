@@ -7,19 +7,12 @@ from pydantic import BaseModel
 from typing import List, Optional
 import json
 import logging
-import sys
 import traceback
+from app.core.exceptions import SearchThrottledError
+from app.core.structured_logging import payload
+from app.services.throttle import THROTTLE_STATUSES, get_azure_scheduler, parse_retry_after
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 load_dotenv()
 
@@ -38,6 +31,7 @@ app.add_middleware(
 SEARCH_SERVICE_ENDPOINT = os.getenv("SEARCH_SERVICE_ENDPOINT")
 INDEX_NAME = os.getenv("INDEX_NAME")
 ADMIN_KEY = os.getenv("ADMIN_KEY")
+AZURE_MAX_RETRIES = int(os.getenv("AZURE_MAX_RETRIES", "3"))
 
 # Log environment variable status
 logger.info("Environment variable status:")
@@ -62,7 +56,7 @@ async def forward_to_azure(request: SearchRequest):
         
         # Construct the Azure AI Search URL
         azure_url = f"{SEARCH_SERVICE_ENDPOINT}/indexes/{INDEX_NAME}/docs/search"
-        logger.info(f"Azure URL: {azure_url}")
+        logger.debug("Azure URL: %s", azure_url)
         
         # Forward headers
         headers = {
@@ -76,25 +70,35 @@ async def forward_to_azure(request: SearchRequest):
             "searchFields": request.search_fields,
             "select": request.select
         }
-        logger.info(f"Search body: {json.dumps(search_body, indent=2)}")
+        logger.debug("Search body: %s", payload(search_body))
         
-        # Make the request to Azure AI Search
+        # Make the request to Azure AI Search, paced by the shared scheduler;
+        # throttled attempts pause the scheduler for Retry-After and retry
+        scheduler = get_azure_scheduler()
         async with httpx.AsyncClient() as client:
             try:
-                response = await client.post(
-                    url=azure_url,
-                    params=params,
-                    headers=headers,
-                    json=search_body
-                )
+                for attempt in range(AZURE_MAX_RETRIES + 1):
+                    await scheduler.acquire()
+                    response = await client.post(
+                        url=azure_url,
+                        params=params,
+                        headers=headers,
+                        json=search_body
+                    )
+                    if response.status_code not in THROTTLE_STATUSES:
+                        break
+                    retry_after = parse_retry_after(response.headers, scheduler.default_retry_after)
+                    scheduler.throttled(retry_after)
+                else:
+                    raise SearchThrottledError(retry_after)
                 
                 # Log response status and content
-                logger.info(f"Azure Search response status: {response.status_code}")
-                logger.info(f"Azure Search response headers: {dict(response.headers)}")
-                logger.info(f"Azure Search response text: {response.text}")
+                logger.info("Azure Search response status: %s", response.status_code)
+                logger.debug("Azure Search response headers: %s", payload(dict(response.headers)))
+                logger.debug("Azure Search response text: %s", payload(response.content))
                 
                 if response.status_code != 200:
-                    error_msg = f"Azure Search error: {response.text}"
+                    error_msg = f"Azure Search error: {payload(response.content)}"
                     logger.error(error_msg)
                     raise HTTPException(status_code=response.status_code, detail=error_msg)
                 
@@ -106,7 +110,7 @@ async def forward_to_azure(request: SearchRequest):
                         "count": len(search_results.get("value", [])),
                         "results": search_results.get("value", [])
                     }
-                    logger.info(f"Formatted response: {json.dumps(formatted_response, indent=2)}")
+                    logger.debug("Formatted response: %s", payload(formatted_response))
                     return formatted_response
                 except json.JSONDecodeError as e:
                     error_msg = f"Failed to parse Azure Search response: {str(e)}"
@@ -117,6 +121,8 @@ async def forward_to_azure(request: SearchRequest):
                 error_msg = f"Failed to make request to Azure Search: {str(e)}"
                 logger.error(error_msg)
                 raise HTTPException(status_code=500, detail=error_msg)
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = f"Unexpected error in forward_to_azure: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
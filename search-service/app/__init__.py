@@ -1,6 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from app.api.routes import router as api_router
+from app.api.debug import router as debug_router
 from app.core.config import settings
+from app.core.deadline import DeadlineMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.telemetry import instrument_app
+from app.core import metrics
+from app.core.responses import FastJSONResponse
+from app.services.search_provider import SearchProvider
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -8,11 +18,59 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse if settings.FAST_RESPONSES_ENABLED else metrics.TimedJSONResponse
+)
+
+# Add OpenTelemetry instrumentation to FastAPI; continues the caller's trace
+instrument_app(app)
+
+# Compress responses and accept gzip request bodies
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        max_request_size=settings.COMPRESSION_MAX_REQUEST_SIZE
+    )
+
+# Cancel searches once the caller's deadline has passed
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=settings.REQUEST_DEADLINE_DEFAULT,
+    max_timeout=settings.REQUEST_DEADLINE_MAX
 )
 
+# Request counts and latency per route
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(api_router)
+if settings.DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug_router)
+
+@app.on_event("startup")
+async def startup():
+    # Create the provider once so its connections and token are reused.
+    # If Azure is unreachable at boot, the first search retries the start.
+    try:
+        await SearchProvider.get_provider("azure").start()
+    except Exception as e:
+        logger.error(f"Failed to start search provider: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await SearchProvider.close_all()
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """
+        Request and stage latency histograms in the Prometheus text format
+        """
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from app.services.throttle import get_azure_scheduler
+
+router = APIRouter(prefix="/debug")
+
+@router.get("/azure-scheduler", response_model=Dict[str, Any])
+async def azure_scheduler_stats():
+    """
+    Azure request pacing: token bucket, queue depth, wait times and throttles
+    """
+    return get_azure_scheduler().stats()
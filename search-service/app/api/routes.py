@@ -1,30 +1,167 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import SearchRequest, SearchResponse
+from fastapi import APIRouter, HTTPException, Depends, Response, Header
+from fastapi.responses import StreamingResponse
+from app.models.schemas import SearchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse
 from app.services.search_provider import SearchProvider
-from typing import Callable
+from app.services.pagination import resolve_page, encode_cursor
+from app.services.streaming import NDJSON_MEDIA_TYPE, wants_ndjson, start_ndjson_search_stream
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.responses import FastJSONResponse
+from typing import Any, Dict, Optional
 
 router = APIRouter(prefix="/api")
 
 def get_search_provider():
     return SearchProvider.get_provider("azure")
 
-@router.post("/search", response_model=SearchResponse)
+def batch_error_item(index: int, status_code: int, detail) -> Dict[str, Any]:
+    # Every BatchSearchItem field is present, so the shape is the same
+    # whether or not the response is validated
+    return {
+        "index": index,
+        "status": "error",
+        "count": None,
+        "results": None,
+        "next_cursor": None,
+        "error": {"status_code": status_code, "detail": detail}
+    }
+
+@router.post(
+    "/search",
+    response_model=SearchResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+)
 async def search(
     request: SearchRequest, 
+    response: Response,
+    accept: Optional[str] = Header(None),
     search_provider: SearchProvider = Depends(get_search_provider)
 ):
+    """
+    Execute a search. Send `Accept: application/x-ndjson` to receive results
+    as a stream of JSON lines terminated by a summary record.
+    """
+    stream = wants_ndjson(accept)
+    try:
+        page_size, skip = resolve_page(
+            request.top,
+            request.skip,
+            request.cursor,
+            settings.SEARCH_DEFAULT_PAGE_SIZE,
+            settings.SEARCH_MAX_STREAM_RESULTS if stream else settings.SEARCH_MAX_PAGE_SIZE,
+            settings.SEARCH_MAX_SKIP
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        # Execute search using provider
+        if stream:
+            # The first result is awaited before the 200 is sent, so a
+            # search that fails outright gets its real status below
+            chunks = await start_ndjson_search_stream(
+                search_provider,
+                request.search_text,
+                request.search_fields,
+                request.select,
+                page_size,
+                skip
+            )
+            return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+        
+        # Execute search using provider; one extra result tells us whether
+        # there is a next page
         results = await search_provider.search(
             search_text=request.search_text,
             search_fields=request.search_fields,
-            select=request.select
+            select=request.select,
+            top=page_size + 1,
+            skip=skip
         )
+        has_more = len(results) > page_size
+        results = results[:page_size]
         
-        return {
+        # Lets callers relaying the body undecoded still report the count
+        headers = {"X-Result-Count": str(len(results))}
+        content = {
             "status": "success",
             "count": len(results),
-            "results": results
+            "results": results,
+            "next_cursor": encode_cursor(skip + page_size) if has_more else None
         }
+        
+        # Azure's documents are returned as is rather than re-validated
+        # against SearchResponse
+        if settings.FAST_RESPONSES_ENABLED:
+            return FastJSONResponse(content, headers=headers)
+        response.headers.update(headers)
+        return content
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    search_provider: SearchProvider = Depends(get_search_provider)
+):
+    """
+    Execute several searches in one request. Searches run concurrently up to
+    SEARCH_BATCH_MAX_CONCURRENCY; each item reports its own result or error.
+    """
+    if len(request.searches) > settings.SEARCH_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {settings.SEARCH_BATCH_MAX_ITEMS} searches"
+        )
+    
+    items = [None] * len(request.searches)
+    queries = []
+    pages = []
+    for index, search_request in enumerate(request.searches):
+        try:
+            page_size, skip = resolve_page(
+                search_request.top,
+                search_request.skip,
+                search_request.cursor,
+                settings.SEARCH_DEFAULT_PAGE_SIZE,
+                settings.SEARCH_MAX_PAGE_SIZE,
+                settings.SEARCH_MAX_SKIP
+            )
+        except ValueError as e:
+            items[index] = batch_error_item(index, 400, str(e))
+            continue
+        queries.append({
+            "search_text": search_request.search_text,
+            "search_fields": search_request.search_fields,
+            "select": search_request.select,
+            "top": page_size + 1,
+            "skip": skip
+        })
+        pages.append((index, page_size, skip))
+    
+    outcomes = await search_provider.search_many(queries, settings.SEARCH_BATCH_MAX_CONCURRENCY)
+    for (index, page_size, skip), outcome in zip(pages, outcomes):
+        if isinstance(outcome, Exception):
+            if isinstance(outcome, HTTPException):
+                items[index] = batch_error_item(index, outcome.status_code, outcome.detail)
+            elif isinstance(outcome, DeadlineExceeded):
+                items[index] = batch_error_item(index, 504, str(outcome))
+            else:
+                items[index] = batch_error_item(index, 500, str(outcome))
+            continue
+        results = outcome[:page_size]
+        items[index] = {
+            "index": index,
+            "status": "success",
+            "count": len(results),
+            "results": results,
+            "next_cursor": encode_cursor(skip + page_size) if len(outcome) > page_size else None,
+            "error": None
+        }
+    
+    if settings.FAST_RESPONSES_ENABLED:
+        return FastJSONResponse({"results": items})
+    return {"results": items}
@@ -1,6 +1,9 @@
 import os
 from pydantic import BaseSettings
+from typing import Optional
 from dotenv import load_dotenv
+from app.core.structured_logging import configure_logging
+from app.core.telemetry import configure_telemetry
 
 # Load .env file
 load_dotenv()
@@ -16,8 +19,121 @@ class Settings(BaseSettings):
     AZURE_TENANT_ID: str = os.getenv("AZURE_TENANT_ID", "")
     AZURE_CLIENT_ID: str = os.getenv("AZURE_CLIENT_ID", "")
     AZURE_CLIENT_SECRET: str = os.getenv("AZURE_CLIENT_SECRET", "")
+    # Query/admin API key; when set it is used instead of AAD (e.g. against
+    # the local fake endpoint in benchmarks/)
+    ADMIN_KEY: str = os.getenv("ADMIN_KEY", "")
+    AZURE_SEARCH_SCOPE: str = os.getenv("AZURE_SEARCH_SCOPE", "https://search.azure.com/.default")
+    # Renew the AAD token this many seconds before it expires
+    AZURE_TOKEN_REFRESH_MARGIN: float = float(os.getenv("AZURE_TOKEN_REFRESH_MARGIN", "290"))
+    
+    # Connection pool shared by all Azure Search calls
+    AZURE_MAX_CONNECTIONS: int = int(os.getenv("AZURE_MAX_CONNECTIONS", "100"))
+    AZURE_KEEPALIVE_TIMEOUT: float = float(os.getenv("AZURE_KEEPALIVE_TIMEOUT", "30"))
+    
+    # Client-side pacing of Azure AI Search requests: a token bucket sized
+    # to the tier's capacity, a short FIFO queue instead of failing, and a
+    # global pause on 429/503 for the Retry-After Azure asks for
+    AZURE_SEARCH_UNITS: int = int(os.getenv("AZURE_SEARCH_UNITS", "1"))
+    AZURE_QPS_PER_UNIT: float = float(os.getenv("AZURE_QPS_PER_UNIT", "15"))
+    AZURE_THROTTLE_BURST: int = int(os.getenv("AZURE_THROTTLE_BURST", "10"))
+    AZURE_THROTTLE_MAX_WAIT: float = float(os.getenv("AZURE_THROTTLE_MAX_WAIT", "2.0"))
+    AZURE_THROTTLE_MAX_QUEUE: int = int(os.getenv("AZURE_THROTTLE_MAX_QUEUE", "200"))
+    AZURE_THROTTLE_DEFAULT_RETRY_AFTER: float = float(os.getenv("AZURE_THROTTLE_DEFAULT_RETRY_AFTER", "1.0"))
+    # Retries of throttled/failed Azure calls (each retry also takes a token)
+    AZURE_MAX_RETRIES: int = int(os.getenv("AZURE_MAX_RETRIES", "3"))
+    
+    # Result paging: default page size, hard cap per request, and the
+    # deepest offset Azure AI Search accepts for skip
+    SEARCH_DEFAULT_PAGE_SIZE: int = int(os.getenv("SEARCH_DEFAULT_PAGE_SIZE", "50"))
+    SEARCH_MAX_PAGE_SIZE: int = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "1000"))
+    SEARCH_MAX_SKIP: int = int(os.getenv("SEARCH_MAX_SKIP", "100000"))
+    # Page size cap for streamed (NDJSON) responses
+    SEARCH_MAX_STREAM_RESULTS: int = int(os.getenv("SEARCH_MAX_STREAM_RESULTS", "100000"))
+    
+    # Multi-query searches: maximum queries per batch and how many run
+    # against Azure at once
+    SEARCH_BATCH_MAX_ITEMS: int = int(os.getenv("SEARCH_BATCH_MAX_ITEMS", "50"))
+    SEARCH_BATCH_MAX_CONCURRENCY: int = int(os.getenv("SEARCH_BATCH_MAX_CONCURRENCY", "8"))
+    
+    # Encode responses with orjson and return Azure results without
+    # re-validating them against the response models
+    FAST_RESPONSES_ENABLED: bool = os.getenv("FAST_RESPONSES_ENABLED", "true").lower() == "true"
+    
+    # Request deadlines: callers send their remaining budget in
+    # X-Request-Timeout-Ms; requests without one get the default (0 = none)
+    REQUEST_DEADLINE_DEFAULT: float = float(os.getenv("REQUEST_DEADLINE_DEFAULT", "0"))
+    REQUEST_DEADLINE_MAX: float = float(os.getenv("REQUEST_DEADLINE_MAX", "60.0"))
+    
+    # Expose /debug endpoints (scheduler statistics etc.); off unless
+    # enabled, as they reveal internal state
+    DEBUG_ENDPOINTS_ENABLED: bool = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() == "true"
+    
+    # Response compression (brotli or gzip, as negotiated) for bodies of at
+    # least the minimum size, and the largest gzip request body accepted
+    # once decompressed
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_MAX_REQUEST_SIZE: int = int(os.getenv("COMPRESSION_MAX_REQUEST_SIZE", str(10 * 1024 * 1024)))
+
+    # Prometheus-style /metrics endpoint with per-route and per-stage
+    # latency histograms
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Logging: level, "text" or "json" output, per-logger sampling of
+    # sub-WARNING records ("app.services.http_service=0.1,..."), size caps for
+    # messages and logged payloads, and the bounded handler queue
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_MAX_MESSAGE_LENGTH: int = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", "4000"))
+    LOG_PAYLOAD_MAX_LENGTH: int = int(os.getenv("LOG_PAYLOAD_MAX_LENGTH", "1000"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    
+    # Azure Application Insights
+    APPINSIGHTS_CONNECTION_STRING: Optional[str] = os.getenv("APPINSIGHTS_CONNECTION_STRING")
+    
+    # Tracing: exporter ("azure", "otlp", "file", "console" or "none";
+    # Azure Monitor by default when a connection string is set), head
+    # sampling ratio for new traces (callers' decisions are followed), and
+    # optional tail sampling that keeps only failed traces, traces slower
+    # than the threshold, and the sampling ratio of the rest
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "azure" if os.getenv("APPINSIGHTS_CONNECTION_STRING") else "none")
+    TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    TRACING_TAIL_SAMPLING: bool = os.getenv("TRACING_TAIL_SAMPLING", "false").lower() == "true"
+    TRACING_TAIL_LATENCY_MS: float = float(os.getenv("TRACING_TAIL_LATENCY_MS", "500"))
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: Optional[str] = os.getenv("TRACING_OTLP_ENDPOINT")
+    TRACING_INSTRUMENT_LOGGING: bool = os.getenv("TRACING_INSTRUMENT_LOGGING", "true").lower() == "true"
     
     class Config:
         env_file = ".env"
 
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
+
+# Set up logging: one queue-backed handler on the root logger
+configure_logging(
+    settings.PROJECT_NAME,
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    max_message_length=settings.LOG_MAX_MESSAGE_LENGTH,
+    payload_max_length=settings.LOG_PAYLOAD_MAX_LENGTH,
+    queue_size=settings.LOG_QUEUE_SIZE
+)
+
+# Set up OpenTelemetry; this service makes no outgoing httpx calls
+configure_telemetry(
+    settings.PROJECT_NAME,
+    settings.VERSION,
+    exporter=settings.TRACING_EXPORTER,
+    sample_ratio=settings.TRACING_SAMPLE_RATIO,
+    tail_sampling=settings.TRACING_TAIL_SAMPLING,
+    tail_latency_threshold=settings.TRACING_TAIL_LATENCY_MS / 1000,
+    file_path=settings.TRACING_FILE_PATH,
+    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    appinsights_connection_string=settings.APPINSIGHTS_CONNECTION_STRING,
+    instrument_httpx=False,
+    instrument_logging=settings.TRACING_INSTRUMENT_LOGGING
+)
@@ -1,3 +1,4 @@
+import math
 from fastapi import HTTPException
 
 class SearchError(HTTPException):
@@ -10,4 +11,13 @@ class ConfigurationError(HTTPException):
 
 class SearchProviderError(HTTPException):
     def __init__(self, detail: str = "Search provider error"):
-        super().__init__(status_code=500, detail=detail) 
\ No newline at end of file
+        super().__init__(status_code=500, detail=detail)
+
+class SearchThrottledError(HTTPException):
+    def __init__(self, retry_after: float, detail: str = "Search capacity exceeded, retry later"):
+        super().__init__(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+        )
+        self.retry_after = retry_after
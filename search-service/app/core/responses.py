@@ -0,0 +1,45 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Any
+import orjson
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from app.core.metrics import stage_timer
+
+def _default(value: Any) -> Any:
+    # Models are expanded one level at a time; orjson encodes the fields
+    if isinstance(value, BaseModel):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    # Encoded as FastAPI's jsonable_encoder does (orjson itself already
+    # handles UUIDs and dates, these cover subclasses it rejects)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    # Anything else is a bug in the caller, not something to send as its repr
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode JSON with orjson (datetimes as ISO 8601, models via their fields)
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with orjson, timed as the "serialize" stage.
+
+    Returned from a route it also skips FastAPI's response_model handling:
+    the content is neither re-validated nor passed through jsonable_encoder,
+    so only use it for data that is already known to match the model.
+    """
+    def render(self, content: Any) -> bytes:
+        with stage_timer("serialize"):
+            return dumps(content)
@@ -1,12 +1,30 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 class SearchRequest(BaseModel):
     search_text: str
     search_fields: Optional[List[str]] = ["hotelName", "description", "category"]
     select: Optional[List[str]] = ["hotelId", "hotelName", "description", "category"]
+    top: Optional[int] = Field(None, ge=1, description="Page size (capped server-side)")
+    skip: Optional[int] = Field(None, ge=0, description="Number of results to skip")
+    cursor: Optional[str] = Field(None, description="Continuation cursor from a previous page")
 
 class SearchResponse(BaseModel):
     status: str
     count: int
-    results: List[Dict[str, Any]] 
\ No newline at end of file
+    results: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None 
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_items=1)
+
+class BatchSearchItem(BaseModel):
+    index: int
+    status: str
+    count: Optional[int] = None
+    results: Optional[List[Dict[str, Any]]] = None
+    next_cursor: Optional[str] = None
+    error: Optional[Dict[str, Any]] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
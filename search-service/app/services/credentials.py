@@ -0,0 +1,80 @@
+import asyncio
+import time
+import logging
+from typing import Optional
+from azure.core.credentials import AccessToken
+
+logger = logging.getLogger(__name__)
+
+class RefreshingTokenCredential:
+    """
+    Async token credential that keeps a token for a fixed scope warm.
+
+    Requests are served from the cached token while a background task renews
+    it ahead of expiry, so no search has to wait for an AAD round trip.
+    """
+    def __init__(self, credential, scope: str, refresh_margin: float, retry_delay: float = 10.0):
+        self._credential = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self._token: Optional[AccessToken] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        """
+        Return the cached token, fetching one only if none is usable
+        """
+        if scopes and tuple(scopes) != (self.scope,):
+            return await self._credential.get_token(*scopes, **kwargs)
+        token = self._token
+        if token is not None and token.expires_on - time.time() > 30:
+            return token
+        return await self._refresh()
+
+    async def _refresh(self) -> AccessToken:
+        async with self._lock:
+            token = self._token
+            if token is None or token.expires_on - time.time() <= self.refresh_margin:
+                self._token = await self._credential.get_token(self.scope)
+            return self._token
+
+    async def start(self):
+        """
+        Fetch the first token and start proactive refresh
+        """
+        await self._refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            token = self._token
+            delay = self.retry_delay
+            if token is not None:
+                delay = max(token.expires_on - time.time() - self.refresh_margin, self.retry_delay)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh search token: {str(e)}")
+
+    async def close(self):
+        """
+        Stop refreshing and close the underlying credential
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
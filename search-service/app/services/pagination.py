@@ -0,0 +1,47 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+def encode_cursor(skip: int) -> str:
+    """
+    Encode a result offset as an opaque continuation cursor
+    """
+    payload = json.dumps({"skip": skip}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a continuation cursor back into a result offset
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        skip = json.loads(base64.urlsafe_b64decode(padded.encode()))["skip"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(skip, int) or skip < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return skip
+
+def resolve_page(
+    top: Optional[int],
+    skip: Optional[int],
+    cursor: Optional[str],
+    default_page_size: int,
+    max_page_size: int,
+    max_skip: int
+) -> Tuple[int, int]:
+    """
+    Work out (page_size, skip) for a request, applying the server-side cap.
+    A cursor takes precedence over an explicit skip.
+    
+    Raises:
+        ValueError: If the cursor is malformed or the offset is out of range
+    """
+    page_size = min(top or default_page_size, max_page_size)
+    offset = decode_cursor(cursor) if cursor else (skip or 0)
+    if offset > max_skip:
+        raise ValueError(f"Cannot page past {max_skip} results")
+    return page_size, offset
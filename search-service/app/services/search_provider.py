@@ -1,59 +1,242 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from azure.identity import ClientSecretCredential
-from azure.search.documents import SearchClient
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+import aiohttp
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.identity.aio import ClientSecretCredential
+from azure.search.documents.aio import SearchClient
 from app.core.config import settings
+from app.services.credentials import RefreshingTokenCredential
+from app.core import deadline
+from app.core.metrics import stage_timer
+from app.core.exceptions import SearchThrottledError
+from app.services.throttle import AzureThrottlePolicy, THROTTLE_STATUSES, get_azure_scheduler, parse_retry_after
 
 class SearchProvider(ABC):
     """
     Abstract base class for search providers
     """
+    _instances: Dict[str, "SearchProvider"] = {}
+
     @abstractmethod
-    async def search(self, search_text: str, search_fields: List[str], select: List[str]) -> List[Dict[str, Any]]:
+    async def search(
+        self,
+        search_text: str,
+        search_fields: List[str],
+        select: List[str],
+        top: int,
+        skip: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a search against the provider, returning at most `top`
+        results starting at offset `skip`
+        """
+        pass
+
+    async def iter_search(
+        self,
+        search_text: str,
+        search_fields: List[str],
+        select: List[str],
+        top: int,
+        skip: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute a search and yield results one at a time. Providers that can
+        page lazily should override this to yield results as pages arrive.
+        """
+        for result in await self.search(search_text, search_fields, select, top, skip):
+            yield result
+
+    async def search_many(
+        self,
+        queries: List[Dict[str, Any]],
+        max_concurrency: int
+    ) -> List[Union[List[Dict[str, Any]], Exception]]:
+        """
+        Execute several searches concurrently, at most `max_concurrency` at a
+        time. Each query holds the keyword arguments of `search`. Results are
+        returned in query order; a failed query yields its exception.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.search(**query)
+        
+        return await asyncio.gather(*(run(query) for query in queries), return_exceptions=True)
+
+    async def start(self):
+        """
+        Acquire long-lived resources (connections, credentials)
+        """
+        pass
+
+    async def close(self):
         """
-        Execute a search against the provider
+        Release long-lived resources
         """
         pass
     
     @classmethod
     def get_provider(cls, provider_type: str = "azure") -> "SearchProvider":
         """
-        Factory method to get search provider based on type
+        Factory method to get search provider based on type.
+
+        Providers are created once per process and shared by all requests.
         """
-        if provider_type.lower() == "azure":
-            return AzureSearchProvider()
+        provider_type = provider_type.lower()
+        provider = cls._instances.get(provider_type)
+        if provider is not None:
+            return provider
+        if provider_type == "azure":
+            provider = AzureSearchProvider()
         else:
             raise ValueError(f"Unsupported search provider type: {provider_type}")
+        cls._instances[provider_type] = provider
+        return provider
+
+    @classmethod
+    async def close_all(cls):
+        """
+        Close every provider created by get_provider
+        """
+        for provider in list(cls._instances.values()):
+            await provider.close()
+        cls._instances.clear()
 
 class AzureSearchProvider(SearchProvider):
     """
-    Azure AI Search implementation
+    Azure AI Search implementation using the async SDK client.
+
+    One aiohttp session (and therefore one connection pool) is shared by the
+    search client and the AAD credential for the lifetime of the provider.
     """
     def __init__(self):
-        # Authenticate using ClientSecretCredential
-        self.credential = ClientSecretCredential(
-            tenant_id=settings.AZURE_TENANT_ID,
-            client_id=settings.AZURE_CLIENT_ID,
-            client_secret=settings.AZURE_CLIENT_SECRET
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.credential: Optional[RefreshingTokenCredential] = None
+        self.search_client: Optional[SearchClient] = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._start_lock:
+            if self.search_client is None:
+                await self._open()
+
+    async def _open(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.AZURE_MAX_CONNECTIONS,
+                keepalive_timeout=settings.AZURE_KEEPALIVE_TIMEOUT
+            )
         )
         
-        # Create a SearchClient
-        self.search_client = SearchClient(
-            endpoint=settings.SEARCH_SERVICE_ENDPOINT,
-            index_name=settings.INDEX_NAME,
-            credential=self.credential
-        )
+        try:
+            if settings.ADMIN_KEY:
+                credential = AzureKeyCredential(settings.ADMIN_KEY)
+            else:
+                # Authenticate using ClientSecretCredential, with the token
+                # kept warm in the background
+                self.credential = RefreshingTokenCredential(
+                    ClientSecretCredential(
+                        tenant_id=settings.AZURE_TENANT_ID,
+                        client_id=settings.AZURE_CLIENT_ID,
+                        client_secret=settings.AZURE_CLIENT_SECRET,
+                        transport=AioHttpTransport(session=self.session, session_owner=False)
+                    ),
+                    scope=settings.AZURE_SEARCH_SCOPE,
+                    refresh_margin=settings.AZURE_TOKEN_REFRESH_MARGIN
+                )
+                await self.credential.start()
+                credential = self.credential
+            
+            # Create a SearchClient
+            self.search_client = SearchClient(
+                endpoint=settings.SEARCH_SERVICE_ENDPOINT,
+                index_name=settings.INDEX_NAME,
+                credential=credential,
+                transport=AioHttpTransport(session=self.session, session_owner=False),
+                # Every attempt is paced by the scheduler; the SDK retry
+                # policy still honours Retry-After between attempts
+                retry_total=settings.AZURE_MAX_RETRIES,
+                per_retry_policies=[AzureThrottlePolicy(get_azure_scheduler())]
+            )
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.search_client is not None:
+            await self.search_client.close()
+            self.search_client = None
+        if self.credential is not None:
+            await self.credential.close()
+            self.credential = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
     
-    async def search(self, search_text: str, search_fields: List[str], select: List[str]) -> List[Dict[str, Any]]:
+    async def search(
+        self,
+        search_text: str,
+        search_fields: List[str],
+        select: List[str],
+        top: int,
+        skip: int = 0
+    ) -> List[Dict[str, Any]]:
         """
         Execute a search against Azure AI Search
         """
-        # Execute search using Azure Search
-        results = self.search_client.search(
-            search_text=search_text,
-            search_fields=search_fields,
-            select=select
-        )
+        async def collect() -> List[Dict[str, Any]]:
+            # Convert results to list of dictionaries
+            return [
+                result async for result in self.iter_search(search_text, search_fields, select, top, skip)
+            ]
+        
+        # Cancel the Azure call once the caller's deadline has passed
+        with stage_timer("azure_search"):
+            return await deadline.within_deadline(collect())
+
+    async def iter_search(
+        self,
+        search_text: str,
+        search_fields: List[str],
+        select: List[str],
+        top: int,
+        skip: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute a search against Azure AI Search, yielding results as each
+        page arrives
+        """
+        if self.search_client is None:
+            await self.start()
         
-        # Convert results to list of dictionaries
-        return [dict(result) for result in results] 
\ No newline at end of file
+        try:
+            # Execute search using Azure Search
+            results = await deadline.within_deadline(self.search_client.search(
+                search_text=search_text,
+                search_fields=search_fields,
+                select=select,
+                top=top,
+                skip=skip
+            ))
+            
+            # Pages are fetched lazily, so stopping at `top` never requests a
+            # page we do not return
+            count = 0
+            async for result in results:
+                deadline.check()
+                yield dict(result)
+                count += 1
+                if count >= top:
+                    break
+        except HttpResponseError as e:
+            # Still throttled after retries: report 503 + Retry-After, not 500
+            if e.status_code in THROTTLE_STATUSES:
+                scheduler = get_azure_scheduler()
+                headers = e.response.headers if e.response is not None else {}
+                raise SearchThrottledError(parse_retry_after(headers, scheduler.default_retry_after))
+            raise
@@ -0,0 +1,83 @@
+import orjson
+from typing import AsyncIterator, List, Optional
+from app.services.search_provider import SearchProvider
+from app.services.pagination import encode_cursor
+import logging
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """
+    Whether the client negotiated a newline-delimited JSON response
+    """
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+def ndjson_line(record: dict) -> bytes:
+    return orjson.dumps(record, default=str) + b"\n"
+
+async def start_ndjson_search_stream(
+    search_provider: SearchProvider,
+    search_text: str,
+    search_fields: List[str],
+    select: List[str],
+    page_size: int,
+    skip: int
+) -> AsyncIterator[bytes]:
+    """
+    Start a search and wait for its first result before returning its NDJSON
+    stream, so that a search failing outright raises here and is answered
+    with its real status (e.g. 503 + Retry-After when throttled) rather than
+    a 200 carrying an error record.
+    """
+    # One extra result tells us whether there is a next page
+    results = search_provider.iter_search(
+        search_text, search_fields, select, page_size + 1, skip
+    ).__aiter__()
+    try:
+        first = await results.__anext__()
+    except StopAsyncIteration:
+        first = None
+    return ndjson_search_stream(results, first, page_size, skip)
+
+async def ndjson_search_stream(
+    results: AsyncIterator[dict],
+    first: Optional[dict],
+    page_size: int,
+    skip: int
+) -> AsyncIterator[bytes]:
+    """
+    Stream search results as NDJSON: one line per document followed by a
+    summary record ({"_type": "summary", ...}) with the count and next cursor.
+    `first` is the result already taken from `results` (None if there was
+    none).
+    
+    The response status is already sent when results start flowing, so a
+    failure part-way through is reported as a final {"_type": "error"} record.
+    """
+    count = 0
+    has_more = False
+    try:
+        if first is not None:
+            count = 1
+            yield ndjson_line(first)
+            async for result in results:
+                if count == page_size:
+                    has_more = True
+                    break
+                count += 1
+                yield ndjson_line(result)
+    except Exception as e:
+        logger.error(f"Search stream failed after {count} results: {str(e)}")
+        yield ndjson_line({"_type": "error", "detail": str(e), "count": count})
+        return
+    finally:
+        await results.aclose()
+    
+    yield ndjson_line({
+        "_type": "summary",
+        "status": "success",
+        "count": count,
+        "next_cursor": encode_cursor(skip + page_size) if has_more else None
+    })
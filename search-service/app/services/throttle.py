@@ -0,0 +1,193 @@
+import asyncio
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, Any, Mapping, Optional
+from azure.core.pipeline.policies import AsyncHTTPPolicy
+from app.core.config import settings
+from app.core import deadline
+from app.core.metrics import stage_timer
+from app.core.exceptions import SearchThrottledError
+
+logger = logging.getLogger(__name__)
+
+# Statuses Azure AI Search uses when it is throttling
+THROTTLE_STATUSES = {429, 503}
+
+def parse_retry_after(headers: Mapping[str, str], default: float) -> float:
+    """
+    Seconds to back off, from retry-after-ms, x-ms-retry-after-ms or
+    Retry-After (seconds or HTTP date)
+    """
+    headers = {name.lower(): value for name, value in headers.items()}
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(float(value) / 1000, 0.0)
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return default
+
+class AzureRequestScheduler:
+    """
+    Client-side token bucket in front of Azure AI Search.
+
+    Requests take a token before they are sent; when none is available they
+    queue (FIFO) for up to `max_wait` seconds instead of failing. A throttled
+    response pauses the whole bucket for its Retry-After, so every caller
+    backs off together rather than bursting into more 429s.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_wait: float,
+        max_queue: int,
+        default_retry_after: float
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.default_retry_after = default_retry_after
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+
+        self.max_queue_depth = 0
+        self.acquired_total = 0
+        self.queued_total = 0
+        self.waited_total = 0
+        self.rejected_total = 0
+        self.throttled_total = 0
+        self.wait_time_total = 0.0
+        self.max_wait_time = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """
+        Wait for a token. Raises SearchThrottledError if the wait would exceed
+        `max_wait` or the queue is full, and DeadlineExceeded if it would
+        outlast the request deadline.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self._waiting == 0 and self._tokens >= 1 and now >= self._paused_until:
+            # Fast path: no queue and a token is available
+            self._tokens -= 1
+            self.acquired_total += 1
+            return
+
+        if self._waiting >= self.max_queue:
+            self.rejected_total += 1
+            raise SearchThrottledError(self._retry_after(now))
+
+        self._waiting += 1
+        self.queued_total += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._waiting)
+        started = now
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._paused_until - now
+                    if delay <= 0:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            break
+                        delay = (1 - self._tokens) / self.rate
+                    if now + delay - started > self.max_wait:
+                        self.rejected_total += 1
+                        raise SearchThrottledError(self._retry_after(now))
+                    left = deadline.remaining()
+                    if left is not None and delay > left:
+                        raise deadline.DeadlineExceeded("Request deadline exceeded while queued for Azure")
+                    await asyncio.sleep(delay)
+        finally:
+            self._waiting -= 1
+        waited = time.monotonic() - started
+        self.acquired_total += 1
+        self.waited_total += 1
+        self.wait_time_total += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+
+    def throttled(self, retry_after: Optional[float] = None):
+        """
+        Record a throttled response and pause the bucket for Retry-After
+        """
+        self.throttled_total += 1
+        pause = retry_after if retry_after is not None else self.default_retry_after
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        logger.warning(f"Azure AI Search throttled; pausing requests for {pause:.2f}s")
+
+    def _retry_after(self, now: float) -> float:
+        return max(self._paused_until - now, self._waiting / self.rate, 1 / self.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "paused_for": round(max(self._paused_until - now, 0.0), 3),
+            "queue_depth": self._waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "acquired_total": self.acquired_total,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "throttled_total": self.throttled_total,
+            "avg_wait_time": self.wait_time_total / self.waited_total if self.waited_total else 0.0,
+            "max_wait_time": self.max_wait_time
+        }
+
+class AzureThrottlePolicy(AsyncHTTPPolicy):
+    """
+    Azure SDK pipeline policy that sends every attempt (including retries
+    and result page fetches) through the scheduler and reports throttling
+    """
+    def __init__(self, scheduler: AzureRequestScheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    async def send(self, request):
+        with stage_timer("azure_queue"):
+            await self.scheduler.acquire()
+        with stage_timer("azure_request"):
+            response = await self.next.send(request)
+        http_response = response.http_response
+        if http_response.status_code in THROTTLE_STATUSES:
+            self.scheduler.throttled(
+                parse_retry_after(http_response.headers, self.scheduler.default_retry_after)
+            )
+        return response
+
+@lru_cache()
+def get_azure_scheduler() -> AzureRequestScheduler:
+    """
+    Get the process-wide Azure request scheduler
+    """
+    return AzureRequestScheduler(
+        rate=settings.AZURE_SEARCH_UNITS * settings.AZURE_QPS_PER_UNIT,
+        burst=settings.AZURE_THROTTLE_BURST,
+        max_wait=settings.AZURE_THROTTLE_MAX_WAIT,
+        max_queue=settings.AZURE_THROTTLE_MAX_QUEUE,
+        default_retry_after=settings.AZURE_THROTTLE_DEFAULT_RETRY_AFTER
+    )
@@ -1,7 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from app.api.routes import router as api_router
 from app.core.config import settings
-from app.db.database import database
+from app.core.deadline import DeadlineMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.telemetry import instrument_app
+from app.core import metrics
+from app.core.responses import FastJSONResponse
+from app.db.database import database, ENFORCES_FOREIGN_KEYS
+from app.services.history_maintenance import get_history_maintenance
+from app.services.trending import get_trending_tracker
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,19 +16,68 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse if settings.FAST_RESPONSES_ENABLED else metrics.TimedJSONResponse
 )
 
+# Add OpenTelemetry instrumentation to FastAPI; continues the caller's trace
+instrument_app(app)
+
+# Compress responses and accept gzip request bodies
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        max_request_size=settings.COMPRESSION_MAX_REQUEST_SIZE
+    )
+
+# Stop working on requests whose caller has already given up
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=settings.REQUEST_DEADLINE_DEFAULT,
+    max_timeout=settings.REQUEST_DEADLINE_MAX
+)
+
+# Request counts and latency per route
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(api_router)
 
 @app.on_event("startup")
 async def startup():
+    if settings.HISTORY_RELY_ON_FOREIGN_KEY and not ENFORCES_FOREIGN_KEYS:
+        # History for unknown users would be stored and reported as recorded
+        raise RuntimeError(
+            "HISTORY_RELY_ON_FOREIGN_KEY requires a database that enforces foreign keys, such as Postgres"
+        )
     await database.connect()
+    # Partitions, rollups and retention; the first run completes before
+    # requests are served
+    if settings.HISTORY_MAINTENANCE_ENABLED:
+        await get_history_maintenance().start()
+    # Popular and trending searches, reloaded from their last snapshot
+    if settings.TRENDING_ENABLED:
+        await get_trending_tracker().start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    if settings.TRENDING_ENABLED:
+        await get_trending_tracker().stop()
+    if settings.HISTORY_MAINTENANCE_ENABLED:
+        await get_history_maintenance().stop()
     await database.disconnect()
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """
+        Request and stage latency histograms in the Prometheus text format
+        """
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
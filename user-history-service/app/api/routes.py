@@ -1,17 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from app.models.schemas import UserCreate, User, SearchHistoryCreate, SearchHistory, SaveSearchRequest
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Dict, List, Optional
+from app.models.schemas import (
+    UserCreate, User, SearchHistoryCreate, SearchHistory, SaveSearchRequest,
+    SearchHistoryBatchCreate, SearchHistoryBatchResult, SaveSearchBatchRequest, SaveSearchBatchResult,
+    TrendingSearches
+)
 from app.services.user_service import UserService
 from app.services.history_service import HistoryService
+from app.services.user_cache import get_user_cache
+from app.services.trending import TrendingTracker, get_trending_tracker
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api")
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def next_cursor_headers(next_cursor: Optional[str]) -> Dict[str, str]:
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
 # Dependency injection
 def get_user_service():
-    return UserService()
+    return UserService(get_user_cache())
 
 def get_history_service(user_service: UserService = Depends(get_user_service)):
-    return HistoryService(user_service)
+    return HistoryService(user_service, get_trending_tracker())
 
 # User routes
 @router.post("/users", response_model=User)
@@ -36,6 +49,13 @@ async def record_search(
 ):
     return await history_service.record_search(history)
 
+@router.post("/history/batch", response_model=SearchHistoryBatchResult)
+async def record_searches(
+    batch: SearchHistoryBatchCreate,
+    history_service: HistoryService = Depends(get_history_service)
+):
+    return await history_service.record_searches(batch)
+
 @router.post("/history/save", response_model=SearchHistory)
 async def save_search(
     request: SaveSearchRequest,
@@ -43,10 +63,55 @@ async def save_search(
 ):
     return await history_service.save_search(request)
 
+@router.post("/history/save/batch", response_model=SaveSearchBatchResult)
+async def save_searches(
+    batch: SaveSearchBatchRequest,
+    history_service: HistoryService = Depends(get_history_service)
+):
+    if len(batch.items) > settings.HISTORY_SAVE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {settings.HISTORY_SAVE_BATCH_MAX_ITEMS} searches"
+        )
+    return await history_service.save_searches(batch)
+
 @router.get("/history/user/{user_id}", response_model=List[SearchHistory])
 async def get_user_search_history(
     user_id: str,
+    response: Response,
     saved: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, description="Entries per page (capped at HISTORY_PAGE_SIZE_MAX)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     history_service: HistoryService = Depends(get_history_service)
 ):
-    return await history_service.get_user_search_history(user_id, saved) 
\ No newline at end of file
+    """
+    Get a page of a user's search history, newest first. The next page's
+    cursor is returned in X-Next-Cursor, which is absent on the last page.
+    """
+    if settings.FAST_RESPONSES_ENABLED:
+        # Rows are encoded directly, without a SearchHistory model per row
+        rows, next_cursor = await history_service.get_user_search_history_rows(user_id, saved, limit, cursor)
+        return FastJSONResponse(rows, headers=next_cursor_headers(next_cursor))
+    entries, next_cursor = await history_service.get_user_search_history(user_id, saved, limit, cursor)
+    response.headers.update(next_cursor_headers(next_cursor))
+    return entries
+
+# Popular and trending searches
+@router.get("/trending", response_model=TrendingSearches)
+async def get_trending(
+    window: str = Query("trending", regex="^(trending|popular)$", description="trending (recent) or popular (long-term)"),
+    category: Optional[str] = Query(None, description="Only searches made in this category"),
+    limit: int = Query(10, ge=1, description="Searches to return (capped at TRENDING_CAPACITY)"),
+    trending: Optional[TrendingTracker] = Depends(get_trending_tracker)
+):
+    """
+    Get the highest scoring searches of a window, overall or in a category.
+    Scores are read from in-memory sketches, not computed from history.
+    """
+    if trending is None:
+        raise HTTPException(status_code=503, detail="Trending searches are disabled")
+    searches = trending.top(window, category, min(limit, settings.TRENDING_CAPACITY))
+    content = {"window": window, "category": category, "searches": searches}
+    if settings.FAST_RESPONSES_ENABLED:
+        return FastJSONResponse(content)
+    return content
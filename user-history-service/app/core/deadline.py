@@ -0,0 +1,181 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import asyncio
+import contextvars
+import json
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional, Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Remaining time budget of a request in milliseconds, sent on every hop so
+# that each service can stop working once the caller has given up
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# Absolute deadline (time.monotonic()) of the current request
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+T = TypeVar("T")
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    The current request ran out of time
+    """
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current request's deadline, or None if it has none
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def check():
+    """
+    Raise DeadlineExceeded if the current request's deadline has passed
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+def clamp(timeout: Optional[float]) -> Optional[float]:
+    """
+    Shorten a timeout so it does not outlive the current request's deadline.
+    Raises DeadlineExceeded if the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+def header_value(timeout: float) -> str:
+    """
+    Encode a time budget for DEADLINE_HEADER
+    """
+    return str(max(int(timeout * 1000), 1))
+
+def parse_header(value: Optional[str]) -> Optional[float]:
+    """
+    Decode DEADLINE_HEADER into seconds; invalid values are ignored
+    """
+    if not value:
+        return None
+    try:
+        return max(int(value), 0) / 1000
+    except ValueError:
+        return None
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """
+    Await something, cancelling it if the current request's deadline passes
+    """
+    timeout = clamp(None)
+    if timeout is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+def start_detached(awaitable: Awaitable[T]) -> "asyncio.Future[T]":
+    """
+    Run something as a task without the current request's deadline, for
+    work shared by several requests: each one waits for it under its own
+    deadline (within_deadline) instead of all inheriting the first one's
+    """
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context.run(asyncio.ensure_future, awaitable)
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that gives each request under `path_prefix` a deadline,
+    taken from DEADLINE_HEADER or `default_timeout` and capped at
+    `max_timeout`. A request whose response has not started by the deadline
+    is cancelled and answered with a 504. The deadline bounds the time to
+    the response only: once it has started the deadline is lifted, so a
+    streamed body is bounded by the read timeouts of whatever produces it
+    instead of being cut short.
+    """
+    def __init__(
+        self,
+        app,
+        default_timeout: Optional[float] = None,
+        max_timeout: Optional[float] = None,
+        path_prefix: str = "/api"
+    ):
+        self.app = app
+        self.default_timeout = default_timeout or None
+        self.max_timeout = max_timeout or None
+        self.path_prefix = path_prefix
+        self._header = DEADLINE_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self.default_timeout
+        for name, value in scope["headers"]:
+            if name == self._header:
+                requested = parse_header(value.decode("latin-1"))
+                if requested is not None:
+                    timeout = requested
+                break
+        if timeout is not None and self.max_timeout is not None:
+            timeout = min(timeout, self.max_timeout)
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+        if timeout <= 0:
+            await self._send_timeout(send)
+            return
+
+        response_started = asyncio.Event()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Lifted in the context sending the body, which is the one
+                # producing it for streamed responses
+                _deadline.set(None)
+                response_started.set()
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + timeout)
+        try:
+            request = asyncio.ensure_future(self.app(scope, receive, send_wrapper))
+        finally:
+            _deadline.reset(token)
+        started = asyncio.ensure_future(response_started.wait())
+        try:
+            await asyncio.wait((request, started), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not request.done() and not response_started.is_set():
+                request.cancel()
+                logger.warning(f"{scope['method']} {scope['path']} cancelled after its {timeout:.3f}s deadline")
+                try:
+                    await request
+                except asyncio.CancelledError:
+                    pass
+                await self._send_timeout(send)
+                return
+            await request
+        finally:
+            started.cancel()
+            request.cancel()
+
+    async def _send_timeout(self, send):
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
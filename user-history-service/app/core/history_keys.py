@@ -0,0 +1,53 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import hashlib
+import uuid
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+# Namespace for history entry IDs derived from (user_id, search key, month)
+_HISTORY_NAMESPACE = uuid.UUID("6f1c2a3e-9b7d-4c8e-a5f0-3d2b1e4c7a90")
+
+def history_key(search_text: str, search_fields: Optional[Iterable[str]]) -> str:
+    """
+    Key under which repeats of the same search are recorded once: the text
+    case-folded with whitespace collapsed, plus the set of fields, hashed so
+    that the key has a fixed length whatever the query
+    """
+    text = " ".join((search_text or "").split()).casefold()
+    fields = ",".join(sorted(set(search_fields or ())))
+    return hashlib.sha256(f"{text}\x1f{fields}".encode()).hexdigest()
+
+def month_start(moment: datetime) -> date:
+    """
+    First day of the month of `moment`: the history partition it belongs to
+    """
+    return date(moment.year, moment.month, 1)
+
+def history_id(user_id: str, key: str, month: date) -> str:
+    """
+    Stable history entry ID for a user's search in a month, so the
+    orchestrator can hand it out before the entry is written and repeats in
+    the same month get the same ID.
+
+    The ID is a version 8 UUID whose first six hex digits are the month as
+    YYYYMM, so that history_month can tell which partition the entry is in.
+    """
+    digest = uuid.uuid5(_HISTORY_NAMESPACE, f"{user_id}:{key}:{month.isoformat()}").hex
+    return str(uuid.UUID(f"{month.year:04d}{month.month:02d}{digest[6:12]}8{digest[13:]}"))
+
+def history_month(history_id: str) -> Optional[date]:
+    """
+    The month of an ID made by history_id, or None for any other ID (entries
+    recorded before IDs carried their month, or IDs chosen by the caller)
+    """
+    try:
+        parsed = uuid.UUID(history_id)
+    except ValueError:
+        return None
+    if parsed.version != 8:
+        return None
+    try:
+        return date(int(parsed.hex[:4]), int(parsed.hex[4:6]), 1)
+    except ValueError:
+        return None
@@ -0,0 +1,202 @@
+# Shared module: each service using it has an identical copy. Edit one, then
+# run `python benchmarks/shared_modules.py --sync <that service>`.
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Default cap for payload() values; set by configure_logging
+_payload_limit = 1000
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+class _Payload:
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int]):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, (bytes, bytearray)):
+            text = bytes(value).decode("utf-8", errors="replace")
+        elif isinstance(value, str):
+            text = value
+        else:
+            # pydantic models are serialized via their dict
+            if callable(getattr(value, "dict", None)) and not isinstance(value, dict):
+                value = value.dict()
+            try:
+                text = json.dumps(value, separators=(",", ":"), default=str)
+            except (TypeError, ValueError):
+                text = repr(value)
+        return _truncate(text, self.limit if self.limit is not None else _payload_limit)
+
+def payload(value: Any, limit: Optional[int] = None) -> _Payload:
+    """
+    Wrap a request/response payload for logging. It is serialized and
+    truncated only if the record is actually emitted, so pass it as a %s
+    argument: logger.debug("Results: %s", payload(results))
+    """
+    return _Payload(value, limit)
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse "logger.name=0.1,other=0.5" into a rate per logger prefix
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of records below WARNING for the configured loggers
+    (longest prefix wins). Warnings and errors are never sampled out.
+    """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = prefix_rate, len(prefix)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class TruncatingFormatter(logging.Formatter):
+    """
+    Plain-text formatter that caps the length of each message
+    """
+    def __init__(self, fmt: str, max_length: int):
+        super().__init__(fmt)
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _truncate(record.message, self.max_length)
+        return super().formatMessage(record)
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with `extra=` fields as top-level keys
+    """
+    def __init__(self, service_name: str, max_length: int):
+        super().__init__()
+        self.service_name = service_name
+        self.max_length = max_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "service": self.service_name,
+            "logger": record.name,
+            "message": _truncate(record.getMessage(), self.max_length)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a background listener thread. Message formatting is
+    left to the listener; when the queue is full records are dropped
+    (and counted) rather than blocking the event loop.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Tracebacks are rendered now, while the frames are still intact
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging(
+    service_name: str,
+    level: str = "INFO",
+    fmt: str = "text",
+    sample_rates: str = "",
+    max_message_length: int = 4000,
+    payload_max_length: int = 1000,
+    queue_size: int = 10000
+):
+    """
+    Route all logging through a bounded queue to a stdout writer thread,
+    with per-logger sampling and message/payload size caps
+    """
+    global _listener, _payload_limit
+    _payload_limit = payload_max_length
+
+    if fmt == "json":
+        formatter = JsonFormatter(service_name, max_message_length)
+    else:
+        formatter = TruncatingFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s", max_message_length)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = QueueListener(queue_handler.queue, stream_handler)
+    _listener.start()
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
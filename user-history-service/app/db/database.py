@@ -1,6 +1,8 @@
+import sqlite3
 import databases
 import sqlalchemy
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from app.core.config import settings
 
 # Create database connection
@@ -29,8 +31,94 @@ search_history = sqlalchemy.Table(
     sqlalchemy.Column("saved", sqlalchemy.Boolean, default=False),
     sqlalchemy.Column("search_name", sqlalchemy.String, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime),
+    # First day of the month of created_at. On Postgres the table is
+    # partitioned by month on it (app.db.partitions), so every unique key
+    # includes it and repeats are folded per month.
+    sqlalchemy.Column("created_month", sqlalchemy.Date, primary_key=True),
+    # Repeats of a search are folded into one entry per user, search key
+    # (see app.core.history_keys) and month; older entries have no key
+    sqlalchemy.Column("search_key", sqlalchemy.String, nullable=True),
+    sqlalchemy.Column("use_count", sqlalchemy.Integer, nullable=False, server_default="1"),
+    # Always set on insert (migration 002 backfills older entries); history
+    # pages are ordered on it
+    sqlalchemy.Column("last_used", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Index("ux_search_history_user_key", "user_id", "search_key", "created_month", unique=True),
+    # History is read most recently used first per user, optionally only
+    # saved entries; id breaks last_used ties so keyset pages are read
+    # straight off the index
+    sqlalchemy.Index("ix_search_history_user_last_used", "user_id", "last_used", "id"),
+    sqlalchemy.Index("ix_search_history_user_saved_last_used", "user_id", "saved", "last_used", "id"),
+    postgresql_partition_by="RANGE (created_month)",
 )
 
+# Monthly rollups of search_history (app.services.history_maintenance), kept
+# after the raw months are dropped: searches per user, and per search across
+# all users
+history_user_monthly = sqlalchemy.Table(
+    "search_history_user_monthly",
+    metadata,
+    sqlalchemy.Column("month", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("user_id", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("searches", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("distinct_searches", sqlalchemy.Integer, nullable=False),
+)
+
+history_search_monthly = sqlalchemy.Table(
+    "search_history_search_monthly",
+    metadata,
+    sqlalchemy.Column("month", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("search_key", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("search_text", sqlalchemy.String),
+    sqlalchemy.Column("searches", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("users", sqlalchemy.Integer, nullable=False),
+)
+
+# Snapshots of the in-memory popular and trending search sketches
+# (app.services.trending), one per window and category ("" for all
+# searches), reloaded when the service restarts
+trending_snapshots = sqlalchemy.Table(
+    "search_trending_snapshots",
+    metadata,
+    sqlalchemy.Column("window_name", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("category", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("taken_at", sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column("half_life", sqlalchemy.Float, nullable=False),
+    sqlalchemy.Column("landmark", sqlalchemy.Float, nullable=False),
+    sqlalchemy.Column("width", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("depth", sqlalchemy.Integer, nullable=False),
+    # Count-Min counters as packed doubles, and the Space-Saving entries as
+    # [search key, search text, count] lists
+    sqlalchemy.Column("counters", sqlalchemy.LargeBinary, nullable=False),
+    sqlalchemy.Column("entries", sqlalchemy.JSON, nullable=False),
+)
+
+def is_foreign_key_violation(error: Exception) -> bool:
+    """
+    Whether a failed statement violated a foreign key (asyncpg reports
+    SQLSTATE 23503, SQLite an IntegrityError naming the constraint)
+    """
+    if getattr(error, "sqlstate", None) == "23503":
+        return True
+    return isinstance(error, sqlite3.IntegrityError) and "FOREIGN KEY" in str(error)
+
 # Create database tables
 engine = create_engine(settings.DATABASE_URL)
-metadata.create_all(engine) 
\ No newline at end of file
+metadata.create_all(engine)
+
+# Whether UPDATE ... RETURNING can be used (Postgres; SQLAlchemy 1.4 cannot
+# compile it for SQLite)
+UPDATE_RETURNING = getattr(engine.dialect, "full_returning", False)
+
+# Whether the database rejects rows whose foreign keys dangle. SQLite only
+# does with PRAGMA foreign_keys=ON, which the databases driver gives no way
+# to set on the connections it opens.
+ENFORCES_FOREIGN_KEYS = engine.dialect.name != "sqlite"
+
+def dialect_insert(table: sqlalchemy.Table):
+    """
+    INSERT construct of the configured database, which supports
+    ON CONFLICT ... DO UPDATE (Postgres and SQLite only)
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
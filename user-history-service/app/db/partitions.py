@@ -0,0 +1,52 @@
+import re
+from datetime import date
+from typing import List, Optional
+
+# Monthly partitions of search_history are named search_history_pYYYYMM;
+# rows outside every month partition land in search_history_default
+PARTITION_PREFIX = "search_history_p"
+DEFAULT_PARTITION = "search_history_default"
+_PARTITION_NAME = re.compile(r"^search_history_p(\d{4})(\d{2})$")
+
+# Lists the partitions currently attached to search_history
+LIST_PARTITIONS_SQL = (
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = 'search_history'"
+)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}{month.month:02d}"
+
+def partition_month(name: str) -> Optional[date]:
+    """
+    The month a partition holds, or None if it is not a monthly partition
+    """
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF search_history "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def create_default_partition_sql() -> str:
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF search_history DEFAULT"
+
+def drop_partition_sql(month: date) -> List[str]:
+    """
+    Detach and drop a month: instant, unlike deleting its rows
+    """
+    name = partition_name(month)
+    return [
+        f"ALTER TABLE search_history DETACH PARTITION {name}",
+        f"DROP TABLE {name}"
+    ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -24,11 +24,30 @@ class SearchHistoryBase(BaseModel):
     search_name: Optional[str] = None
 
 class SearchHistoryCreate(SearchHistoryBase):
-    pass
+    # Callers may pre-generate the ID and event time (e.g. when writes are
+    # batched and delivered after the search has been answered)
+    id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    # Section the search was made in; only counted for per-category
+    # trending searches, not stored
+    category: Optional[str] = None
+
+class SearchHistoryBatchCreate(BaseModel):
+    items: List[SearchHistoryCreate]
+
+class SearchHistoryBatchResult(BaseModel):
+    # Entries written, after repeats of a search were merged into one, and
+    # their stored IDs (a repeat keeps the ID its entry already had)
+    inserted: int
+    ids: List[str]
+    rejected: List[str]
 
 class SearchHistory(SearchHistoryBase):
     id: str
     created_at: datetime
+    # How often the user has run this search, and when they last did
+    use_count: int = 1
+    last_used: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -36,4 +55,29 @@ class SearchHistory(SearchHistoryBase):
 class SaveSearchRequest(BaseModel):
     user_id: str
     search_id: str
-    search_name: str 
\ No newline at end of file
+    search_name: str 
+
+class SaveSearchItem(BaseModel):
+    search_id: str
+    search_name: str
+
+class SaveSearchBatchRequest(BaseModel):
+    user_id: str
+    items: List[SaveSearchItem] = Field(..., min_items=1)
+
+class SaveSearchBatchResult(BaseModel):
+    saved: int
+    entries: List[SearchHistory]
+    # Search IDs that do not exist or belong to another user
+    rejected: List[str]
+
+class TrendingSearch(BaseModel):
+    search_key: str
+    search_text: str
+    # Decayed count: each search weighted by 2 ** -(its age in half-lives)
+    score: float
+
+class TrendingSearches(BaseModel):
+    window: str
+    category: Optional[str] = None
+    searches: List[TrendingSearch]
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import sqlalchemy
+from app.db.database import (
+    database, engine, search_history, history_user_monthly, history_search_monthly, dialect_insert
+)
+from app.db import partitions
+from app.core.config import settings
+from app.core.history_keys import month_start
+from app.core.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock held while upkeep runs, so that only one replica
+# does it at a time
+_LOCK_KEY = 4_172_025
+
+class HistoryMaintenance:
+    """
+    Periodic search history upkeep.
+
+    On Postgres, search_history is partitioned by month: partitions for the
+    current and the next months are created ahead of time, and months past
+    the retention period are detached and dropped whole instead of deleted
+    row by row; their rows in the default partition are deleted. Elsewhere
+    (SQLite) the same months are deleted. Dropped
+    months take their saved searches with them; retention is off unless
+    HISTORY_RETENTION_MONTHS is set.
+
+    Before a month is dropped, and for the current and previous month on
+    every run, per-user and per-search counts are rolled up into the
+    monthly tables, which analytics should query instead of raw history.
+    """
+    def __init__(
+        self,
+        interval: float = settings.HISTORY_MAINTENANCE_INTERVAL,
+        partitions_ahead: int = settings.HISTORY_PARTITIONS_AHEAD,
+        retention_months: int = settings.HISTORY_RETENTION_MONTHS
+    ):
+        self.interval = interval
+        self.partitions_ahead = partitions_ahead
+        self.retention_months = retention_months
+        self.partitioned = engine.dialect.name == "postgresql"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Run upkeep once, so that this month's partition exists before
+        requests are served, then again every interval in the background
+        """
+        try:
+            await self.run_once()
+        except Exception as e:
+            logger.error(f"History upkeep failed: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"History upkeep failed: {str(e)}")
+
+    async def run_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Create partitions, refresh rollups and drop expired months
+        """
+        current = month_start(today or datetime.utcnow())
+        with stage_timer("db.history_upkeep"):
+            async with database.transaction():
+                if self.partitioned and not await database.fetch_val(
+                    "SELECT pg_try_advisory_xact_lock(:key)", {"key": _LOCK_KEY}
+                ):
+                    logger.info("History upkeep is already running on another replica")
+                    return {"skipped": True}
+
+                created = await self._ensure_partitions(current)
+                expired = await self._expired_months(current)
+                # Expired months are rolled up one last time before they go
+                rolled_up = sorted({partitions.add_months(current, -1), current, *expired})
+                for month in rolled_up:
+                    await self._roll_up(month)
+                saved_dropped = await self._count_saved(expired)
+                await self._drop_months(expired)
+
+        summary = {
+            "partitions_created": created,
+            "months_rolled_up": [month.isoformat() for month in rolled_up],
+            "months_dropped": [month.isoformat() for month in expired],
+            "saved_searches_dropped": saved_dropped
+        }
+        logger.info(f"History upkeep done: {summary}")
+        return summary
+
+    async def _ensure_partitions(self, current: date) -> List[str]:
+        if not self.partitioned:
+            return []
+        existing = {row[0] for row in await database.fetch_all(partitions.LIST_PARTITIONS_SQL)}
+        created = []
+        for offset in range(self.partitions_ahead + 1):
+            month = partitions.add_months(current, offset)
+            if partitions.partition_name(month) not in existing:
+                await database.execute(partitions.create_partition_sql(month))
+                created.append(partitions.partition_name(month))
+        if partitions.DEFAULT_PARTITION not in existing:
+            await database.execute(partitions.create_default_partition_sql())
+            created.append(partitions.DEFAULT_PARTITION)
+        return created
+
+    async def _expired_months(self, current: date) -> List[date]:
+        if self.retention_months <= 0:
+            return []
+        cutoff = partitions.add_months(current, -self.retention_months)
+        source = search_history
+        if self.partitioned:
+            # Months with a partition are listed below; only the rows
+            # outside them, in the default partition, are read
+            source = sqlalchemy.table(partitions.DEFAULT_PARTITION, sqlalchemy.column("created_month"))
+        months = {
+            row[0] for row in await database.fetch_all(
+                sqlalchemy.select(source.c.created_month).distinct().where(source.c.created_month < cutoff)
+            )
+        }
+        if self.partitioned:
+            months.update(await self._partition_months())
+        return sorted(month for month in months if month is not None and month < cutoff)
+
+    async def _partition_months(self) -> List[date]:
+        return [
+            month for month in (
+                partitions.partition_month(row[0])
+                for row in await database.fetch_all(partitions.LIST_PARTITIONS_SQL)
+            )
+            if month is not None
+        ]
+
+    async def _count_saved(self, months: List[date]) -> int:
+        if not months:
+            return 0
+        return await database.fetch_val(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(search_history).where(
+                search_history.c.created_month.in_(months) & search_history.c.saved.is_(True)
+            )
+        )
+
+    async def _drop_months(self, months: List[date]):
+        if not months:
+            return
+        if self.partitioned:
+            with_partition = set(await self._partition_months())
+            for month in months:
+                if month in with_partition:
+                    for statement in partitions.drop_partition_sql(month):
+                        await database.execute(statement)
+        # What is left of these months (on Postgres, rows in the default
+        # partition) is deleted row by row
+        await database.execute(
+            search_history.delete().where(search_history.c.created_month.in_(months))
+        )
+
+    async def _roll_up(self, month: date):
+        in_month = search_history.c.created_month == month
+
+        per_user = dialect_insert(history_user_monthly).from_select(
+            ["month", "user_id", "searches", "distinct_searches"],
+            sqlalchemy.select(
+                search_history.c.created_month,
+                search_history.c.user_id,
+                sqlalchemy.func.sum(search_history.c.use_count),
+                sqlalchemy.func.count()
+            ).where(in_month).group_by(search_history.c.created_month, search_history.c.user_id)
+        )
+        await database.execute(per_user.on_conflict_do_update(
+            index_elements=[history_user_monthly.c.month, history_user_monthly.c.user_id],
+            set_={
+                "searches": per_user.excluded.searches,
+                "distinct_searches": per_user.excluded.distinct_searches
+            }
+        ))
+
+        # Entries recorded before searches had a key cannot be grouped
+        per_search = dialect_insert(history_search_monthly).from_select(
+            ["month", "search_key", "search_text", "searches", "users"],
+            sqlalchemy.select(
+                search_history.c.created_month,
+                search_history.c.search_key,
+                sqlalchemy.func.min(search_history.c.search_text),
+                sqlalchemy.func.sum(search_history.c.use_count),
+                sqlalchemy.func.count(search_history.c.user_id.distinct())
+            ).where(in_month & search_history.c.search_key.isnot(None))
+            .group_by(search_history.c.created_month, search_history.c.search_key)
+        )
+        await database.execute(per_search.on_conflict_do_update(
+            index_elements=[history_search_monthly.c.month, history_search_monthly.c.search_key],
+            set_={
+                "search_text": per_search.excluded.search_text,
+                "searches": per_search.excluded.searches,
+                "users": per_search.excluded.users
+            }
+        ))
+
+@lru_cache()
+def get_history_maintenance() -> HistoryMaintenance:
+    """
+    Get the process-wide history upkeep job
+    """
+    return HistoryMaintenance()
@@ -1,98 +1,310 @@
-import uuid
-from datetime import datetime
-from typing import List, Optional
-from app.db.database import database, search_history
-from app.models.schemas import SearchHistoryCreate, SearchHistory, SaveSearchRequest
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+import sqlalchemy
+from app.db.database import database, search_history, is_foreign_key_violation, dialect_insert, UPDATE_RETURNING
+from app.models.schemas import (
+    SearchHistoryCreate, SearchHistory, SaveSearchRequest,
+    SearchHistoryBatchCreate, SearchHistoryBatchResult, SaveSearchBatchRequest, SaveSearchBatchResult
+)
 from app.services.user_service import UserService
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.trending import TrendingTracker
+from app.core.metrics import stage_timer
+from app.core.config import settings
+from app.core.history_keys import history_key, history_id, history_month, month_start
 from fastapi import HTTPException
 
+# Columns returned to callers (the search key and month are internal)
+HISTORY_COLUMNS = [column for column in search_history.c if column.name not in ("search_key", "created_month")]
+
+def history_row(history: SearchHistoryCreate, now: datetime) -> Dict[str, Any]:
+    """
+    Table row for a history event. Its ID, unless the caller chose one, is
+    derived from the user, search key and month, as the orchestrator does.
+    """
+    key = history_key(history.search_text, history.search_fields)
+    created_at = history.created_at or now
+    created_month = month_start(created_at)
+    return {
+        "id": history.id or history_id(history.user_id, key, created_month),
+        "user_id": history.user_id,
+        "search_text": history.search_text,
+        "search_fields": history.search_fields,
+        "saved": history.saved,
+        "search_name": history.search_name,
+        "created_at": created_at,
+        "created_month": created_month,
+        "search_key": key,
+        "use_count": 1,
+        "last_used": created_at
+    }
+
+def history_upsert(rows: List[Dict[str, Any]]):
+    """
+    Insert history rows; a row for a search the user already has in that
+    month adds its use count to the existing entry and moves last_used
+    forward instead.
+    The entry keeps its ID, creation time, text and saved state.
+    """
+    insert = dialect_insert(search_history).values(rows)
+    return insert.on_conflict_do_update(
+        index_elements=[search_history.c.user_id, search_history.c.search_key, search_history.c.created_month],
+        set_={
+            "use_count": search_history.c.use_count + insert.excluded.use_count,
+            "last_used": sqlalchemy.case(
+                (insert.excluded.last_used > search_history.c.last_used, insert.excluded.last_used),
+                else_=search_history.c.last_used
+            )
+        }
+    )
+
+def history_page_query(
+    user_id: str,
+    saved: Optional[bool],
+    after: Optional[Tuple[datetime, str]],
+    limit: int
+):
+    """
+    Select up to `limit` history entries of a user, most recently used
+    first, strictly after the (last_used, id) sort key `after`
+    """
+    condition = search_history.c.user_id == user_id
+    if saved is not None:
+        condition &= search_history.c.saved == saved
+    if after is not None:
+        condition &= sqlalchemy.tuple_(search_history.c.last_used, search_history.c.id) < sqlalchemy.tuple_(*after)
+        # An entry is created no later than it is last used, so this lets
+        # Postgres skip the partitions of later months
+        condition &= search_history.c.created_month <= month_start(after[0])
+    return sqlalchemy.select(*HISTORY_COLUMNS).where(condition).order_by(
+        search_history.c.last_used.desc(), search_history.c.id.desc()
+    ).limit(limit)
+
 class HistoryService:
     """
     Search history service using repository pattern
     """
-    def __init__(self, user_service: UserService):
+    def __init__(self, user_service: UserService, trending: Optional[TrendingTracker] = None):
         self.user_service = user_service
+        self.trending = trending
     
     async def record_search(self, history: SearchHistoryCreate) -> SearchHistory:
         """
-        Record a search in the history
+        Record a search in the history, or count a repeat of it against the
+        user's existing entry
         """
-        # Verify user exists
-        if not await self.user_service.user_exists(history.user_id):
-            raise HTTPException(status_code=404, detail="User not found")
+        # Verify user exists, unless the foreign key is left to reject
+        # unknown users, which saves a round trip on a cache miss
+        if not settings.HISTORY_RELY_ON_FOREIGN_KEY:
+            if not await self.user_service.user_exists(history.user_id):
+                raise HTTPException(status_code=404, detail="User not found")
         
-        # Create search history record
-        history_id = str(uuid.uuid4())
-        created_at = datetime.utcnow()
+        row = history_row(history, datetime.utcnow())
+        upsert = history_upsert([row])
+        try:
+            with stage_timer("db.insert_history"):
+                if UPDATE_RETURNING:
+                    entry = await database.fetch_one(upsert.returning(*HISTORY_COLUMNS))
+                else:
+                    async with database.transaction():
+                        await database.execute(upsert)
+                        entry = await database.fetch_one(
+                            sqlalchemy.select(*HISTORY_COLUMNS).where(
+                                (search_history.c.user_id == row["user_id"])
+                                & (search_history.c.search_key == row["search_key"])
+                                & (search_history.c.created_month == row["created_month"])
+                            )
+                        )
+        except Exception as e:
+            if is_foreign_key_violation(e):
+                raise HTTPException(status_code=404, detail="User not found")
+            raise
+        self.user_service.mark_exists(history.user_id)
+        if self.trending is not None:
+            self.trending.record(row["search_key"], history.search_text, history.category, row["created_at"])
         
-        query = search_history.insert().values(
-            id=history_id,
-            user_id=history.user_id,
-            search_text=history.search_text,
-            search_fields=history.search_fields,
-            saved=history.saved,
-            search_name=history.search_name,
-            created_at=created_at
+        return SearchHistory(**dict(entry))
+    
+    async def record_searches(self, batch: SearchHistoryBatchCreate) -> SearchHistoryBatchResult:
+        """
+        Record a batch of searches with a single multi-row upsert
+        """
+        # Verify all referenced users in one query; entries for unknown users
+        # are rejected individually rather than failing the whole batch
+        known_users = await self.user_service.existing_user_ids(
+            item.user_id for item in batch.items
         )
         
-        await database.execute(query)
+        # Repeats within the batch are merged first: a row may only be
+        # updated once per statement
+        rows: Dict[Tuple[str, str, date], Dict[str, Any]] = {}
+        rejected = []
+        # Searches to count for trending once the batch is written
+        recorded = []
+        now = datetime.utcnow()
+        for item in batch.items:
+            row = history_row(item, now)
+            if item.user_id not in known_users:
+                rejected.append(row["id"])
+                continue
+            recorded.append((row["search_key"], item.search_text, item.category, row["created_at"]))
+            key = (row["user_id"], row["search_key"], row["created_month"])
+            merged = rows.get(key)
+            if merged is None:
+                rows[key] = row
+            else:
+                merged["use_count"] += 1
+                merged["created_at"] = min(merged["created_at"], row["created_at"])
+                merged["last_used"] = max(merged["last_used"], row["last_used"])
+        
+        stored_ids = {}
+        if rows:
+            with stage_timer("db.insert_history_batch"):
+                stored_ids = await self._upsert_batch(rows)
+        if self.trending is not None:
+            for search_key, search_text, category, created_at in recorded:
+                self.trending.record(search_key, search_text, category, created_at)
         
-        return SearchHistory(
-            id=history_id,
-            user_id=history.user_id,
-            search_text=history.search_text,
-            search_fields=history.search_fields,
-            saved=history.saved,
-            search_name=history.search_name,
-            created_at=created_at
+        return SearchHistoryBatchResult(
+            inserted=len(rows),
+            ids=[stored_ids[key] for key in rows],
+            rejected=rejected
         )
     
+    async def _upsert_batch(self, rows: Dict[Tuple[str, str, date], Dict[str, Any]]) -> Dict[Tuple[str, str, date], str]:
+        """
+        Upsert merged batch rows and return the stored ID of each entry. A
+        repeat keeps the ID its entry was first stored under, which is not
+        necessarily the one supplied or derived for this request.
+        """
+        key_columns = [search_history.c.user_id, search_history.c.search_key, search_history.c.created_month]
+        upsert = history_upsert(list(rows.values()))
+        if UPDATE_RETURNING:
+            stored = await database.fetch_all(upsert.returning(search_history.c.id, *key_columns))
+        else:
+            async with database.transaction():
+                await database.execute(upsert)
+                # May match a few other entries of the same users, which are
+                # ignored below
+                stored = await database.fetch_all(
+                    sqlalchemy.select(search_history.c.id, *key_columns).where(
+                        search_history.c.user_id.in_({key[0] for key in rows})
+                        & search_history.c.search_key.in_({key[1] for key in rows})
+                        & search_history.c.created_month.in_({key[2] for key in rows})
+                    )
+                )
+        return {(row["user_id"], row["search_key"], row["created_month"]): row["id"] for row in stored}
+    
     async def save_search(self, request: SaveSearchRequest) -> SearchHistory:
         """
         Save a search with a name
         """
-        # Verify user exists
-        if not await self.user_service.user_exists(request.user_id):
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Verify search history exists
-        history_query = search_history.select().where(search_history.c.id == request.search_id)
-        history = await database.fetch_one(history_query)
-        
-        if not history:
+        rows = await self._save_owned(request.user_id, {request.search_id: request.search_name})
+        if not rows:
             raise HTTPException(status_code=404, detail="Search history not found")
-        
-        # Update search history
-        query = search_history.update().where(
-            search_history.c.id == request.search_id
-        ).values(
-            saved=True,
-            search_name=request.search_name
+        return SearchHistory(**rows[0])
+    
+    async def save_searches(self, batch: SaveSearchBatchRequest) -> SaveSearchBatchResult:
+        """
+        Save or rename several of a user's searches with a single statement
+        """
+        # A search listed twice takes the last name given
+        names = {item.search_id: item.search_name for item in batch.items}
+        rows = await self._save_owned(batch.user_id, names)
+        saved_ids = {row["id"] for row in rows}
+        return SaveSearchBatchResult(
+            saved=len(rows),
+            entries=[SearchHistory(**row) for row in rows],
+            rejected=[search_id for search_id in names if search_id not in saved_ids]
         )
+    
+    async def _save_owned(self, user_id: str, names: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Mark the user's entries among `names` (search ID -> name) as saved
+        under their names and return the updated rows. Entries that do not
+        exist or belong to another user are left alone and not returned.
+
+        The ownership check, update and read back are one UPDATE ... RETURNING
+        where the database supports it, otherwise an update and a select in
+        one transaction. IDs that carry their month are matched in that
+        month only, so Postgres reads just those partitions; other IDs are
+        looked up in every month.
+        """
+        by_month: Dict[Optional[date], List[str]] = {}
+        for search_id in names:
+            by_month.setdefault(history_month(search_id), []).append(search_id)
+        matches = [
+            search_history.c.id.in_(ids) if month is None
+            else search_history.c.id.in_(ids) & (search_history.c.created_month == month)
+            for month, ids in by_month.items()
+        ]
+        owned = sqlalchemy.or_(*matches) & (search_history.c.user_id == user_id)
+        if len(names) == 1:
+            search_name = next(iter(names.values()))
+        else:
+            search_name = sqlalchemy.case(names, value=search_history.c.id)
+        update = search_history.update().where(owned).values(saved=True, search_name=search_name)
         
-        await database.execute(query)
-        
-        # Get updated record
-        updated_query = search_history.select().where(search_history.c.id == request.search_id)
-        updated = await database.fetch_one(updated_query)
-        
-        return SearchHistory(**dict(updated))
+        with stage_timer("db.save_history"):
+            if UPDATE_RETURNING:
+                rows = await database.fetch_all(update.returning(*HISTORY_COLUMNS))
+            else:
+                async with database.transaction():
+                    await database.execute(update)
+                    rows = await database.fetch_all(sqlalchemy.select(*HISTORY_COLUMNS).where(owned))
+        return [dict(row) for row in rows]
     
-    async def get_user_search_history(self, user_id: str, saved: Optional[bool] = None) -> List[SearchHistory]:
+    async def get_user_search_history(
+        self,
+        user_id: str,
+        saved: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SearchHistory], Optional[str]]:
+        """
+        Get a page of search history for a user, most recently used first,
+        and the cursor of the next page (None on the last page)
         """
-        Get search history for a user
+        rows, next_cursor = await self.get_user_search_history_rows(user_id, saved, limit, cursor)
+        return [SearchHistory(**row) for row in rows], next_cursor
+    
+    async def get_user_search_history_rows(
+        self,
+        user_id: str,
+        saved: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
+        Get a page of search history for a user as plain rows, without
+        building a model per row (the table schema already guarantees their
+        shape).
+
+        Pages are keyset-paginated on (last_used, id): each page continues
+        strictly after the last entry of the previous one, so reads stay on
+        the (user_id, [saved,] last_used, id) indexes however deep they go.
+        An entry used again while a client is paging moves to the front, so
+        that client sees it either on a page already read or not again.
+
+        Raises:
+            HTTPException: 400 if the cursor is malformed, 404 if the user is unknown
+        """
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_size = min(limit or settings.HISTORY_PAGE_SIZE_DEFAULT, settings.HISTORY_PAGE_SIZE_MAX)
+        
         # Verify user exists
         if not await self.user_service.user_exists(user_id):
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Build query based on saved parameter
-        if saved is not None:
-            query = search_history.select().where(
-                (search_history.c.user_id == user_id) & (search_history.c.saved == saved)
-            )
-        else:
-            query = search_history.select().where(search_history.c.user_id == user_id)
-        
-        results = await database.fetch_all(query)
-        return [SearchHistory(**dict(result)) for result in results] 
\ No newline at end of file
+        # One extra row tells us whether there is a next page
+        query = history_page_query(user_id, saved, after, page_size + 1)
+        with stage_timer("db.fetch_user_history"):
+            results = await database.fetch_all(query)
+        rows = [dict(result) for result in results[:page_size]]
+        next_cursor = None
+        if len(results) > page_size:
+            next_cursor = encode_cursor(rows[-1]["last_used"], rows[-1]["id"])
+        return rows, next_cursor
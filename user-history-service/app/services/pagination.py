@@ -0,0 +1,30 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+def encode_cursor(last_used: datetime, history_id: str) -> str:
+    """
+    Encode the sort key of the last entry on a page as an opaque
+    continuation cursor
+    """
+    payload = json.dumps({"t": last_used.isoformat(), "id": history_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a continuation cursor back into a (last_used, id) sort key
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_used = datetime.fromisoformat(key["t"])
+        history_id = key["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(history_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_used, history_id
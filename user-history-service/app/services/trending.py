@@ -0,0 +1,367 @@
+import array
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.db.database import database, trending_snapshots, dialect_insert
+from app.core.config import settings
+from app.core.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Decay windows: "trending" forgets quickly, "popular" slowly
+WINDOWS = ("trending", "popular")
+# Category under which every search is counted, whatever its own category
+GLOBAL_CATEGORY = ""
+# Forward-decay weights are rebased onto a new landmark before they
+# exceed 2 ** this, far from the float range
+_MAX_EXPONENT = 256.0
+
+def epoch_seconds(moment: datetime) -> float:
+    """
+    Seconds since the epoch of a timestamp; naive timestamps are UTC
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class CountMinSketch:
+    """
+    Count-Min sketch with conservative update. Keys are hex SHA-256 search
+    keys (app.core.history_keys), so each row is indexed by its own 32-bit
+    slice of the key instead of hashing it again.
+    """
+    MAX_DEPTH = 8
+
+    def __init__(self, width: int, depth: int, counters: Optional[array.array] = None):
+        self.width = width
+        self.depth = min(depth, self.MAX_DEPTH)
+        self.counters = counters if counters is not None else array.array("d", bytes(8 * self.width * self.depth))
+
+    def _cells(self, key: str) -> List[int]:
+        return [
+            row * self.width + int(key[row * 8:row * 8 + 8], 16) % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, weight: float) -> float:
+        """
+        Add weight to a key and return its new estimate. Only cells below
+        the new estimate are raised, so collisions inflate other keys less.
+        """
+        cells = self._cells(key)
+        estimate = min(self.counters[cell] for cell in cells) + weight
+        for cell in cells:
+            if self.counters[cell] < estimate:
+                self.counters[cell] = estimate
+        return estimate
+
+    def scale(self, factor: float):
+        self.counters = array.array("d", (counter * factor for counter in self.counters))
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the heaviest keys in at most `capacity`
+    counters. A new key takes over the smallest counter; every count is an
+    upper bound of the key's true count.
+    """
+    def __init__(self, capacity: int, counts: Optional[Dict[str, float]] = None):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = dict(counts or {})
+        # Min-heap of (count, key); entries left behind by later updates are
+        # skipped when popped and dropped when the heap is rebuilt
+        self._heap: List[Tuple[float, str]] = []
+        self._rebuild()
+
+    def offer(self, key: str, weight: float, bound: float) -> Optional[str]:
+        """
+        Count weight for a key and return the key it evicted, if any.
+
+        `bound` is an independent upper bound of the key's count (its
+        Count-Min estimate): a new key starts at the smaller of it and the
+        evicted count plus weight, instead of always inheriting the latter.
+        """
+        evicted = None
+        count = self.counts.get(key)
+        if count is not None:
+            count = min(count + weight, bound)
+        else:
+            floor = 0.0
+            if len(self.counts) >= self.capacity:
+                evicted, floor = self._pop_min()
+            count = min(floor + weight, bound)
+        self.counts[key] = count
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 2 * self.capacity + 64:
+            self._rebuild()
+        return evicted
+
+    def _pop_min(self) -> Tuple[str, float]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                del self.counts[key]
+                return key, count
+
+    def _rebuild(self):
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def scale(self, factor: float):
+        self.counts = {key: count * factor for key, count in self.counts.items()}
+        self._rebuild()
+
+    def ranked(self, limit: int) -> List[Tuple[str, float]]:
+        """
+        The `limit` highest counted keys and their counts, highest first, in
+        O(capacity * log limit)
+        """
+        return heapq.nlargest(limit, self.counts.items(), key=lambda item: item[1])
+
+class DecayedTopK:
+    """
+    Heaviest searches of one window and category under exponential forward
+    decay: an event at time t is added with weight 2 ** ((t - landmark) /
+    half_life) and scores are divided by the weight of the present when
+    read, so no counter has to be decayed as time passes. A search's score
+    is thus its count with each search weighted by 2 ** -(its age in
+    half-lives).
+    """
+    def __init__(self, half_life: float, capacity: int, width: int, depth: int, landmark: float):
+        self.half_life = half_life
+        self.landmark = landmark
+        self.sketch = CountMinSketch(width, depth)
+        self.summary = SpaceSaving(capacity)
+        self.texts: Dict[str, str] = {}
+        # Whether anything changed since the last snapshot
+        self.dirty = False
+        self._ranking: List[Tuple[str, str, float]] = []
+        self._ranked_at: Optional[float] = None
+
+    def add(self, key: str, text: str, moment: float):
+        if (moment - self.landmark) / self.half_life > _MAX_EXPONENT:
+            self._rebase(moment)
+        weight = 2.0 ** ((moment - self.landmark) / self.half_life)
+        bound = self.sketch.add(key, weight)
+        evicted = self.summary.offer(key, weight, bound)
+        if evicted is not None:
+            self.texts.pop(evicted, None)
+        self.texts[key] = text
+        self.dirty = True
+
+    def _rebase(self, landmark: float):
+        factor = 2.0 ** -((landmark - self.landmark) / self.half_life)
+        self.sketch.scale(factor)
+        self.summary.scale(factor)
+        self.landmark = landmark
+        self._ranked_at = None
+
+    def top(self, limit: int, now: float, ranking_ttl: float) -> List[Dict[str, Any]]:
+        """
+        The `limit` highest scoring searches. Selecting them from the
+        summary costs O(capacity * log limit); the result is reused for
+        `ranking_ttl` seconds by reads of up to as many searches, which then
+        cost O(limit).
+        """
+        stale = self._ranked_at is None or now - self._ranked_at >= ranking_ttl
+        if stale or len(self._ranking) < min(limit, len(self.summary.counts)):
+            self._ranking = [(key, self.texts.get(key, ""), count) for key, count in self.summary.ranked(limit)]
+            self._ranked_at = now
+        norm = 2.0 ** -((now - self.landmark) / self.half_life)
+        return [
+            {"search_key": key, "search_text": text, "score": count * norm}
+            for key, text, count in self._ranking[:limit]
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "half_life": self.half_life,
+            "landmark": self.landmark,
+            "width": self.sketch.width,
+            "depth": self.sketch.depth,
+            "counters": self.sketch.counters.tobytes(),
+            "entries": [[key, self.texts.get(key, ""), count] for key, count in self.summary.counts.items()]
+        }
+
+    def restore(self, row: Dict[str, Any]):
+        counters = array.array("d")
+        counters.frombytes(row["counters"])
+        self.landmark = row["landmark"]
+        self.sketch = CountMinSketch(row["width"], row["depth"], counters)
+        entries = row["entries"][:self.summary.capacity]
+        self.summary = SpaceSaving(self.summary.capacity, {key: count for key, _, count in entries})
+        self.texts = {key: text for key, text, _ in entries}
+        self._ranked_at = None
+
+class TrendingTracker:
+    """
+    Popular and trending searches, counted in memory as searches are
+    recorded instead of grouped from search_history on request.
+
+    Each window keeps a Count-Min sketch and a Space-Saving summary for all
+    searches, and one per category for up to `max_categories` categories.
+    They are written to search_trending_snapshots every interval and on
+    shutdown, and reloaded at startup. Each replica counts the searches it
+    records; with searches spread evenly, their rankings agree.
+    """
+    def __init__(
+        self,
+        capacity: int = settings.TRENDING_CAPACITY,
+        width: int = settings.TRENDING_SKETCH_WIDTH,
+        depth: int = settings.TRENDING_SKETCH_DEPTH,
+        trending_half_life: float = settings.TRENDING_HALF_LIFE,
+        popular_half_life: float = settings.TRENDING_POPULAR_HALF_LIFE,
+        max_categories: int = settings.TRENDING_MAX_CATEGORIES,
+        ranking_ttl: float = settings.TRENDING_RANKING_TTL,
+        snapshot_interval: float = settings.TRENDING_SNAPSHOT_INTERVAL
+    ):
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self.half_lives = {"trending": trending_half_life, "popular": popular_half_life}
+        self.max_categories = max_categories
+        self.ranking_ttl = ranking_ttl
+        self.snapshot_interval = snapshot_interval
+        # Categories tracked besides GLOBAL_CATEGORY
+        self.categories: Set[str] = set()
+        self.sketches: Dict[Tuple[str, str], DecayedTopK] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _sketch(self, window: str, category: str) -> DecayedTopK:
+        sketch = self.sketches.get((window, category))
+        if sketch is None:
+            sketch = DecayedTopK(self.half_lives[window], self.capacity, self.width, self.depth, time.time())
+            self.sketches[(window, category)] = sketch
+        return sketch
+
+    def _category(self, category: Optional[str]) -> Optional[str]:
+        """
+        Normalized category, or None if it is not (and can no longer be) tracked
+        """
+        category = (category or "").strip().casefold()
+        if not category:
+            return None
+        if category not in self.categories:
+            if len(self.categories) >= self.max_categories:
+                return None
+            self.categories.add(category)
+        return category
+
+    def record(self, key: str, text: str, category: Optional[str] = None, moment: Optional[datetime] = None):
+        """
+        Count a search under its key, globally and in its category
+        """
+        now = time.time()
+        at = min(epoch_seconds(moment), now) if moment is not None else now
+        category = self._category(category)
+        for window in WINDOWS:
+            self._sketch(window, GLOBAL_CATEGORY).add(key, text, at)
+            if category is not None:
+                self._sketch(window, category).add(key, text, at)
+
+    def top(self, window: str, category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        The highest scoring searches of a window, overall or in a category
+        """
+        category = (category or "").strip().casefold()
+        sketch = self.sketches.get((window, category))
+        if sketch is None:
+            return []
+        return sketch.top(limit, time.time(), self.ranking_ttl)
+
+    async def start(self):
+        """
+        Reload the last snapshot, then snapshot every interval in the background
+        """
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load trending snapshots: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.save()
+        except Exception as e:
+            logger.error(f"Failed to save trending snapshots: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.save()
+            except Exception as e:
+                logger.error(f"Failed to save trending snapshots: {str(e)}")
+
+    async def load(self) -> int:
+        """
+        Restore the sketches from their snapshots. Snapshots taken with
+        another half-life or sketch size are ignored.
+        """
+        restored = 0
+        for row in await database.fetch_all(trending_snapshots.select()):
+            row = dict(row)
+            window = row["window_name"]
+            if (
+                self.half_lives.get(window) != row["half_life"]
+                or row["width"] != self.width
+                or row["depth"] != min(self.depth, CountMinSketch.MAX_DEPTH)
+            ):
+                logger.info(f"Ignoring trending snapshot {window}/{row['category']!r} taken with other settings")
+                continue
+            category = row["category"]
+            if category != GLOBAL_CATEGORY and self._category(category) is None:
+                continue
+            self._sketch(window, category).restore(row)
+            restored += 1
+        logger.info(f"Restored {restored} trending snapshots")
+        return restored
+
+    async def save(self) -> int:
+        """
+        Snapshot the sketches that changed since the last snapshot
+        """
+        changed = [(key, sketch) for key, sketch in self.sketches.items() if sketch.dirty]
+        if not changed:
+            return 0
+        taken_at = datetime.utcnow()
+        rows = []
+        for (window, category), sketch in changed:
+            rows.append({"window_name": window, "category": category, "taken_at": taken_at, **sketch.snapshot()})
+            sketch.dirty = False
+        insert = dialect_insert(trending_snapshots).values(rows)
+        try:
+            with stage_timer("db.save_trending"):
+                await database.execute(insert.on_conflict_do_update(
+                    index_elements=[trending_snapshots.c.window_name, trending_snapshots.c.category],
+                    set_={
+                        name: insert.excluded[name]
+                        for name in ("taken_at", "half_life", "landmark", "width", "depth", "counters", "entries")
+                    }
+                ))
+        except Exception:
+            # Try again with the next snapshot
+            for _, sketch in changed:
+                sketch.dirty = True
+            raise
+        return len(rows)
+
+@lru_cache()
+def get_trending_tracker() -> Optional[TrendingTracker]:
+    """
+    Get the process-wide trending tracker, or None if trending is disabled
+    """
+    if not settings.TRENDING_ENABLED:
+        return None
+    return TrendingTracker()
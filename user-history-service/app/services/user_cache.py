@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, Optional, Set, Tuple
+from app.core.config import settings
+from app.core import metrics
+
+USER_CACHE_LOOKUPS = metrics.Counter(
+    "user_cache_lookups_total",
+    "User existence cache lookups by result",
+    ("result",)
+)
+_HIT = USER_CACHE_LOOKUPS.labels("hit")
+_NEGATIVE_HIT = USER_CACHE_LOOKUPS.labels("negative_hit")
+_MISS = USER_CACHE_LOOKUPS.labels("miss")
+
+class UserExistenceCache:
+    """
+    In-process TTL + LRU cache of whether a user ID exists.
+
+    Known users are kept for `ttl` seconds; unknown IDs are remembered only
+    for `negative_ttl` seconds, so a user created by another replica is
+    seen soon after. Creating a user here replaces any negative entry.
+    """
+    def __init__(
+        self,
+        max_entries: int = settings.USER_CACHE_MAX_ENTRIES,
+        ttl: float = settings.USER_CACHE_TTL,
+        negative_ttl: float = settings.USER_CACHE_NEGATIVE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # user_id -> (exists, expires_at)
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[bool]:
+        """
+        True or False if the answer is cached, None if the database must be asked
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            _MISS.inc()
+            return None
+        exists, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            _MISS.inc()
+            return None
+        self._entries.move_to_end(user_id)
+        (_HIT if exists else _NEGATIVE_HIT).inc()
+        return exists
+
+    def put(self, user_id: str, exists: bool):
+        ttl = self.ttl if exists else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[user_id] = (exists, time.monotonic() + ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put_many(self, user_ids: Iterable[str], existing: Set[str]):
+        for user_id in user_ids:
+            self.put(user_id, user_id in existing)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@lru_cache()
+def get_user_cache() -> Optional[UserExistenceCache]:
+    """
+    Get the process-wide user existence cache (None when disabled)
+    """
+    if settings.USER_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return UserExistenceCache()
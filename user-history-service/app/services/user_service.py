@@ -1,13 +1,20 @@
 import uuid
 from datetime import datetime
+from typing import Iterable, Optional, Set
 from app.db.database import database, users
 from app.models.schemas import UserCreate, User
+from app.services.user_cache import UserExistenceCache
+from app.core.metrics import stage_timer
 from fastapi import HTTPException
 
 class UserService:
     """
-    User management service using repository pattern
+    User management service using repository pattern; existence checks go
+    through the optional process-wide cache
     """
+    def __init__(self, cache: Optional[UserExistenceCache] = None):
+        self.cache = cache
+    
     async def create_user(self, user: UserCreate) -> User:
         """
         Create a new user
@@ -23,7 +30,10 @@ class UserService:
         )
         
         try:
-            await database.execute(query)
+            with stage_timer("db.insert_user"):
+                await database.execute(query)
+            if self.cache is not None:
+                self.cache.put(user_id, True)
             return User(
                 id=user_id,
                 username=user.username,
@@ -38,7 +48,8 @@ class UserService:
         Get a user by ID
         """
         query = users.select().where(users.c.id == user_id)
-        user = await database.fetch_one(query)
+        with stage_timer("db.fetch_user"):
+            user = await database.fetch_one(query)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -49,6 +60,47 @@ class UserService:
         """
         Check if a user exists
         """
-        query = users.select().where(users.c.id == user_id)
-        user = await database.fetch_one(query)
-        return user is not None 
\ No newline at end of file
+        if self.cache is not None:
+            exists = self.cache.get(user_id)
+            if exists is not None:
+                return exists
+        
+        query = users.select().with_only_columns([users.c.id]).where(users.c.id == user_id).limit(1)
+        with stage_timer("db.user_exists"):
+            user = await database.fetch_one(query)
+        exists = user is not None
+        if self.cache is not None:
+            self.cache.put(user_id, exists)
+        return exists
+    
+    def mark_exists(self, user_id: str):
+        """
+        Record that a user is known to exist (e.g. after a write referencing it succeeded)
+        """
+        if self.cache is not None:
+            self.cache.put(user_id, True)
+    
+    async def existing_user_ids(self, user_ids: Iterable[str]) -> Set[str]:
+        """
+        Return the subset of the given user IDs that exist, in one query
+        """
+        user_ids = set(user_ids)
+        existing = set()
+        if self.cache is not None:
+            for user_id in list(user_ids):
+                exists = self.cache.get(user_id)
+                if exists is not None:
+                    user_ids.discard(user_id)
+                    if exists:
+                        existing.add(user_id)
+        if not user_ids:
+            return existing
+        
+        query = users.select().with_only_columns([users.c.id]).where(users.c.id.in_(user_ids))
+        with stage_timer("db.existing_user_ids"):
+            rows = await database.fetch_all(query)
+        found = {row["id"] for row in rows}
+        if self.cache is not None:
+            self.cache.put_many(user_ids, found)
+        return existing | found
+
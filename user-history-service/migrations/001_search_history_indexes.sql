@@ -0,0 +1,11 @@
+-- Indexes for keyset-paginated history reads (newest first per user,
+-- optionally only saved entries). New databases get them from
+-- metadata.create_all; run this once against existing ones.
+--
+-- On a large Postgres table, run each statement separately with
+-- CREATE INDEX CONCURRENTLY to avoid blocking writes.
+CREATE INDEX IF NOT EXISTS ix_search_history_user_created
+    ON search_history (user_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS ix_search_history_user_saved
+    ON search_history (user_id, saved, created_at, id);
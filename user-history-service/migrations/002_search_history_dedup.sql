@@ -0,0 +1,15 @@
+-- Repeats of a search are recorded once per user: an upsert on
+-- (user_id, search_key) increments use_count and moves last_used forward.
+-- New databases get these from metadata.create_all; run this once against
+-- existing ones.
+--
+-- Existing entries keep a NULL search_key, so they are never merged (NULLs
+-- do not conflict in a unique index); new searches start fresh entries.
+ALTER TABLE search_history ADD COLUMN search_key VARCHAR;
+ALTER TABLE search_history ADD COLUMN use_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE search_history ADD COLUMN last_used TIMESTAMP;
+
+UPDATE search_history SET last_used = created_at WHERE last_used IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_search_history_user_key
+    ON search_history (user_id, search_key);
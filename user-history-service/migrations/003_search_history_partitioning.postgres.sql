@@ -0,0 +1,82 @@
+-- Postgres: rebuild search_history as a table partitioned by month on
+-- created_month, and create the monthly rollup tables. New databases get
+-- all of this from metadata.create_all and the service's upkeep job.
+--
+-- Existing rows are copied into one partition per month they cover. The old
+-- table is kept as search_history_unpartitioned; drop it once the copy has
+-- been checked. Stop the history service (or pause writes) while this runs.
+BEGIN;
+
+ALTER TABLE search_history RENAME TO search_history_unpartitioned;
+ALTER TABLE search_history_unpartitioned RENAME CONSTRAINT search_history_pkey TO search_history_unpartitioned_pkey;
+ALTER INDEX IF EXISTS ix_search_history_user_created RENAME TO ix_search_history_unpartitioned_user_created;
+ALTER INDEX IF EXISTS ix_search_history_user_saved RENAME TO ix_search_history_unpartitioned_user_saved;
+ALTER INDEX IF EXISTS ux_search_history_user_key RENAME TO ux_search_history_unpartitioned_user_key;
+
+CREATE TABLE search_history (
+    id VARCHAR NOT NULL,
+    user_id VARCHAR REFERENCES users (id),
+    search_text VARCHAR,
+    search_fields JSON,
+    saved BOOLEAN,
+    search_name VARCHAR,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    created_month DATE NOT NULL,
+    search_key VARCHAR,
+    use_count INTEGER NOT NULL DEFAULT 1,
+    last_used TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id, created_month)
+) PARTITION BY RANGE (created_month);
+
+CREATE UNIQUE INDEX ux_search_history_user_key ON search_history (user_id, search_key, created_month);
+CREATE INDEX ix_search_history_user_created ON search_history (user_id, created_at, id);
+CREATE INDEX ix_search_history_user_saved ON search_history (user_id, saved, created_at, id);
+
+-- One partition per month with data, and for this and the next two months
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    FOR month IN
+        SELECT DISTINCT date_trunc('month', COALESCE(created_at, now()))::date FROM search_history_unpartitioned
+        UNION
+        SELECT date_trunc('month', now() + make_interval(months => n))::date FROM generate_series(0, 2) AS n
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE search_history_p%s PARTITION OF search_history FOR VALUES FROM (%L) TO (%L)',
+            to_char(month, 'YYYYMM'), month, (month + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+CREATE TABLE search_history_default PARTITION OF search_history DEFAULT;
+
+INSERT INTO search_history (
+    id, user_id, search_text, search_fields, saved, search_name, created_at,
+    created_month, search_key, use_count, last_used
+)
+SELECT
+    id, user_id, search_text, search_fields, saved, search_name, created_at,
+    date_trunc('month', COALESCE(created_at, now()))::date, search_key, use_count, last_used
+FROM search_history_unpartitioned;
+
+CREATE TABLE IF NOT EXISTS search_history_user_monthly (
+    month DATE NOT NULL,
+    user_id VARCHAR NOT NULL,
+    searches INTEGER NOT NULL,
+    distinct_searches INTEGER NOT NULL,
+    PRIMARY KEY (month, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS search_history_search_monthly (
+    month DATE NOT NULL,
+    search_key VARCHAR NOT NULL,
+    search_text VARCHAR,
+    searches INTEGER NOT NULL,
+    users INTEGER NOT NULL,
+    PRIMARY KEY (month, search_key)
+);
+
+COMMIT;
+
+-- Once the copy has been checked:
+-- DROP TABLE search_history_unpartitioned;
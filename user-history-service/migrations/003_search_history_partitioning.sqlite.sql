@@ -0,0 +1,9 @@
+-- SQLite: add created_month and make the repeat key per month. SQLite has
+-- no partitioning; the upkeep job deletes expired months instead. The
+-- rollup tables are created by metadata.create_all on the next start.
+ALTER TABLE search_history ADD COLUMN created_month DATE;
+UPDATE search_history SET created_month = date(COALESCE(created_at, 'now'), 'start of month');
+
+DROP INDEX IF EXISTS ux_search_history_user_key;
+CREATE UNIQUE INDEX ux_search_history_user_key
+    ON search_history (user_id, search_key, created_month);
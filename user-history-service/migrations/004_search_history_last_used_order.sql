@@ -0,0 +1,17 @@
+-- History pages are ordered by last use instead of first use, so a search
+-- repeated today is listed first. Replace the page indexes with ones on
+-- last_used. New databases get them from metadata.create_all; run this once
+-- against existing ones (Postgres or SQLite, after 003).
+--
+-- On a large unpartitioned Postgres table, run each CREATE INDEX
+-- separately with CONCURRENTLY to avoid blocking writes.
+UPDATE search_history SET last_used = created_at WHERE last_used IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_search_history_user_last_used
+    ON search_history (user_id, last_used, id);
+
+CREATE INDEX IF NOT EXISTS ix_search_history_user_saved_last_used
+    ON search_history (user_id, saved, last_used, id);
+
+DROP INDEX IF EXISTS ix_search_history_user_created;
+DROP INDEX IF EXISTS ix_search_history_user_saved;